@@ -0,0 +1,102 @@
+"""Measure the cold-start cost of the Function app.
+
+Each run imports `function_app` in a fresh interpreter with
+`python -X importtime`, so results do not depend on warm module caches.
+With --warm-up, the clients are also created against placeholder settings
+(no network calls are made).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_import_time --runs 5 --top 15
+    python -m benchmarks.bench_import_time --budget-ms 500  # fail on regressions
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "src" / "indexer"
+
+PLACEHOLDER_ENV = {
+    "SEARCH_SERVICE_ENDPOINT": "example",
+    "SEARCH_SERVICE_API_KEY": "key",
+    "SEARCH_SERVICE_INDEX_NAME": "index",
+    "AOAI_ENDPOINT": "example",
+    "AOAI_API_VERSION": "2024-02-01",
+    "AOAI_API_KEY": "key",
+    "AOAI_EMBEDDING_MODEL_NAME": "text-embedding-3-small",
+}
+
+SCRIPT = """
+import time
+started = time.perf_counter()
+import function_app
+imported = time.perf_counter()
+if {warm_up}:
+    function_app.warm_up()
+print(f"{{(imported - started) * 1000:.1f}} {{(time.perf_counter() - imported) * 1000:.1f}}")
+"""
+
+
+def run_once(warm_up: bool, env: dict) -> tuple[float, float, dict[str, int]]:
+    """Return import and warm-up times in ms and cumulative µs per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT.format(warm_up=warm_up)],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative)
+    import_ms, warm_up_ms = map(float, result.stdout.split()[-2:])
+    return import_ms, warm_up_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--warm-up", action="store_true")
+    parser.add_argument(
+        "--budget-ms", type=float, help="exit with an error above this import time"
+    )
+    args = parser.parse_args()
+
+    env = {**os.environ, **PLACEHOLDER_ENV, "WARM_UP_ON_START": "false"}
+    env.pop("ENVIRONMENT", None)
+    runs = [run_once(args.warm_up, env) for _ in range(args.runs)]
+    import_ms = statistics.median(run[0] for run in runs)
+    warm_up_ms = statistics.median(run[1] for run in runs)
+
+    # Top-level packages only, by median cumulative import time
+    names = runs[0][2]
+    slowest = sorted(
+        (
+            (statistics.median(run[2].get(name, 0) for run in runs), name)
+            for name in names
+            if "." not in name
+        ),
+        reverse=True,
+    )[: args.top]
+
+    print(f"import function_app: {import_ms:.1f} ms (median of {args.runs})")
+    if args.warm_up:
+        print(f"warm_up():           {warm_up_ms:.1f} ms")
+    print("\nSlowest top-level imports:")
+    for cumulative, name in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        sys.exit(f"Import time {import_ms:.1f} ms exceeds {args.budget_ms} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""End-to-end indexer throughput against local stand-in services.
+
+A synthetic PDF corpus is sent through the real Function routes
+(`indexer`, `indexer_async` or `indexer_bulk`), while Azure OpenAI and
+Azure AI Search are replaced by `benchmarks.stub_services` running in a
+separate process. Reports documents/s, chunks/s, p50/p95 per stage and
+peak RSS.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_indexer --documents 50 --mode async
+    python -m benchmarks.bench_indexer --mode bulk --zip --throttle-rate 0.05
+    python -m benchmarks.bench_indexer --deployments 3 --tokens-per-minute 200000
+"""
+
+import argparse
+import asyncio
+import functools
+import inspect
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .corpus import make_corpus
+
+APP_DIR = Path(__file__).resolve().parent.parent / "src" / "indexer"
+
+
+class StageTimer:
+    """Collects call durations per stage from wrapped functions."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, owner: Any, name: str, stage: str):
+        """Replace `owner.name` with a timed version (sync, async or generator)."""
+        function = getattr(owner, name)
+
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - started)
+
+            setattr(owner, name, timed_async)
+
+        elif inspect.isgeneratorfunction(function):
+
+            @functools.wraps(function)
+            def timed_generator(*args, **kwargs):
+                # Only time spent producing items counts, not the consumer's
+                iterator = function(*args, **kwargs)
+                elapsed = 0.0
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - started
+                        yield item
+                finally:
+                    self.record(stage, elapsed)
+
+            setattr(owner, name, timed_generator)
+
+        else:
+
+            @functools.wraps(function)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - started)
+
+            setattr(owner, name, timed)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def encode_multipart(files: List[tuple[str, bytes]]) -> tuple[bytes, str]:
+    """Encode files as `file` fields of a multipart/form-data body."""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, data in files:
+        body.write(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n".encode("utf-8")
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode("utf-8"))
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def make_request(func: Any, route: str, files: List[tuple[str, bytes]]) -> Any:
+    body, content_type = encode_multipart(files)
+    return func.HttpRequest(
+        method="POST",
+        url=f"http://localhost/api/{route}",
+        headers={"Content-Type": content_type},
+        body=body,
+    )
+
+
+def start_stub_server(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.stub_services",
+            f"--dimensions={args.dimensions}",
+            f"--embedding-latency-ms={args.embedding_latency_ms}",
+            f"--upload-latency-ms={args.upload_latency_ms}",
+            f"--throttle-rate={args.throttle_rate}",
+            f"--max-upload-bytes={args.max_upload_bytes}",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    url = process.stdout.readline().strip()  # type: ignore
+    return process, url
+
+
+def configure_environment(url: str, work_dir: str, args: argparse.Namespace):
+    os.environ.update(
+        {
+            "SEARCH_SERVICE_ENDPOINT": url,
+            "SEARCH_SERVICE_API_KEY": "stub",
+            "SEARCH_SERVICE_INDEX_NAME": "bench",
+            "AOAI_ENDPOINT": url,
+            "AOAI_API_VERSION": "2024-02-01",
+            "AOAI_API_KEY": "stub",
+            "AOAI_EMBEDDING_MODEL_NAME": "stub",
+            "INDEX_MANIFEST_PATH": os.path.join(work_dir, "manifest.sqlite"),
+            "JOB_STORE_PATH": os.path.join(work_dir, "jobs.sqlite"),
+            "EMBEDDING_CACHE_PATH": "",
+            "WARM_UP_ON_START": "false",
+            "METRICS_EXPORTER": "prometheus",
+            # The stub serves every deployment name
+            "AOAI_DEPLOYMENTS": json.dumps(
+                [{"deployment": f"stub-{i}"} for i in range(args.deployments)]
+            ),
+            # Per-deployment quota, to see throughput scale with deployments
+            "AOAI_TOKENS_PER_MINUTE": str(args.tokens_per_minute),
+            "EMBEDDING_DIMENSIONS": str(args.request_dimensions),
+            "EMBEDDING_DTYPE": args.dtype,
+        }
+    )
+    os.environ.pop("ENVIRONMENT", None)
+
+
+def instrument(timer: StageTimer):
+    """Time the stages of the real code path (imported from src/indexer)."""
+    from clients import async_clients, clients, uploader
+    from func import pdf_extractor, text_splitter
+
+    timer.wrap(pdf_extractor.PdfExtractor, "iter_pages", "extract")
+    timer.wrap(text_splitter.RecursiveTextSplitter, "split_text", "chunk")
+    timer.wrap(clients.AzureEmbeddingClient, "_request_embeddings", "embed")
+    timer.wrap(async_clients.AsyncAzureEmbeddingClient, "_request_embeddings", "embed")
+    timer.wrap(uploader.BatchUploader, "_upload_batch", "upload")
+    timer.wrap(uploader.AsyncBatchUploader, "_upload_batch", "upload")
+
+
+def run(
+    function_app: Any,
+    corpus: List[tuple[str, bytes]],
+    args: argparse.Namespace,
+    timer: StageTimer,
+) -> List[Any]:
+    func = function_app.func
+
+    def timed_request(call: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        response = call()
+        timer.record("request", time.perf_counter() - started)
+        return response
+
+    if args.mode == "sync":
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            return list(
+                executor.map(
+                    lambda document: timed_request(
+                        lambda: function_app.indexer(
+                            make_request(func, "indexer", [document])
+                        )
+                    ),
+                    corpus,
+                )
+            )
+
+    async def run_async() -> List[Any]:
+        if args.mode == "bulk":
+            files = corpus
+            if args.zip:
+                archive = io.BytesIO()
+                with zipfile.ZipFile(archive, "w") as zf:
+                    for name, data in corpus:
+                        zf.writestr(name, data)
+                files = [("corpus.zip", archive.getvalue())]
+            request = make_request(func, "indexer/bulk", files)
+            started = time.perf_counter()
+            response = await function_app.indexer_bulk(request)
+            timer.record("request", time.perf_counter() - started)
+            return [response]
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def index(document: tuple[str, bytes]) -> Any:
+            async with semaphore:
+                request = make_request(func, "indexer/async", [document])
+                started = time.perf_counter()
+                response = await function_app.indexer_async(request)
+                timer.record("request", time.perf_counter() - started)
+                return response
+
+        return await asyncio.gather(*(index(document) for document in corpus))
+
+    return asyncio.run(run_async())
+
+
+def peak_rss_mib() -> tuple[float, float]:
+    """Peak resident set size of this process and of its children."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own / 1024 / 1024, children / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=20)
+    parser.add_argument("--mode", choices=["sync", "async", "bulk"], default="async")
+    parser.add_argument("--zip", action="store_true", help="bulk mode: send a ZIP")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deployments", type=int, default=1)
+    parser.add_argument("--tokens-per-minute", type=int, default=0)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument(
+        "--request-dimensions",
+        type=int,
+        default=0,
+        help="ask for shorter vectors (EMBEDDING_DIMENSIONS)",
+    )
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upload-latency-ms", type=float, default=30.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-upload-bytes", type=int, default=16 * 1024 * 1024)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    print(f"Generating {args.documents} documents...", file=sys.stderr)
+    corpus = make_corpus(args.documents, args.min_pages, args.max_pages)
+
+    stub, url = start_stub_server(args)
+    work_dir = tempfile.TemporaryDirectory()
+    cwd = os.getcwd()
+    try:
+        configure_environment(url, work_dir.name, args)
+        sys.path.insert(0, str(APP_DIR))
+        import function_app
+
+        timer = StageTimer()
+        instrument(timer)
+        # Client creation is a cold-start cost, not part of throughput
+        function_app.warm_up()
+
+        # Debug chunk dumps are written relative to the working directory
+        os.chdir(work_dir.name)
+        started = time.perf_counter()
+        responses = run(function_app, corpus, args, timer)
+        elapsed = time.perf_counter() - started
+
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            server_stats = json.load(response)
+        snapshot = function_app.metrics.snapshot()
+        counters = snapshot["counters"]
+        http_stages = {
+            stage: row
+            for stage, row in snapshot["stages"].items()
+            if stage.startswith("http_")
+        }
+    finally:
+        os.chdir(cwd)
+        stub.terminate()
+        stub.wait()
+        work_dir.cleanup()
+
+    failures = [r.status_code for r in responses if r.status_code not in (200, 207)]
+    chunks = server_stats["indexed_documents"]
+    own_rss, children_rss = peak_rss_mib()
+    results = {
+        "mode": args.mode,
+        "documents": len(corpus),
+        "failed_requests": len(failures),
+        "chunks": chunks,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(len(corpus) / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 1),
+        "stages": {
+            stage: {
+                "count": len(samples),
+                "p50_ms": round(statistics.median(samples) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "total_seconds": round(sum(samples), 3),
+            }
+            for stage, samples in timer.samples.items()
+        },
+        "counters": counters,
+        "http": http_stages,
+        "server": server_stats,
+        "peak_rss_mib": round(own_rss, 1),
+        "peak_child_rss_mib": round(children_rss, 1),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"{results['documents']} documents, {chunks} chunks in {elapsed:.2f}s "
+        f"({args.mode}, {len(failures)} failed requests)"
+    )
+    print(
+        f"throughput: {results['documents_per_second']} docs/s, "
+        f"{results['chunks_per_second']} chunks/s"
+    )
+    print(f"{'stage':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for stage, row in results["stages"].items():
+        print(
+            f"{stage:<10}{row['count']:>8}{row['p50_ms']:>10}"
+            f"{row['p95_ms']:>10}{row['total_seconds']:>10}"
+        )
+    print(f"counters: {counters}")
+    for stage, row in http_stages.items():
+        print(f"{stage}: {row['count']} requests, {row['seconds']:.3f}s total")
+    print(f"server: {server_stats}")
+    print(f"peak RSS: {own_rss:.1f} MiB (children: {children_rss:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
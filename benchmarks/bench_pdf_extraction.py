@@ -0,0 +1,54 @@
+"""Compare serial and page-sharded parallel PDF extraction.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pdf_extraction --pages 2000 --workers 4
+"""
+
+import argparse
+import time
+
+from src.indexer.func.pdf_extractor import PdfExtractor, available_cores
+
+from .corpus import make_pdf
+
+
+def measure(extractor: PdfExtractor, pdf: bytes, repeat: int) -> tuple[float, str]:
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = "".join(extractor.iter_pages(pdf))
+        best = min(best, time.perf_counter() - started)
+    return best, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=available_cores())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Generating a {args.pages}-page PDF...")
+    pdf = make_pdf(args.pages)
+    print(f"PDF size: {len(pdf) / 1024 / 1024:.1f} MiB")
+
+    serial = PdfExtractor(max_workers=1)
+    parallel = PdfExtractor(parallel_page_threshold=0, max_workers=args.workers)
+    # Start the worker processes before timing
+    "".join(parallel.iter_pages(make_pdf(parallel.max_workers)))
+
+    serial_time, serial_text = measure(serial, pdf, args.repeat)
+    parallel_time, parallel_text = measure(parallel, pdf, args.repeat)
+    assert serial_text == parallel_text, "parallel output differs from serial"
+
+    print(f"serial:   {serial_time:.3f}s ({args.pages / serial_time:.0f} pages/s)")
+    print(
+        f"parallel: {parallel_time:.3f}s ({args.pages / parallel_time:.0f} pages/s) "
+        f"with {parallel.max_workers} processes"
+    )
+    print(f"speedup:  {serial_time / parallel_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
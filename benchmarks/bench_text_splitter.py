@@ -0,0 +1,76 @@
+"""Compare the native recursive splitter with LangChain's.
+
+Usage (from the repository root, with langchain installed):
+    python -m benchmarks.bench_text_splitter --chars 2000000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from src.indexer.func.text_splitter import RecursiveTextSplitter
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+
+
+def make_text(chars: int, seed: int = 0) -> str:
+    """Build text with paragraphs, lines and words of varying length."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < chars:
+        line = " ".join(rng.choices(WORDS, k=rng.randint(3, 30)))
+        separator = rng.choice(["\n", "\n", "\n\n", " "])
+        parts.append(line + separator)
+        size += len(line) + len(separator)
+    return "".join(parts)[:chars]
+
+
+def measure(split: Callable[[str], List[str]], text: str, repeat: int):
+    best = float("inf")
+    chunks: List[str] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = split(text)
+        best = min(best, time.perf_counter() - started)
+    return best, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chars", type=int, default=2_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_text(args.chars)
+    mib = len(text.encode("utf-8")) / 1024 / 1024
+
+    native = RecursiveTextSplitter(args.chunk_size, args.overlap)
+    native_time, native_chunks = measure(native.split_text, text, args.repeat)
+    print(f"native:    {native_time:.3f}s ({mib / native_time:.1f} MiB/s)")
+
+    try:
+        started = time.perf_counter()
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        import_time = time.perf_counter() - started
+    except ImportError:
+        print("langchain is not installed; skipping the comparison.")
+        return
+
+    langchain = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.overlap
+    )
+    langchain_time, langchain_chunks = measure(langchain.split_text, text, args.repeat)
+    assert native_chunks == langchain_chunks, "native output differs from langchain"
+
+    print(f"langchain: {langchain_time:.3f}s ({mib / langchain_time:.1f} MiB/s)")
+    print(f"speedup:   {langchain_time / native_time:.2f}x")
+    print(f"langchain import: {import_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Search latency and recall of the local vector store, exact and IVF.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_vector_store --rows 200000 --dimensions 1536
+    python -m benchmarks.bench_vector_store --ivf-lists 512 --ivf-probes 16
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.indexer.core.vector_store import VectorStore
+
+
+def make_vectors(rows: int, dimensions: int, clusters: int, seed: int = 0):
+    """Clustered vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    for start in range(0, rows, 10000):
+        count = min(10000, rows - start)
+        points = centers[rng.integers(clusters, size=count)]
+        yield points + rng.normal(scale=0.3, size=points.shape).astype(np.float32)
+
+
+def measure(store: VectorStore, queries: np.ndarray, top: int, exact: bool):
+    started = time.perf_counter()
+    hits = [store.search(query, top, exact=exact) for query in queries]
+    elapsed = time.perf_counter() - started
+    return hits, elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--ivf-lists", type=int, default=256)
+    parser.add_argument("--ivf-probes", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = VectorStore(root, ivf_lists=args.ivf_lists, ivf_probes=args.ivf_probes)
+        started = time.perf_counter()
+        row = 0
+        for vectors in make_vectors(args.rows, args.dimensions, args.clusters):
+            ids = [str(row + i) for i in range(len(vectors))]
+            store.upsert(ids, ids, vectors)
+            row += len(vectors)
+        print(f"upsert:    {args.rows / (time.perf_counter() - started):,.0f} rows/s")
+
+        queries = next(make_vectors(args.queries, args.dimensions, args.clusters, 1))
+        exact, exact_latency = measure(store, queries, args.top, exact=True)
+        print(f"exact:     {exact_latency * 1000:.1f} ms/query")
+        batch_started = time.perf_counter()
+        store.search_batch(queries, args.top, exact=True)
+        batch_latency = (time.perf_counter() - batch_started) / len(queries)
+        print(f"batched:   {batch_latency * 1000:.1f} ms/query")
+
+        if args.ivf_lists:
+            started = time.perf_counter()
+            store.build_ivf()
+            print(f"ivf build: {time.perf_counter() - started:.1f}s")
+            approximate, ivf_latency = measure(store, queries, args.top, exact=False)
+            recall = np.mean(
+                [
+                    len({hit.id for hit in a} & {hit.id for hit in e}) / args.top
+                    for a, e in zip(approximate, exact)
+                ]
+            )
+            print(
+                f"ivf:       {ivf_latency * 1000:.1f} ms/query, "
+                f"recall@{args.top} {recall:.3f}, "
+                f"speedup {exact_latency / ivf_latency:.1f}x"
+            )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Synthetic PDF documents for benchmarks."""
+
+import random
+from typing import List
+
+import fitz  # type: ignore
+
+PARAGRAPH = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua. "
+)
+
+WORDS = PARAGRAPH.lower().replace(",", "").replace(".", "").split()
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int | None = None) -> bytes:
+    """Build a synthetic text-heavy PDF in memory.
+
+    Without a seed every line repeats the same paragraph; with a seed the
+    words are shuffled, so documents do not share chunks.
+    """
+    rng = random.Random(seed) if seed is not None else None
+    document = fitz.open()
+    for page_num in range(pages):
+        page = document.new_page()
+        lines = []
+        for line in range(lines_per_page):
+            text = " ".join(rng.choices(WORDS, k=18)) if rng else PARAGRAPH
+            lines.append(f"{page_num}-{line}: {text}")
+        page.insert_textbox(
+            page.rect + (36, 36, -36, -36), "\n".join(lines), fontsize=7
+        )
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def make_corpus(
+    documents: int, min_pages: int = 1, max_pages: int = 20, seed: int = 0
+) -> List[tuple[str, bytes]]:
+    """Build (file name, PDF bytes) pairs with varying page counts."""
+    rng = random.Random(seed)
+    return [
+        (
+            f"doc-{i:05d}.pdf",
+            make_pdf(rng.randint(min_pages, max_pages), seed=seed * 100003 + i),
+        )
+        for i in range(documents)
+    ]
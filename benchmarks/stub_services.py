@@ -0,0 +1,249 @@
+"""Local stand-ins for the Azure OpenAI embeddings and Azure AI Search APIs.
+
+Only the two calls the indexer makes are implemented: embeddings and
+document indexing. Latency, throttling (429 with Retry-After) and payload
+limits are configurable, so throughput can be measured without quota.
+"""
+
+import argparse
+import base64
+import json
+import random
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+@dataclass
+class StubConfig:
+    dimensions: int = 1536
+    embedding_latency_ms: float = 50.0
+    upload_latency_ms: float = 30.0
+    # Fraction of requests answered with 429
+    throttle_rate: float = 0.0
+    retry_after_seconds: float = 0.2
+    max_embedding_inputs: int = 2048
+    max_upload_bytes: int = 16 * 1024 * 1024
+    seed: int = 0
+
+
+@dataclass
+class StubStats:
+    requests: Dict[str, int] = field(default_factory=dict)
+    throttled: Dict[str, int] = field(default_factory=dict)
+    rejected: Dict[str, int] = field(default_factory=dict)
+    embedded_inputs: int = 0
+    indexed_documents: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, counter: Dict[str, int], endpoint: str):
+        with self.lock:
+            counter[endpoint] = counter.get(endpoint, 0) + 1
+
+
+class StubAzureServer:
+    """Serves both APIs on one local port from a background thread."""
+
+    def __init__(self, config: StubConfig | None = None, port: int = 0):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        # Every input gets the same vector; serializing it once per format
+        # keeps the server from becoming the bottleneck
+        self._vector = [round(random.Random(0).uniform(-1, 1), 6)] * (
+            self.config.dimensions
+        )
+        self._encoded: Dict[tuple[int, str], str] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubAzureServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubAzureServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def encoded_vector(self, dimensions: int, encoding_format: str) -> str:
+        """The JSON value of the vector, as a list or base64 float32."""
+        key = (dimensions, encoding_format)
+        if key not in self._encoded:
+            vector = self._vector[:dimensions]
+            if encoding_format == "base64":
+                packed = struct.pack(f"<{len(vector)}f", *vector)
+                self._encoded[key] = json.dumps(base64.b64encode(packed).decode())
+            else:
+                self._encoded[key] = json.dumps(vector)
+        return self._encoded[key]
+
+    def _throttle(self) -> bool:
+        with self._rng_lock:
+            return self._rng.random() < self.config.throttle_rate
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/stats":
+                    return self.reply(404, {"error": {"message": "Not found."}})
+                with server.stats.lock:
+                    stats = {
+                        "requests": server.stats.requests,
+                        "throttled": server.stats.throttled,
+                        "rejected": server.stats.rejected,
+                        "embedded_inputs": server.stats.embedded_inputs,
+                        "indexed_documents": server.stats.indexed_documents,
+                    }
+                self.reply(200, stats)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = self.path.split("?")[0]
+                if path.endswith("/embeddings"):
+                    self.handle_embeddings(body)
+                elif "/docs" in path and path.endswith("index"):
+                    self.handle_index(body)
+                else:
+                    self.reply(404, {"error": {"message": f"Unknown path {path}"}})
+
+            def handle_embeddings(self, body: bytes):
+                config = server.config
+                server.stats.count(server.stats.requests, "embeddings")
+                if server._throttle():
+                    server.stats.count(server.stats.throttled, "embeddings")
+                    return self.throttled()
+                request = json.loads(body)
+                inputs = request["input"]
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                if len(inputs) > config.max_embedding_inputs:
+                    server.stats.count(server.stats.rejected, "embeddings")
+                    return self.reply(
+                        400, {"error": {"message": "Too many inputs.", "code": "400"}}
+                    )
+                time.sleep(config.embedding_latency_ms / 1000)
+                with server.stats.lock:
+                    server.stats.embedded_inputs += len(inputs)
+                tokens = sum(len(text) // 4 + 1 for text in inputs)
+                vector = server.encoded_vector(
+                    min(
+                        request.get("dimensions") or config.dimensions,
+                        config.dimensions,
+                    ),
+                    request.get("encoding_format", "float"),
+                )
+                data = ",".join(
+                    '{"object":"embedding","index":%d,"embedding":%s}' % (i, vector)
+                    for i in range(len(inputs))
+                )
+                self.send_raw(
+                    200,
+                    '{"object":"list","model":"stub","data":[%s],'
+                    '"usage":{"prompt_tokens":%d,"total_tokens":%d}}'
+                    % (data, tokens, tokens),
+                )
+
+            def handle_index(self, body: bytes):
+                config = server.config
+                server.stats.count(server.stats.requests, "index")
+                if server._throttle():
+                    server.stats.count(server.stats.throttled, "index")
+                    return self.throttled()
+                if len(body) > config.max_upload_bytes:
+                    server.stats.count(server.stats.rejected, "index")
+                    return self.reply(
+                        413, {"error": {"message": "Request entity too large."}}
+                    )
+                documents: List[dict] = json.loads(body)["value"]
+                time.sleep(config.upload_latency_ms / 1000)
+                with server.stats.lock:
+                    server.stats.indexed_documents += len(documents)
+                results = [
+                    {
+                        "key": document["id"],
+                        "status": True,
+                        "errorMessage": None,
+                        "statusCode": 201,
+                    }
+                    for document in documents
+                ]
+                self.reply(200, {"value": results})
+
+            def throttled(self):
+                self.reply(
+                    429,
+                    {"error": {"message": "Rate limit exceeded.", "code": "429"}},
+                    {"Retry-After": str(server.config.retry_after_seconds)},
+                )
+
+            def reply(self, status: int, payload: dict, headers: dict | None = None):
+                self.send_raw(status, json.dumps(payload), headers)
+
+            def send_raw(self, status: int, text: str, headers: dict | None = None):
+                data = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    """Run the stand-in server until interrupted, printing its URL first."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upload-latency-ms", type=float, default=30.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-seconds", type=float, default=0.2)
+    parser.add_argument("--max-embedding-inputs", type=int, default=2048)
+    parser.add_argument("--max-upload-bytes", type=int, default=16 * 1024 * 1024)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        dimensions=args.dimensions,
+        embedding_latency_ms=args.embedding_latency_ms,
+        upload_latency_ms=args.upload_latency_ms,
+        throttle_rate=args.throttle_rate,
+        retry_after_seconds=args.retry_after_seconds,
+        max_embedding_inputs=args.max_embedding_inputs,
+        max_upload_bytes=args.max_upload_bytes,
+    )
+    server = StubAzureServer(config, args.port)
+    print(server.url, flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,36 @@
 from .clients import AzureSearchClient, AzureEmbeddingClient
+from .async_clients import AsyncAzureEmbeddingClient, AsyncAzureSearchClient
+from .backends import (
+    AsyncIndexBackend,
+    AsyncLocalIndexBackend,
+    IndexBackend,
+    LocalIndexBackend,
+    SearchBackend,
+)
+from .deployment_pool import DeploymentPool
+from .embedding_cache import EmbeddingCache
+from .pipeline import AsyncIndexingPipeline, DocumentResult
+from .rate_limiter import RateLimiter
+from .retrieval import Retriever
+from .uploader import AsyncBatchUploader, BatchUploader, UploadReport
 
 __all__ = [
+    "AsyncAzureEmbeddingClient",
+    "AsyncAzureSearchClient",
+    "AsyncBatchUploader",
+    "AsyncIndexBackend",
+    "AsyncIndexingPipeline",
+    "AsyncLocalIndexBackend",
     "AzureEmbeddingClient",
     "AzureSearchClient",
+    "BatchUploader",
+    "DeploymentPool",
+    "DocumentResult",
+    "EmbeddingCache",
+    "IndexBackend",
+    "LocalIndexBackend",
+    "RateLimiter",
+    "Retriever",
+    "SearchBackend",
+    "UploadReport",
 ]
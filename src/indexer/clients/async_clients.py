@@ -0,0 +1,142 @@
+from typing import List, Dict, Any
+import asyncio
+import logging
+
+import numpy as np
+from azure.search.documents.models import IndexingResult
+from openai import AsyncAzureOpenAI
+
+from core.config import Settings
+from core.metrics import metrics
+from .clients import (
+    cache_namespace,
+    create_deployment_clients,
+    embedding_options,
+    estimate_tokens,
+    index_batch_body,
+    index_url,
+    merge_embeddings,
+    parse_indexing_results,
+    read_embeddings,
+    record_embedding_usage,
+)
+from .deployment_pool import DeploymentPool
+from .embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAzureEmbeddingClient:
+    def __init__(
+        self,
+        settings: Settings,
+        cache: EmbeddingCache | None = None,
+        pool: DeploymentPool | None = None,
+    ):
+        self.pool = pool
+        self.batch_size = settings.embedding_batch_size
+        self.batch_max_tokens = settings.embedding_batch_max_tokens
+        self.cache = cache
+        self.options = embedding_options(settings)
+        self.dtype = np.dtype(settings.embedding_dtype)
+        if pool is None:
+            self.client = AsyncAzureOpenAI(
+                azure_endpoint=settings.aoai_endpoint,
+                api_key=settings.aoai_api_key,
+                api_version=settings.aoai_api_version,
+                http_client=settings.async_http_client,
+            )
+            self.embedding_model = settings.aoai_embedding_model_name
+        else:
+            self.clients = create_deployment_clients(
+                AsyncAzureOpenAI, settings, pool, settings.async_http_client
+            )
+            self.embedding_model = pool.model
+        self.cache_namespace = cache_namespace(
+            self.embedding_model,
+            settings.embedding_dimensions,
+            settings.embedding_dtype,
+        )
+
+    async def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Get embedding vectors for one multi-input request, in input order.
+
+        Texts found in the cache are not sent to Azure OpenAI.
+        """
+        if self.cache is None:
+            return await self._request_embeddings(texts)
+
+        # SQLite lookups and writes would block the event loop
+        keys, cached = await asyncio.to_thread(
+            self.cache.lookup, self.cache_namespace, texts
+        )
+        metrics.add("embedding_cache_hits", len(cached))
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if not missing:
+            return merge_embeddings(len(texts), cached, np.empty((0, 0)))
+
+        fetched = await self._request_embeddings([texts[i] for i in missing])
+        await asyncio.to_thread(
+            self.cache.put_many, {keys[i]: fetched[j] for j, i in enumerate(missing)}
+        )
+        return merge_embeddings(len(texts), cached, fetched)
+
+    async def _request_embeddings(self, texts: List[str]) -> np.ndarray:
+        with metrics.span("embed", inputs=len(texts)):
+            response = await self._create_embeddings(texts)
+        record_embedding_usage(response, len(texts))
+        return read_embeddings([(0, response)], len(texts), self.dtype)
+
+    async def _create_embeddings(self, texts: List[str]) -> Any:
+        if self.pool is None:
+            return await self.client.embeddings.create(
+                input=texts, model=self.embedding_model, **self.options
+            )
+        return await self.pool.call_async(
+            lambda deployment: self.clients[
+                deployment.name
+            ].embeddings.with_raw_response.create(
+                input=texts, model=deployment.deployment, **self.options
+            ),
+            sum(estimate_tokens(text) for text in texts),
+        )
+
+
+class AsyncAzureSearchClient:
+    """Uploads documents through the Azure AI Search REST API.
+
+    The REST API is called directly so that uploads share the application's
+    `httpx.AsyncClient` instead of the SDK's aiohttp transport.
+    """
+
+    def __init__(self, settings: Settings):
+        self.http_client = settings.async_http_client
+        self.index_url = index_url(settings)
+        self.api_version = settings.search_service_api_version
+        self.headers = {
+            "api-key": settings.search_service_api_key,
+            "Content-Type": "application/json",
+        }
+
+    async def upload_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]:
+        """Upload documents and return the per-document indexing results."""
+        return await self._index_batch(documents, "upload")
+
+    async def delete_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]:
+        """Delete documents by key and return the per-document indexing results."""
+        return await self._index_batch(documents, "delete")
+
+    async def _index_batch(
+        self, documents: List[Dict[str, Any]], action: str
+    ) -> List[IndexingResult]:
+        response = await self.http_client.post(
+            self.index_url,
+            params={"api-version": self.api_version},
+            headers=self.headers,
+            content=index_batch_body(documents, action),
+        )
+        return parse_indexing_results(response)
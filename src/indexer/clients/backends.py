@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Protocol
+import asyncio
+import re
+
+import numpy as np
+from azure.search.documents.models import IndexingResult
+
+from core.vector_store import SearchHit, VectorStore
+
+# Vector candidates re-ranked by keyword matches in the local hybrid search
+LOCAL_CANDIDATES = 50
+# Damping constant of Reciprocal Rank Fusion, as in Azure AI Search
+RRF_K = 60
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def keyword_ranking(text: str, hits: List[SearchHit]) -> List[SearchHit]:
+    """Hits containing query terms, by how many term occurrences they have."""
+    terms = set(TOKEN_PATTERN.findall(text.lower()))
+    counts = {
+        hit.id: sum(
+            token in terms for token in TOKEN_PATTERN.findall(hit.content.lower())
+        )
+        for hit in hits
+    }
+    return sorted(
+        (hit for hit in hits if counts[hit.id]), key=lambda hit: -counts[hit.id]
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[SearchHit]], top: int
+) -> List[SearchHit]:
+    """Merge rankings by summing 1 / (RRF_K + rank) per document."""
+    scores: Dict[str, float] = {}
+    hits: Dict[str, SearchHit] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1 / (RRF_K + rank)
+            hits[hit.id] = hit
+    best = sorted(scores, key=lambda key: -scores[key])[:top]
+    return [SearchHit(key, hits[key].content, scores[key]) for key in best]
+
+
+class IndexBackend(Protocol):
+    """Where `AzureSearchClient` sends documents, e.g. `SearchDocumentsClient`.
+
+    Each call takes a batch of documents (only keys, for deletes) and
+    returns one `IndexingResult` per document.
+    """
+
+    def upload_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]: ...
+
+    def delete_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]: ...
+
+
+class AsyncIndexBackend(Protocol):
+    """Asyncio version of `IndexBackend`, e.g. `AsyncAzureSearchClient`."""
+
+    async def upload_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]: ...
+
+    async def delete_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]: ...
+
+
+class SearchBackend(Protocol):
+    """Answers hybrid queries, e.g. `SearchDocumentsClient`."""
+
+    def search(
+        self, text: str, vector: np.ndarray, top: int = 5, filter: str | None = None
+    ) -> List[SearchHit]: ...
+
+
+class LocalIndexBackend:
+    """Indexes documents into a local `VectorStore` instead of Azure AI Search.
+
+    Documents keep the index's field names, so the clients and uploaders
+    work unchanged; only the key, content and vector fields are stored.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        key_field: str = "id",
+        content_field: str = "content",
+        vector_field: str = "contentVector",
+    ):
+        self.store = store
+        self.key_field = key_field
+        self.content_field = content_field
+        self.vector_field = vector_field
+
+    def upload_documents(self, documents: List[Dict[str, Any]]) -> List[IndexingResult]:
+        keys = [document[self.key_field] for document in documents]
+        try:
+            self.store.upsert(
+                keys,
+                [document[self.content_field] for document in documents],
+                np.stack([document[self.vector_field] for document in documents]),
+            )
+        except ValueError as e:
+            # Like a rejected document: the batch is not worth retrying
+            return [
+                IndexingResult(
+                    key=key, succeeded=False, status_code=400, error_message=str(e)
+                )
+                for key in keys
+            ]
+        return [
+            IndexingResult(key=key, succeeded=True, status_code=201) for key in keys
+        ]
+
+    def delete_documents(self, documents: List[Dict[str, Any]]) -> List[IndexingResult]:
+        keys = [document[self.key_field] for document in documents]
+        self.store.delete(keys)
+        return [
+            IndexingResult(key=key, succeeded=True, status_code=200) for key in keys
+        ]
+
+    def search(
+        self, text: str, vector: np.ndarray, top: int = 5, filter: str | None = None
+    ) -> List[SearchHit]:
+        """Hybrid search over the closest vectors.
+
+        The top `LOCAL_CANDIDATES` vector matches are re-ranked together with
+        their keyword matches by Reciprocal Rank Fusion, like Azure AI
+        Search does; there is no full-text index, so keywords only promote
+        documents that are also close in vector space.
+        """
+        if filter:
+            raise ValueError("The local index does not support filters.")
+        candidates = self.store.search(vector, max(top, LOCAL_CANDIDATES))
+        if not text.strip():
+            return candidates[:top]
+        return reciprocal_rank_fusion(
+            [candidates, keyword_ranking(text, candidates)], top
+        )
+
+
+class AsyncLocalIndexBackend:
+    """Runs a `LocalIndexBackend` in worker threads, for the async pipeline."""
+
+    def __init__(self, backend: LocalIndexBackend):
+        self.backend = backend
+
+    async def upload_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]:
+        return await asyncio.to_thread(self.backend.upload_documents, documents)
+
+    async def delete_documents(
+        self, documents: List[Dict[str, Any]]
+    ) -> List[IndexingResult]:
+        return await asyncio.to_thread(self.backend.delete_documents, documents)
+
+    async def search(
+        self, text: str, vector: np.ndarray, top: int = 5, filter: str | None = None
+    ) -> List[SearchHit]:
+        return await asyncio.to_thread(self.backend.search, text, vector, top, filter)
@@ -1,84 +1,541 @@
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, TypeVar
+import base64
 import logging
+import math
 
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
+import numpy as np
+from azure.search.documents.models import IndexingResult
 from openai import AzureOpenAI
 
+from core.artifacts import ArtifactStore
 from core.config import Settings
+from core.manifest import (
+    IndexingFailed,
+    ManifestStore,
+    ReindexTracker,
+    make_chunk_ids,
+)
+from core.metrics import metrics
+from core.serialization import dumps, loads
+from core.vector_store import SearchHit
+from .backends import IndexBackend
+from .embedding_cache import EmbeddingCache
+from .deployment_pool import DeploymentPool
+from .uploader import BatchUploader, UploadReport, encode_document
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-class AzureEmbeddingClient:
-    def __init__(self, settings: Settings):
-        self.client = AzureOpenAI(
-            azure_endpoint=settings.aoai_endpoint,
-            api_key=settings.aoai_api_key,
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield consecutive lists of up to `size` items from an iterable."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of a text without a tokenizer.
+
+    One token per 3 UTF-8 bytes over-estimates English (~4 chars/token)
+    and matches CJK text (~1 token per 3-byte character), so batches stay
+    under the limit for both.
+    """
+    return max(1, math.ceil(len(text.encode("utf-8")) / 3))
+
+
+def pack_batches(
+    texts: List[str], max_inputs: int, max_tokens: int
+) -> List[Tuple[int, int]]:
+    """Pack consecutive texts into (start, end) ranges within the given limits.
+
+    A single text larger than `max_tokens` gets a batch of its own.
+    """
+    batches: List[Tuple[int, int]] = []
+    start = 0
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if i > start and (
+            i - start >= max_inputs or batch_tokens + tokens > max_tokens
+        ):
+            batches.append((start, i))
+            start = i
+            batch_tokens = 0
+        batch_tokens += tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def build_documents(
+    chunks: List[str], embeddings: np.ndarray, ids: List[str]
+) -> List[Dict[str, Any]]:
+    """Build Azure AI Search documents from chunks and their embeddings."""
+    return [
+        {
+            "id": ids[i],
+            "content": chunk,
+            # Rows stay NumPy arrays until they are serialized for upload
+            "contentVector": embeddings[i],
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def merge_embeddings(
+    size: int, cached: Dict[int, np.ndarray], fetched: np.ndarray
+) -> np.ndarray:
+    """Combine cached vectors with freshly fetched ones, in input order.
+
+    `fetched` holds the vectors for the positions missing from `cached`.
+    """
+    if not cached:
+        return fetched
+    first = next(iter(cached.values()))
+    embeddings = np.empty((size, len(first)), dtype=first.dtype)
+    missing = [i for i in range(size) if i not in cached]
+    if missing:
+        embeddings[missing] = fetched
+    for i, vector in cached.items():
+        embeddings[i] = vector
+    return embeddings
+
+
+def embedding_options(settings: Settings) -> Dict[str, Any]:
+    """Options sent with every embeddings request.
+
+    Vectors are requested as base64, which decodes straight into an array
+    instead of a JSON list of floats.
+    """
+    options: Dict[str, Any] = {"encoding_format": "base64"}
+    if settings.embedding_dimensions:
+        options["dimensions"] = settings.embedding_dimensions
+    return options
+
+
+def cache_namespace(model: str, dimensions: int, dtype: str) -> str:
+    """Name under which vectors are cached; they differ by size and dtype."""
+    namespace = model
+    if dimensions:
+        namespace += f":{dimensions}d"
+    if dtype != "float32":
+        namespace += f":{dtype}"
+    return namespace
+
+
+def decode_embedding(value: str | List[float]) -> np.ndarray:
+    """Decode a base64 (little-endian float32) or list embedding."""
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype="<f4")
+    return np.asarray(value, dtype=np.float32)
+
+
+def read_embeddings(
+    responses: Iterable[Tuple[int, Any]], size: int, dtype: np.dtype
+) -> np.ndarray:
+    """Decode (offset, response) pairs into one (size, dim) array."""
+    embeddings: np.ndarray | None = None
+    for start, response in responses:
+        for item in response.data:
+            vector = decode_embedding(item.embedding)
+            if embeddings is None:
+                embeddings = np.empty((size, len(vector)), dtype=dtype)
+            embeddings[start + item.index] = vector
+    return embeddings  # type: ignore
+
+
+def record_embedding_usage(response: Any, inputs: int):
+    """Count an embeddings request, its inputs and the tokens it used."""
+    metrics.add("embedding_requests")
+    metrics.add("embedding_inputs", inputs)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.add("embedding_tokens", usage.prompt_tokens)
+
+
+def create_deployment_clients(
+    client_class: Any, settings: Settings, pool: DeploymentPool, http_client: Any
+) -> Dict[str, Any]:
+    """Create an SDK client per pool deployment, with SDK retries disabled."""
+    return {
+        member.deployment.name: client_class(
+            azure_endpoint=member.deployment.endpoint,
+            api_key=member.deployment.api_key,
             api_version=settings.aoai_api_version,
-            http_client=settings.global_http_client,
+            http_client=http_client,
+            max_retries=0,
         )
-        self.embedding_model = settings.aoai_embedding_model_name
+        for member in pool.members
+    }
+
+
+def index_url(settings: Settings) -> str:
+    return (
+        f"{settings.search_service_endpoint}/indexes/"
+        f"{settings.search_service_index_name}/docs/index"
+    )
+
+
+def search_url(settings: Settings) -> str:
+    return (
+        f"{settings.search_service_endpoint}/indexes/"
+        f"{settings.search_service_index_name}/docs/search"
+    )
+
+
+def hybrid_query_body(
+    text: str, vector: np.ndarray, top: int, filter: str | None
+) -> bytes:
+    """Serialize a query that runs keyword and vector search together.
+
+    Azure AI Search merges the two rankings with Reciprocal Rank Fusion.
+    """
+    body: Dict[str, Any] = {
+        "search": text,
+        "top": top,
+        "select": "id,content",
+        "vectorQueries": [
+            {"kind": "vector", "vector": vector, "fields": "contentVector", "k": top}
+        ],
+    }
+    if filter:
+        body["filter"] = filter
+    return dumps(body)
+
+
+def index_batch_body(documents: List[Dict[str, Any]], action: str) -> bytes:
+    """Serialize an index batch, writing vectors straight from their arrays.
+
+    Each document's JSON object is reused (see `EncodedDocument`) with the
+    action spliced in as its first member.
+    """
+    with metrics.span("serialize", documents=len(documents)):
+        # '{"@search.action":"upload"' without the closing brace
+        head = dumps({"@search.action": action})[:-1]
+        parts = []
+        for document in documents:
+            encoded = encode_document(document)
+            parts.append(head + (b"," if encoded != b"{}" else b"") + encoded[1:])
+        return b'{"value":[' + b",".join(parts) + b"]}"
+
+
+def parse_indexing_results(response: Any) -> List[IndexingResult]:
+    """Read per-document results from an index batch response."""
+    # 207 means some documents failed; the details are in the body
+    if response.status_code not in (200, 207):
+        response.raise_for_status()
+    return [
+        IndexingResult(
+            key=result["key"],
+            succeeded=result["status"],
+            status_code=result["statusCode"],
+            error_message=result.get("errorMessage"),
+        )
+        for result in loads(response.content)["value"]
+    ]
+
+
+def log_upload_report(report: UploadReport, total: int):
+    """Log failed documents and a summary of an upload."""
+    for key, error in report.failed.items():
+        logger.error(f"Failed to index document with key {key}. Error: {error}")
+
+    succeeded = len(report.succeeded)
+    if succeeded == total:
+        logger.info(
+            f"Successfully uploaded all documents in {len(report.batches)} batches "
+            f"with {report.retries} retries."
+        )
+    else:
+        logger.warning(f"Successfully uploaded {succeeded} out of {total} documents.")
+
+
+class AzureEmbeddingClient:
+    def __init__(
+        self,
+        settings: Settings,
+        cache: EmbeddingCache | None = None,
+        pool: DeploymentPool | None = None,
+    ):
+        """Without a pool, only the `AOAI_*` deployment is used."""
+        self.pool = pool
+        self.batch_size = settings.embedding_batch_size
+        self.batch_max_tokens = settings.embedding_batch_max_tokens
+        self.cache = cache
+        self.options = embedding_options(settings)
+        self.dtype = np.dtype(settings.embedding_dtype)
+        if pool is None:
+            self.client = AzureOpenAI(
+                azure_endpoint=settings.aoai_endpoint,
+                api_key=settings.aoai_api_key,
+                api_version=settings.aoai_api_version,
+                http_client=settings.global_http_client,
+            )
+            self.embedding_model = settings.aoai_embedding_model_name
+            self.cache_namespace = cache_namespace(
+                self.embedding_model,
+                settings.embedding_dimensions,
+                settings.embedding_dtype,
+            )
+            self._executor = None
+        else:
+            self.clients = create_deployment_clients(
+                AzureOpenAI, settings, pool, settings.global_http_client
+            )
+            self.embedding_model = pool.model
+            self.cache_namespace = cache_namespace(
+                pool.model, settings.embedding_dimensions, settings.embedding_dtype
+            )
+            # Batches are sent in parallel, spread over the deployments
+            self._executor = ThreadPoolExecutor(
+                max_workers=pool.max_concurrency, thread_name_prefix="embed"
+            )
 
-    def get_embedding(self, text: str) -> list[float]:
+    def get_embedding(self, text: str) -> List[float]:
         """Get embedding vector for the given text."""
-        logger.info(f"Requesting embedding for text (first 30 chars): '{text[:30]}...'")
-        response = self.client.embeddings.create(input=text, model=self.embedding_model)
+        logger.debug(
+            f"Requesting embedding for text (first 30 chars): '{text[:30]}...'"
+        )
+        response = self._create_embeddings(text, estimate_tokens(text))
         logger.debug("Embedding received successfully.")
-        return response.data[0].embedding
+        return decode_embedding(response.data[0].embedding).tolist()
 
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Get embedding vectors for many texts using multi-input requests.
 
-class AzureSearchClient:
-    def __init__(self, settings: Settings, embedding_client: AzureEmbeddingClient):
-        self.client = SearchClient(
-            endpoint=settings.search_service_endpoint,
-            index_name=settings.search_service_index_name,
-            credential=AzureKeyCredential(settings.search_service_api_key),
-            http_client=settings.global_http_client,
+        Returns an array of shape (len(texts), dim) in input order, of the
+        configured dtype.
+        Texts found in the cache are not sent to Azure OpenAI.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=self.dtype)
+
+        if self.cache is None:
+            return self._request_embeddings(texts)
+
+        keys, cached = self.cache.lookup(self.cache_namespace, texts)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        logger.debug(f"Embedding cache hits: {len(cached)}/{len(texts)}.")
+        metrics.add("embedding_cache_hits", len(cached))
+        if not missing:
+            return merge_embeddings(len(texts), cached, np.empty((0, 0)))
+
+        fetched = self._request_embeddings([texts[i] for i in missing])
+        self.cache.put_many({keys[i]: fetched[j] for j, i in enumerate(missing)})
+        return merge_embeddings(len(texts), cached, fetched)
+
+    def _request_embeddings(self, texts: List[str]) -> np.ndarray:
+        batches = pack_batches(texts, self.batch_size, self.batch_max_tokens)
+        logger.debug(
+            f"Requesting embeddings for {len(texts)} texts in {len(batches)} batches."
+        )
+
+        def request(batch: Tuple[int, int]) -> Tuple[int, Any]:
+            start, end = batch
+            with metrics.span("embed", inputs=end - start):
+                response = self._create_embeddings(
+                    texts[start:end],
+                    sum(estimate_tokens(text) for text in texts[start:end]),
+                )
+            record_embedding_usage(response, end - start)
+            return start, response
+
+        if self._executor is not None and len(batches) > 1:
+            responses = self._executor.map(request, batches)
+        else:
+            responses = map(request, batches)
+
+        embeddings = read_embeddings(responses, len(texts), self.dtype)
+        logger.debug("Embeddings received successfully.")
+        return embeddings
+
+    def _create_embeddings(self, texts: str | List[str], tokens: int) -> Any:
+        if self.pool is None:
+            return self.client.embeddings.create(
+                input=texts, model=self.embedding_model, **self.options
+            )
+        return self.pool.call(
+            lambda deployment: self.clients[
+                deployment.name
+            ].embeddings.with_raw_response.create(
+                input=texts, model=deployment.deployment, **self.options
+            ),
+            tokens,
+        )
+
+
+class SearchDocumentsClient:
+    """Indexes documents through the Azure AI Search REST API.
+
+    The SDK's `SearchClient` brings its own transport, so the REST API is
+    called directly to share the application's tuned `httpx.Client`.
+    """
+
+    def __init__(self, settings: Settings):
+        self.http_client = settings.global_http_client
+        self.index_url = index_url(settings)
+        self.search_url = search_url(settings)
+        self.api_version = settings.search_service_api_version
+        self.headers = {
+            "api-key": settings.search_service_api_key,
+            "Content-Type": "application/json",
+        }
+
+    def upload_documents(self, documents: List[Dict[str, Any]]) -> List[IndexingResult]:
+        return self._index_batch(documents, "upload")
+
+    def search(
+        self, text: str, vector: np.ndarray, top: int = 5, filter: str | None = None
+    ) -> List[SearchHit]:
+        """Hybrid keyword and vector search; `filter` is an OData expression."""
+        response = self.http_client.post(
+            self.search_url,
+            params={"api-version": self.api_version},
+            headers=self.headers,
+            content=hybrid_query_body(text, vector, top, filter),
+        )
+        if response.status_code == 400:
+            # e.g. an invalid filter, which is the caller's to fix
+            raise ValueError(loads(response.content)["error"]["message"])
+        response.raise_for_status()
+        return [
+            SearchHit(hit["id"], hit["content"], hit["@search.score"])
+            for hit in loads(response.content)["value"]
+        ]
+
+    def delete_documents(self, documents: List[Dict[str, Any]]) -> List[IndexingResult]:
+        return self._index_batch(documents, "delete")
+
+    def _index_batch(
+        self, documents: List[Dict[str, Any]], action: str
+    ) -> List[IndexingResult]:
+        response = self.http_client.post(
+            self.index_url,
+            params={"api-version": self.api_version},
+            headers=self.headers,
+            content=index_batch_body(documents, action),
         )
+        return parse_indexing_results(response)
+
+
+class AzureSearchClient:
+    def __init__(
+        self,
+        settings: Settings,
+        embedding_client: AzureEmbeddingClient,
+        manifest: ManifestStore | None = None,
+        artifacts: ArtifactStore | None = None,
+        backend: IndexBackend | None = None,
+    ):
+        """Documents go to Azure AI Search unless another `backend` is given."""
+        self.client = backend or SearchDocumentsClient(settings)
         self.embedding_client = embedding_client
+        self.manifest = manifest
+        self.artifacts = artifacts
+        self.upload_options = {
+            "max_documents": settings.upload_batch_size,
+            "max_bytes": settings.upload_batch_max_bytes,
+            "max_concurrency": settings.upload_max_concurrency,
+            "max_retries": settings.upload_max_retries,
+            "backoff_seconds": settings.upload_retry_backoff_seconds,
+        }
+
+    def index_document(
+        self,
+        document_key: str,
+        content_hash: str,
+        chunks: Iterable[str],
+        window: int = 256,
+    ) -> int:
+        """Incrementally index a document and return the number of uploaded chunks.
 
-    def index_chunks(self, chunks: list[str]):
-        """Index a list of text chunks into Azure AI Search."""
-        documents: List[Dict[str, Any]] = []
+        Only chunks that are not in the manifest yet are embedded and
+        uploaded, and chunks that disappeared from the document are deleted.
+        `chunks` may be a lazy stream; it is consumed `window` new chunks at
+        a time, so only one window of chunks and vectors is held in memory.
 
-        for i, chunk in enumerate(chunks):
-            embedding = self.embedding_client.get_embedding(chunk)
-            document: Dict[str, Any] = {
-                "id": str(i),
-                "content": chunk,
-                "contentVector": embedding,
-            }
-            documents.append(document)
+        Stale chunks are deleted and the new version is recorded only once
+        every chunk was extracted and uploaded. Otherwise the previous
+        version stays recorded and `IndexingFailed` (or the extraction
+        error) is raised.
+        """
+        if self.manifest is None:
+            raise RuntimeError("index_document requires a manifest store.")
 
-        logger.info(f"Uploading {len(documents)} documents to Azure AI Search.")
-        self.client.upload_documents(documents)  # type: ignore
-        logger.info("Successfully uploded documents.")
+        tracker = ReindexTracker(self.manifest, document_key, content_hash)
+        if tracker.unchanged:
+            logger.info(f"'{document_key}' is unchanged. Skipping indexing.")
+            return 0
 
+        new_ids: set[str] = set()
+        succeeded: set[str] = set()
         try:
-            results = self.client.upload_documents(documents)  # type: ignore
-
-            # Check results for any failures
-            successful_uploads = 0
-            for result in results:
-                if result.succeeded:
-                    successful_uploads += 1
-                else:
-                    # Log detailed error information
-                    logger.error(
-                        f"Failed to index document with key {result.key}. "
-                        f"Error: {result.error_message}, Status Code: {result.status_code}"
-                    )
-
-            if successful_uploads == len(documents):
-                logger.info("Successfully uploaded all documents.")
-            else:
-                logger.warning(
-                    f"Successfully uploaded {successful_uploads} out of {len(documents)} documents."
+            for window_items in batched(tracker.new_chunks(chunks), window):
+                ids = [chunk_id for chunk_id, _ in window_items]
+                new_ids.update(ids)
+                succeeded |= self.index_chunks(
+                    [chunk for _, chunk in window_items], ids
                 )
+        except BaseException:
+            tracker.abandon(succeeded)
+            raise
+        failed_ids = new_ids - succeeded
+        if failed_ids:
+            tracker.abandon(succeeded)
+            raise IndexingFailed(
+                f"{len(failed_ids)} chunks of '{document_key}' failed to upload."
+            )
+
+        stale_ids = tracker.stale_ids
+        logger.info(
+            f"'{document_key}': {len(new_ids)} new chunks, "
+            f"{len(stale_ids)} stale chunks out of {len(tracker.chunk_ids)}."
+        )
+        undeleted = self.delete_documents(stale_ids) if stale_ids else []
+
+        indexed_ids = tracker.commit(undeleted)
+        if self.artifacts is not None:
+            self.artifacts.commit(document_key, content_hash, indexed_ids)
+        return len(succeeded)
+
+    def delete_documents(self, ids: List[str]) -> List[str]:
+        """Delete documents from Azure AI Search by key.
+
+        Returns the keys that could not be deleted.
+        """
+        logger.info(f"Deleting {len(ids)} stale documents from Azure AI Search.")
+        uploader = BatchUploader(self.client.delete_documents, **self.upload_options)
+        report = uploader.upload([{"id": key} for key in ids])
+        log_upload_report(report, len(ids))
+        return list(report.failed)
 
+    def index_chunks(self, chunks: list[str], ids: List[str] | None = None) -> set[str]:
+        """Index a list of text chunks into Azure AI Search.
+
+        Returns the keys of the documents that were uploaded successfully.
+        """
+        if ids is None:
+            ids = make_chunk_ids("", chunks)
+        embeddings = self.embedding_client.get_embeddings(chunks)
+        if self.artifacts is not None:
+            self.artifacts.record(ids, chunks, embeddings)
+        documents = build_documents(chunks, embeddings, ids)
+
+        logger.debug(f"Uploading {len(documents)} documents to Azure AI Search.")
+        try:
+            uploader = BatchUploader(
+                self.client.upload_documents, **self.upload_options
+            )
+            report = uploader.upload(documents)
         except Exception as e:
             logger.error(
                 f"An error occurred during document upload: {e}", exc_info=True
             )
             raise
+
+        log_upload_report(report, len(documents))
+        return set(report.succeeded)
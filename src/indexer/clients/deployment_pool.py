@@ -0,0 +1,182 @@
+from functools import partial
+from typing import Any, Awaitable, Callable, List
+import asyncio
+import logging
+import threading
+import time
+
+from core.config import EmbeddingDeployment
+from core.metrics import metrics
+from .rate_limiter import RateLimiter, is_retryable, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Errors that point at the deployment (bad key, missing deployment) rather
+# than at the request, so other deployments may still succeed. Retrying
+# the same deployment would not help, so they only trigger a failover.
+DEPLOYMENT_ERROR_STATUS_CODES = {401, 403, 404}
+
+
+class PoolMember:
+    def __init__(self, deployment: EmbeddingDeployment, limiter: RateLimiter):
+        self.deployment = deployment
+        self.limiter = limiter
+        self.current_weight = 0.0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+
+class DeploymentPool:
+    """Routes embedding requests across deployments of the same model.
+
+    Each request goes to the deployment with the highest smooth weighted
+    round-robin score, where a deployment's weight is scaled by the share
+    of its quota that is left, so traffic follows both the configured
+    weights and live headroom. Every deployment has its own `RateLimiter`.
+
+    A deployment that throttles is ejected for its `Retry-After`; one that
+    fails is ejected for an exponentially growing time. The request is then
+    retried on another deployment, and the ejected one is re-admitted once
+    its time is up. When every deployment is ejected, callers wait for the
+    first to come back, except after an authentication or not-found error,
+    which is raised at once.
+    """
+
+    def __init__(
+        self,
+        deployments: List[EmbeddingDeployment],
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        eject_seconds: float = 5.0,
+        max_eject_seconds: float = 300.0,
+    ):
+        if not deployments:
+            raise ValueError("At least one deployment is required.")
+        models = {deployment.model for deployment in deployments if deployment.model}
+        if len(models) > 1:
+            raise ValueError(
+                f"All deployments must serve the same model, got {sorted(models)}."
+            )
+        # Embeddings are cached per model, not per deployment
+        self.model = models.pop() if models else deployments[0].deployment
+        self.members = [
+            PoolMember(
+                deployment,
+                RateLimiter(
+                    tokens_per_minute=deployment.tokens_per_minute,
+                    requests_per_minute=deployment.requests_per_minute,
+                    max_concurrency=max_concurrency,
+                    # Failed requests are retried on the pool level instead
+                    max_retries=0,
+                ),
+            )
+            for deployment in deployments
+        ]
+        self.max_concurrency = max_concurrency * len(deployments)
+        self.max_retries = max_retries
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def call(self, send: Callable[[EmbeddingDeployment], Any], tokens: int) -> Any:
+        """Send a request to a deployment and return the parsed response.
+
+        `send` makes the raw-response SDK call against the given deployment.
+        """
+        attempt = 0
+        while True:
+            member, wait = self._choose()
+            if member is None:
+                time.sleep(wait)
+                continue
+            try:
+                response = member.limiter.call(partial(send, member.deployment), tokens)
+            except Exception as e:
+                if not self._on_error(member, e, attempt):
+                    raise
+                attempt += 1
+                continue
+            self._on_success(member)
+            return response
+
+    async def call_async(
+        self, send: Callable[[EmbeddingDeployment], Awaitable[Any]], tokens: int
+    ) -> Any:
+        """Asyncio version of `call`."""
+        attempt = 0
+        while True:
+            member, wait = self._choose()
+            if member is None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                response = await member.limiter.call_async(
+                    partial(send, member.deployment), tokens
+                )
+            except Exception as e:
+                if not self._on_error(member, e, attempt):
+                    raise
+                attempt += 1
+                continue
+            self._on_success(member)
+            return response
+
+    def _choose(self) -> tuple[PoolMember | None, float]:
+        """Pick a deployment, or return how long until one is re-admitted."""
+        now = time.monotonic()
+        with self._lock:
+            available = [m for m in self.members if m.ejected_until <= now]
+            if not available:
+                return None, min(m.ejected_until for m in self.members) - now
+            total = 0.0
+            best = available[0]
+            for member in available:
+                # A saturated deployment keeps a small share, and its
+                # limiter delays the request until quota is back
+                weight = member.deployment.weight * max(member.limiter.headroom(), 0.01)
+                member.current_weight += weight
+                total += weight
+                if member.current_weight > best.current_weight:
+                    best = member
+            best.current_weight -= total
+            return best, 0.0
+
+    def _on_success(self, member: PoolMember):
+        if member.failures:
+            logger.info(f"Deployment {member.deployment.name} re-admitted.")
+            with self._lock:
+                member.failures = 0
+
+    def _on_error(self, member: PoolMember, error: Exception, attempt: int) -> bool:
+        """Eject the deployment if it is at fault; return True to retry."""
+        status_code = getattr(error, "status_code", None)
+        if not (is_retryable(error) or status_code in DEPLOYMENT_ERROR_STATUS_CODES):
+            return False
+
+        if status_code == 429:
+            headers = getattr(getattr(error, "response", None), "headers", {})
+            seconds = retry_after_seconds(headers) or self.eject_seconds
+        else:
+            seconds = min(
+                self.eject_seconds * 2**member.failures, self.max_eject_seconds
+            )
+        now = time.monotonic()
+        with self._lock:
+            member.failures += 1
+            member.ejected_until = max(member.ejected_until, now + seconds)
+            healthy = any(m.ejected_until <= now for m in self.members)
+        metrics.add("embedding_deployment_ejections")
+        logger.warning(
+            f"Ejected deployment {member.deployment.name} for {seconds:.1f}s "
+            f"after {error.__class__.__name__} (status {status_code})."
+        )
+        if attempt >= self.max_retries:
+            return False
+        if status_code in DEPLOYMENT_ERROR_STATUS_CODES and not healthy:
+            # No other deployment to fail over to; waiting would not help
+            return False
+        metrics.add("embedding_failovers")
+        return True
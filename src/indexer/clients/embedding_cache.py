@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from typing import Dict, List
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Content-addressed cache of embedding vectors.
+
+    Entries are keyed by a hash of (model name, text). Lookups go through a
+    bounded in-process LRU first, then through an optional SQLite file that
+    stores vectors as `dtype` (float32 or float16) blobs. The SQLite tier
+    runs in WAL mode, so several worker processes can share the same file,
+    and it evicts the least recently used entries once it grows past
+    `max_disk_bytes`. Its size is kept in a meta row that triggers update
+    in the same transaction as every insert, update and delete, so it is
+    shared by all processes and writes do not scan the table.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_memory_items: int = 10000,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        dtype: str = "float32",
+    ):
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.dtype = np.dtype(dtype)
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: sqlite3.Connection | None = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access"
+                " ON embeddings (last_access)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta ("
+                " name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            # Files created before the total was kept start from a full scan
+            self._db.execute(
+                "INSERT OR IGNORE INTO cache_meta"
+                " SELECT 'disk_bytes', COALESCE(SUM(size), 0) FROM embeddings"
+            )
+            for event, change in (
+                ("INSERT", "NEW.size"),
+                ("DELETE", "-OLD.size"),
+                ("UPDATE OF size", "NEW.size - OLD.size"),
+            ):
+                name = event.split()[0].lower()
+                self._db.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS embeddings_size_{name}"
+                    f" AFTER {event} ON embeddings BEGIN"
+                    f" UPDATE cache_meta SET value = value + {change}"
+                    " WHERE name = 'disk_bytes'; END"
+                )
+            self._db.commit()
+            logger.info(f"Embedding cache persisted at '{path}'.")
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Return the cache key for a text embedded with the given model."""
+        digest = hashlib.sha256(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for the given keys, skipping misses."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            missing = [key for key in keys if key not in found]
+            if missing and self._db is not None:
+                from_disk = self._read_disk(missing)
+                self.disk_hits += len(from_disk)
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+                found.update(from_disk)
+
+            self.misses += len(set(keys) - found.keys())
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Store vectors in both tiers."""
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, np.asarray(vector, dtype=self.dtype))
+            if self._db is not None:
+                now = time.time()
+                rows = []
+                for key, vector in items.items():
+                    blob = np.asarray(vector, dtype=self.dtype).tobytes()
+                    rows.append((key, blob, len(blob), now))
+                # An upsert fires the update trigger for rewritten entries,
+                # where REPLACE would delete them without firing a trigger
+                self._db.executemany(
+                    "INSERT INTO embeddings VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET vector = excluded.vector,"
+                    " size = excluded.size, last_access = excluded.last_access",
+                    rows,
+                )
+                # Still in the write transaction, so no other process can
+                # change the size before it is checked and entries are evicted
+                excess = self._disk_bytes() - self.max_disk_bytes
+                if excess > 0:
+                    self._evict_disk(excess)
+                self._db.commit()
+
+    def lookup(
+        self, model: str, texts: List[str]
+    ) -> tuple[List[str], Dict[int, np.ndarray]]:
+        """Return the keys for `texts` and the cached vectors by text position."""
+        keys = [self.make_key(model, text) for text in texts]
+        found = self.get_many(keys)
+        return keys, {i: found[key] for i, key in enumerate(keys) if key in found}
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current size of the memory tier."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        assert self._db is not None
+        found: Dict[str, np.ndarray] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            part = keys[i : i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                part,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=self.dtype)
+        if found:
+            now = time.time()
+            self._db.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._db.commit()
+        return found
+
+    def _disk_bytes(self) -> int:
+        assert self._db is not None
+        (total,) = self._db.execute(
+            "SELECT value FROM cache_meta WHERE name = 'disk_bytes'"
+        ).fetchone()
+        return total
+
+    def _evict_disk(self, excess: int):
+        assert self._db is not None
+        rows = self._db.execute("SELECT key, size FROM embeddings ORDER BY last_access")
+        evicted: List[str] = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            evicted.append(key)
+            excess -= size
+        self._db.executemany(
+            "DELETE FROM embeddings WHERE key = ?", [(key,) for key in evicted]
+        )
+        logger.info(f"Evicted {len(evicted)} entries from the embedding cache.")
@@ -0,0 +1,415 @@
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, List, Dict, Any, Iterable, Iterator, TypeVar
+import asyncio
+import logging
+import threading
+
+from core.artifacts import ArtifactStore
+from core.manifest import (
+    IndexingFailed,
+    ManifestStore,
+    ReindexTracker,
+    make_chunk_ids,
+)
+from .async_clients import AsyncAzureEmbeddingClient
+from .backends import AsyncIndexBackend
+from .clients import build_documents, estimate_tokens, log_upload_report
+from .uploader import AsyncBatchUploader, UploadReport
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def iterate_in_thread(items: Iterator[T], buffer: int = 64) -> AsyncIterator[T]:
+    """Consume a blocking iterator in a worker thread.
+
+    At most `buffer` items are read ahead, so a slow consumer applies
+    backpressure to the producer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=buffer)
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                if cancelled.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            asyncio.run_coroutine_threadsafe(queue.put(_DONE), loop).result()
+        except BaseException as e:
+            asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while (item := await queue.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        # Unblock a producer waiting on a full queue
+        while not queue.empty():
+            queue.get_nowait()
+        await producer
+
+
+@dataclass
+class DocumentResult:
+    """Outcome of indexing one document of a bulk upload."""
+
+    document_key: str
+    status: str = "indexed"
+    chunks: int = 0
+    uploaded: int = 0
+    deleted: int = 0
+    error: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AsyncIndexingPipeline:
+    """Embeds and uploads chunks concurrently.
+
+    Up to `max_concurrent_embeddings` embedding requests are kept in flight.
+    Embedded documents are collected into upload batches, which are uploaded
+    while later chunks are still being embedded. Each upload batch is further
+    split by payload size and retried per failed key by `AsyncBatchUploader`.
+    Chunks may arrive as a stream; reading pauses while all embedding and
+    upload slots are busy, so memory is bounded by that window.
+    """
+
+    def __init__(
+        self,
+        embedding_client: AsyncAzureEmbeddingClient,
+        search_client: AsyncIndexBackend,
+        max_concurrent_embeddings: int = 4,
+        max_concurrent_uploads: int = 2,
+        upload_batch_size: int = 100,
+        manifest: ManifestStore | None = None,
+        upload_max_bytes: int = 8 * 1024 * 1024,
+        upload_max_retries: int = 3,
+        upload_retry_backoff_seconds: float = 1.0,
+        artifacts: ArtifactStore | None = None,
+    ):
+        self.embedding_client = embedding_client
+        self.search_client = search_client
+        self.max_concurrent_embeddings = max_concurrent_embeddings
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.upload_batch_size = upload_batch_size
+        self.manifest = manifest
+        self.artifacts = artifacts
+        upload_options = {
+            "max_documents": upload_batch_size,
+            "max_bytes": upload_max_bytes,
+            # Concurrency across batches is bounded by the pipeline itself
+            "max_concurrency": 1,
+            "max_retries": upload_max_retries,
+            "backoff_seconds": upload_retry_backoff_seconds,
+        }
+        self.uploader = AsyncBatchUploader(
+            search_client.upload_documents, **upload_options
+        )
+        self.deleter = AsyncBatchUploader(
+            search_client.delete_documents, **upload_options
+        )
+
+    async def index_document(
+        self, document_key: str, content_hash: str, chunks: Iterable[str]
+    ) -> int:
+        """Incrementally index a document and return the number of uploaded chunks.
+
+        See `AzureSearchClient.index_document`. A blocking `chunks` stream
+        (e.g. one that extracts pages) is consumed in a worker thread.
+        """
+        if self.manifest is None:
+            raise RuntimeError("index_document requires a manifest store.")
+
+        tracker = ReindexTracker(self.manifest, document_key, content_hash)
+        if tracker.unchanged:
+            logger.info(f"'{document_key}' is unchanged. Skipping indexing.")
+            return 0
+
+        new_ids: set[str] = set()
+
+        def new_chunks() -> Iterator[tuple[str, str]]:
+            for chunk_id, chunk in tracker.new_chunks(chunks):
+                new_ids.add(chunk_id)
+                yield chunk_id, chunk
+
+        uploaded: set[str] = set()
+        try:
+            succeeded = await self._index(
+                iterate_in_thread(new_chunks()), uploaded=uploaded
+            )
+        except BaseException:
+            tracker.abandon(uploaded)
+            raise
+        failed_ids = new_ids - succeeded
+        if failed_ids:
+            tracker.abandon(succeeded)
+            raise IndexingFailed(
+                f"{len(failed_ids)} chunks of '{document_key}' failed to upload."
+            )
+
+        stale_ids = tracker.stale_ids
+        logger.info(
+            f"'{document_key}': {len(new_ids)} new chunks, "
+            f"{len(stale_ids)} stale chunks out of {len(tracker.chunk_ids)}."
+        )
+        self._commit(tracker, await self._delete(stale_ids))
+        return len(succeeded)
+
+    async def index_documents(
+        self,
+        documents: Iterable[tuple[str, str, Iterable[str]]],
+        max_parallel_documents: int = 4,
+    ) -> List[DocumentResult]:
+        """Incrementally index many (document_key, content_hash, chunks) at once.
+
+        Up to `max_parallel_documents` chunk streams are read concurrently,
+        each in its own worker thread, and merged into one stream, so
+        embedding and upload batches are filled across document boundaries.
+        `documents` itself is also consumed lazily from a worker thread.
+        """
+        if self.manifest is None:
+            raise RuntimeError("index_documents requires a manifest store.")
+
+        results: List[DocumentResult] = []
+        finished: List[tuple[ReindexTracker, set[str], DocumentResult]] = []
+        # Documents whose chunks could not all be read
+        abandoned: List[tuple[ReindexTracker, set[str]]] = []
+        # Every document being indexed, to release them all if indexing fails
+        started: List[tuple[ReindexTracker, set[str]]] = []
+        merged: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.upload_batch_size)
+        document_slots = asyncio.Semaphore(max_parallel_documents)
+        document_iterator = iter(documents)
+
+        async def read_document(
+            document_key: str, content_hash: str, chunks: Iterable[str]
+        ):
+            result = DocumentResult(document_key)
+            results.append(result)
+            new_ids: set[str] = set()
+            tracker: ReindexTracker | None = None
+            try:
+                tracker = ReindexTracker(self.manifest, document_key, content_hash)  # type: ignore
+                if tracker.unchanged:
+                    result.status = "unchanged"
+                    return
+                started.append((tracker, new_ids))
+                async for chunk_id, chunk in iterate_in_thread(
+                    tracker.new_chunks(chunks)
+                ):
+                    new_ids.add(chunk_id)
+                    await merged.put((chunk_id, chunk))
+                result.chunks = len(tracker.chunk_ids)
+                if not tracker.chunk_ids:
+                    result.status = "failed"
+                    result.error = "No text could be extracted."
+                    return
+                finished.append((tracker, new_ids, result))
+            except Exception as e:
+                logger.error(f"Failed to read '{document_key}': {e}", exc_info=True)
+                result.status = "failed"
+                result.error = str(e)
+                if tracker is not None:
+                    abandoned.append((tracker, new_ids))
+            finally:
+                document_slots.release()
+
+        async def produce():
+            tasks: List[asyncio.Task[None]] = []
+            try:
+                while True:
+                    await document_slots.acquire()
+                    document = await asyncio.to_thread(next, document_iterator, None)
+                    if document is None:
+                        break
+                    tasks.append(asyncio.create_task(read_document(*document)))
+                await asyncio.gather(*tasks)
+            except BaseException as e:
+                for task in tasks:
+                    task.cancel()
+                if not isinstance(e, asyncio.CancelledError):
+                    await merged.put(_DONE)
+                raise
+            await merged.put(_DONE)
+
+        async def items() -> AsyncIterator[tuple[str, str]]:
+            while (item := await merged.get()) is not _DONE:
+                yield item
+
+        producer = asyncio.create_task(produce())
+        uploaded: set[str] = set()
+        try:
+            succeeded = await self._index(items(), uploaded=uploaded)
+        except BaseException:
+            producer.cancel()
+            # Record what was uploaded, so the next run can remove it
+            for tracker, new_ids in started:
+                tracker.abandon(new_ids & uploaded)
+            raise
+        # Surface errors raised while iterating `documents`
+        await producer
+
+        # Only documents whose chunks were all uploaded replace their
+        # previous version; the others keep it and are retried next time
+        for tracker, new_ids in abandoned:
+            tracker.abandon(new_ids & succeeded)
+        complete: List[ReindexTracker] = []
+        for tracker, new_ids, result in finished:
+            failed_ids = new_ids - succeeded
+            result.uploaded = len(new_ids) - len(failed_ids)
+            if failed_ids:
+                result.status = "failed"
+                result.error = f"{len(failed_ids)} chunks failed to upload."
+                tracker.abandon(new_ids & succeeded)
+            else:
+                result.deleted = len(tracker.stale_ids)
+                complete.append(tracker)
+        undeleted = set(
+            await self._delete(
+                [key for tracker in complete for key in tracker.stale_ids]
+            )
+        )
+        for tracker in complete:
+            self._commit(
+                tracker, [key for key in tracker.stale_ids if key in undeleted]
+            )
+
+        logger.info(
+            f"Indexed {len(results)} documents: "
+            f"{sum(r.status == 'indexed' for r in results)} indexed, "
+            f"{sum(r.status == 'unchanged' for r in results)} unchanged, "
+            f"{sum(r.status == 'failed' for r in results)} failed."
+        )
+        return results
+
+    async def index_chunks(
+        self, chunks: List[str], ids: List[str] | None = None
+    ) -> int:
+        """Index chunks and return the number of successfully uploaded documents."""
+        if ids is None:
+            ids = make_chunk_ids("", chunks)
+
+        async def items() -> AsyncIterator[tuple[str, str]]:
+            for item in zip(ids, chunks):
+                yield item
+
+        return len(await self._index(items()))
+
+    async def _index(
+        self,
+        items: AsyncIterator[tuple[str, str]],
+        uploaded: set[str] | None = None,
+    ) -> set[str]:
+        """Embed and upload (chunk_id, chunk) pairs, returning the uploaded keys.
+
+        Keys are also added to `uploaded` as each batch finishes, so they
+        are known even if a later batch raises.
+        """
+        if uploaded is None:
+            uploaded = set()
+        batch_size = self.embedding_client.batch_size
+        batch_max_tokens = self.embedding_client.batch_max_tokens
+        embed_slots = asyncio.Semaphore(self.max_concurrent_embeddings)
+        upload_slots = asyncio.Semaphore(self.max_concurrent_uploads)
+        embed_tasks: set[asyncio.Task[None]] = set()
+        upload_tasks: List[asyncio.Task[UploadReport]] = []
+        pending: List[Dict[str, Any]] = []
+        total = 0
+
+        def flush(force: bool = False):
+            while len(pending) >= self.upload_batch_size or (force and pending):
+                batch = pending[: self.upload_batch_size]
+                del pending[: self.upload_batch_size]
+                upload_tasks.append(
+                    asyncio.create_task(self._upload(batch, upload_slots, uploaded))
+                )
+
+        async def embed(ids: List[str], chunks: List[str]):
+            try:
+                embeddings = await self.embedding_client.embed_batch(chunks)
+            finally:
+                embed_slots.release()
+            if self.artifacts is not None:
+                self.artifacts.record(ids, chunks, embeddings)
+            pending.extend(build_documents(chunks, embeddings, ids))
+            flush()
+
+        async def submit(ids: List[str], chunks: List[str]):
+            # Backpressure: wait for a free embedding slot and for uploads
+            # to catch up before reading more chunks
+            await embed_slots.acquire()
+            while (
+                running := [task for task in upload_tasks if not task.done()]
+            ) and len(running) > self.max_concurrent_uploads * 2:
+                await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            task = asyncio.create_task(embed(ids, chunks))
+            embed_tasks.add(task)
+
+        batch_ids: List[str] = []
+        batch_chunks: List[str] = []
+        batch_tokens = 0
+        try:
+            async for chunk_id, chunk in items:
+                total += 1
+                tokens = estimate_tokens(chunk)
+                if batch_chunks and (
+                    len(batch_chunks) >= batch_size
+                    or batch_tokens + tokens > batch_max_tokens
+                ):
+                    await submit(batch_ids, batch_chunks)
+                    batch_ids, batch_chunks, batch_tokens = [], [], 0
+                batch_ids.append(chunk_id)
+                batch_chunks.append(chunk)
+                batch_tokens += tokens
+            if batch_chunks:
+                await submit(batch_ids, batch_chunks)
+
+            await asyncio.gather(*embed_tasks)
+            flush(force=True)
+            reports = await asyncio.gather(*upload_tasks)
+        except BaseException:
+            for task in [*embed_tasks, *upload_tasks]:
+                task.cancel()
+            raise
+
+        report = UploadReport()
+        for upload_report in reports:
+            report.batches.extend(upload_report.batches)
+
+        logger.info(f"Indexed {total} chunks.")
+        log_upload_report(report, total)
+        return set(report.succeeded)
+
+    def _commit(self, tracker: ReindexTracker, undeleted_ids: List[str]):
+        indexed_ids = tracker.commit(undeleted_ids)
+        if self.artifacts is not None:
+            self.artifacts.commit(
+                tracker.document_key, tracker.content_hash, indexed_ids
+            )
+
+    async def _delete(self, ids: List[str]) -> List[str]:
+        """Delete documents by key, returning the keys that were not deleted."""
+        if not ids:
+            return []
+        report = await self.deleter.upload([{"id": key} for key in ids])
+        log_upload_report(report, len(ids))
+        return list(report.failed)
+
+    async def _upload(
+        self,
+        documents: List[Dict[str, Any]],
+        semaphore: asyncio.Semaphore,
+        uploaded: set[str],
+    ) -> UploadReport:
+        async with semaphore:
+            report = await self.uploader.upload(documents)
+        uploaded.update(report.succeeded)
+        return report
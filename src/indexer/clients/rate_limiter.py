@@ -0,0 +1,302 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Mapping
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from openai import APIConnectionError
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_SERVER_ERRORS = {500, 502, 503, 504}
+
+
+class TokenBucket:
+    """A bucket refilled continuously at `per_minute` units per minute.
+
+    It holds at most one minute of quota. Reservations may drive the level
+    negative; the caller then waits until the debt is paid off, so
+    concurrent callers queue up in reservation order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units and return how long to wait before using them."""
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.level
+
+    def refund(self, amount: float, now: float):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def limit_to(self, remaining: float, now: float):
+        """Trust the server's count of what is left in the current window."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> float | None:
+    """Read `retry-after-ms` or `retry-after` (in seconds) from response headers."""
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return True for throttling, transient server and connection errors."""
+    status_code = getattr(error, "status_code", None)
+    return (
+        status_code == 429
+        or status_code in RETRYABLE_SERVER_ERRORS
+        or isinstance(error, APIConnectionError)
+    )
+
+
+class RateLimiter:
+    """Keeps embedding requests within Azure OpenAI quotas.
+
+    One instance is shared by every embedding client in the worker, sync or
+    async. Before each request, the estimated tokens and one request are
+    reserved from token buckets sized by the tokens-per-minute and
+    requests-per-minute quotas (0 disables a bucket). The buckets are
+    corrected from `x-ratelimit-remaining-*` headers and from the actual
+    token usage. Concurrency follows AIMD: it grows by one per window of
+    successful requests and halves on a 429, whose `Retry-After` pauses
+    all callers. The SDK's own retries should be disabled, so that retries
+    go through the limiter too.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int = 0,
+        requests_per_minute: int = 0,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+        default_retry_after: float = 1.0,
+    ):
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.default_retry_after = default_retry_after
+        self._lock = threading.Lock()
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self._limit))
+
+    def headroom(self) -> float:
+        """Fraction of the quota left, from 0 (paused or exhausted) to 1."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return 0.0
+            levels = [
+                bucket.available(now) / bucket.capacity
+                for bucket in (self.tokens, self.requests)
+                if bucket is not None
+            ]
+        return max(0.0, min(levels, default=1.0))
+
+    def call(self, send: Callable[[], Any], tokens: int) -> Any:
+        """Send a request that returns an SDK raw response, and parse it."""
+        attempt = 0
+        while True:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                time.sleep(delay)
+            self._enter()
+            try:
+                raw = send()
+            except Exception as e:
+                retry_delay = self._on_error(e, tokens, attempt)
+                if retry_delay is None:
+                    raise
+            else:
+                return self._on_success(raw, tokens)
+            finally:
+                self._exit()
+            attempt += 1
+            time.sleep(retry_delay)
+
+    async def call_async(self, send: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """Asyncio version of `call`."""
+        attempt = 0
+        while True:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._enter_async()
+            try:
+                raw = await send()
+            except Exception as e:
+                retry_delay = self._on_error(e, tokens, attempt)
+                if retry_delay is None:
+                    raise
+            else:
+                return self._on_success(raw, tokens)
+            finally:
+                self._exit()
+            attempt += 1
+            await asyncio.sleep(retry_delay)
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self._blocked_until - now, 0.0)
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now))
+        if delay > 0:
+            metrics.add("rate_limit_waits")
+            metrics.add("rate_limit_wait_seconds", delay)
+        return delay
+
+    def _refund(self, tokens: float, requests: float, now: float):
+        if self.tokens is not None and tokens > 0:
+            self.tokens.refund(tokens, now)
+        if self.requests is not None and requests > 0:
+            self.requests.refund(requests, now)
+
+    def _enter(self):
+        with self._lock:
+            if self._try_enter():
+                return
+            entered = threading.Event()
+            self._waiters.append(entered.set)
+        entered.wait()
+
+    async def _enter_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_enter():
+                return
+            entered = loop.create_future()
+
+            def wake():
+                loop.call_soon_threadsafe(self._hand_over, entered)
+
+            self._waiters.append(wake)
+        try:
+            await entered
+        except asyncio.CancelledError:
+            if entered.done() and not entered.cancelled():
+                self._exit()
+            raise
+
+    def _hand_over(self, entered: asyncio.Future):
+        if entered.cancelled():
+            # The waiter gave up before its slot arrived
+            self._exit()
+        else:
+            entered.set_result(None)
+
+    def _try_enter(self) -> bool:
+        if self._in_flight < self.concurrency_limit:
+            self._in_flight += 1
+            return True
+        return False
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._wake()
+
+    def _wake(self):
+        while self._waiters and self._in_flight < self.concurrency_limit:
+            self._in_flight += 1
+            self._waiters.popleft()()
+
+    def _on_success(self, raw: Any, tokens: int) -> Any:
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        used = getattr(usage, "prompt_tokens", None)
+        headers = raw.headers
+        with self._lock:
+            now = time.monotonic()
+            if isinstance(used, int):
+                self._refund(tokens - used, 0, now)
+            self._apply_remaining(headers, now)
+            # Additive increase: one more slot per window of successes
+            self._limit = min(
+                float(self.max_concurrency), self._limit + 1 / self._limit
+            )
+            self._wake()
+        return response
+
+    def _on_error(self, error: Exception, tokens: int, attempt: int) -> float | None:
+        """Return how long to wait before retrying, or None to give up."""
+        status_code = getattr(error, "status_code", None)
+        if status_code == 429:
+            metrics.add("rate_limit_throttled")
+            headers = getattr(getattr(error, "response", None), "headers", {})
+            self._on_throttled(headers, tokens)
+            # The pause is applied to every caller by the next reservation
+            return 0.0 if attempt < self.max_retries else None
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = self.backoff_seconds * 2**attempt
+        return delay * random.uniform(0.5, 1.0)
+
+    def _on_throttled(self, headers: Mapping[str, str], tokens: int):
+        retry_after = retry_after_seconds(headers) or self.default_retry_after
+        with self._lock:
+            now = time.monotonic()
+            # Throttled requests do not use quota
+            self._refund(tokens, 1, now)
+            self._apply_remaining(headers, now)
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            # Multiplicative decrease, once per burst of 429s
+            if now - self._last_decrease >= retry_after:
+                self._limit = max(float(self.min_concurrency), self._limit / 2)
+                self._last_decrease = now
+                logger.warning(
+                    f"Embedding requests throttled; pausing {retry_after:.1f}s and "
+                    f"reducing concurrency to {self.concurrency_limit}."
+                )
+
+    def _apply_remaining(self, headers: Mapping[str, str], now: float):
+        for name, bucket in (
+            ("x-ratelimit-remaining-tokens", self.tokens),
+            ("x-ratelimit-remaining-requests", self.requests),
+        ):
+            if bucket is not None and name in headers:
+                try:
+                    bucket.limit_to(float(headers[name]), now)
+                except ValueError:
+                    pass
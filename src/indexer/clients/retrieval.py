@@ -0,0 +1,77 @@
+from typing import Callable, List, Tuple
+import logging
+
+import numpy as np
+
+from core.metrics import metrics
+from core.ttl_cache import Coalescer, TtlCache
+from core.vector_store import SearchHit
+from .backends import SearchBackend
+from .clients import AzureEmbeddingClient
+
+logger = logging.getLogger(__name__)
+
+# (query, filter, top, index revision)
+ResultKey = Tuple[str, str, int, int]
+
+
+class Retriever:
+    """Answers search queries with hybrid keyword and vector search.
+
+    Query vectors are kept in `embedding_cache` and results in
+    `result_cache`, whose keys include the index `revision`, so indexing
+    any document makes earlier results unreachable. Identical queries
+    arriving while one is running wait for its results instead of calling
+    Azure OpenAI and the search backend again.
+    """
+
+    def __init__(
+        self,
+        embedding_client: AzureEmbeddingClient,
+        backend: SearchBackend,
+        embedding_cache: TtlCache[str, np.ndarray] | None = None,
+        result_cache: TtlCache[ResultKey, List[SearchHit]] | None = None,
+        revision: Callable[[], int] = lambda: 0,
+    ):
+        self.embedding_client = embedding_client
+        self.backend = backend
+        self.embedding_cache = (
+            embedding_cache if embedding_cache is not None else TtlCache(max_items=0)
+        )
+        self.result_cache = (
+            result_cache if result_cache is not None else TtlCache(max_items=0)
+        )
+        self.revision = revision
+        self._searches: Coalescer[ResultKey, List[SearchHit]] = Coalescer(
+            lambda: metrics.add("search_coalesced")
+        )
+
+    def search(
+        self, query: str, top: int = 5, filter: str | None = None
+    ) -> List[SearchHit]:
+        metrics.add("search_requests")
+        key = (query, filter or "", top, self.revision())
+        hits = self.result_cache.get(key)
+        if hits is not None:
+            metrics.add("search_result_cache_hits")
+            return hits
+        return self._searches.run(key, lambda: self._search(key))
+
+    def embed_query(self, query: str) -> np.ndarray:
+        vector = self.embedding_cache.get(query)
+        if vector is not None:
+            metrics.add("query_embedding_cache_hits")
+            return vector
+        vector = self.embedding_client.get_embeddings([query])[0]
+        self.embedding_cache.put(query, vector)
+        return vector
+
+    def _search(self, key: ResultKey) -> List[SearchHit]:
+        query, filter, top, _ = key
+        with metrics.span("search", top=top):
+            hits = self.backend.search(
+                query, self.embed_query(query), top, filter or None
+            )
+        self.result_cache.put(key, hits)
+        logger.debug(f"Search for '{query[:30]}' returned {len(hits)} hits.")
+        return hits
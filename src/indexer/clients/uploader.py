@@ -0,0 +1,280 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+import asyncio
+import logging
+import time
+
+from azure.search.documents.models import IndexingResult
+
+from core.metrics import metrics
+from core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Per-document status codes that Azure AI Search documents as transient
+RETRYABLE_STATUS_CODES = {409, 422, 429, 500, 502, 503}
+
+Document = Dict[str, Any]
+SendBatch = Callable[[List[Document]], Iterable[IndexingResult]]
+AsyncSendBatch = Callable[[List[Document]], Awaitable[Iterable[IndexingResult]]]
+
+
+class EncodedDocument(dict):
+    """A document that keeps its JSON encoding.
+
+    Batches are sized and request bodies built from the same bytes, so
+    each vector goes through the JSON encoder once, however many times
+    its batch is retried.
+    """
+
+    def __init__(self, document: Document):
+        super().__init__(document)
+        self.encoded = dumps(document)
+
+
+def encode_document(document: Document) -> bytes:
+    """Return a document's JSON, reusing the encoding of an `EncodedDocument`."""
+    if isinstance(document, EncodedDocument):
+        return document.encoded
+    return dumps(document)
+
+
+def document_size(document: Document) -> int:
+    """Return the size of a document once serialized into a request body."""
+    return len(encode_document(document))
+
+
+def split_batches(
+    documents: List[Document], max_documents: int, max_bytes: int
+) -> List[Tuple[List[Document], int]]:
+    """Split documents into consecutive batches within count and size limits.
+
+    Returns each batch with its serialized size. Documents are returned as
+    `EncodedDocument`s, so their encoding is reused for the request body.
+    A single document larger than `max_bytes` gets a batch of its own.
+    """
+    batches: List[Tuple[List[Document], int]] = []
+    batch: List[Document] = []
+    batch_bytes = 0
+    for document in documents:
+        if not isinstance(document, EncodedDocument):
+            document = EncodedDocument(document)
+        size = len(document.encoded)
+        if batch and (len(batch) >= max_documents or batch_bytes + size > max_bytes):
+            batches.append((batch, batch_bytes))
+            batch = []
+            batch_bytes = 0
+        batch.append(document)
+        batch_bytes += size
+    if batch:
+        batches.append((batch, batch_bytes))
+    return batches
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return True if a failed request is worth retrying as a whole."""
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(
+        response, "status_code", None
+    )
+    # Errors without a status code are connection-level failures
+    return status_code is None or status_code in RETRYABLE_STATUS_CODES
+
+
+@dataclass
+class BatchReport:
+    """Outcome of uploading one batch, including retries."""
+
+    batch_index: int
+    document_count: int
+    payload_bytes: int
+    attempts: int = 0
+    succeeded: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+
+@dataclass
+class UploadReport:
+    """Outcome of an upload, one entry per batch."""
+
+    batches: List[BatchReport] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[str]:
+        return [key for batch in self.batches for key in batch.succeeded]
+
+    @property
+    def failed(self) -> Dict[str, str]:
+        return {
+            key: error for batch in self.batches for key, error in batch.failed.items()
+        }
+
+    @property
+    def retries(self) -> int:
+        return sum(max(batch.attempts - 1, 0) for batch in self.batches)
+
+
+def record_batch(report: BatchReport):
+    """Count an uploaded batch with its retries and failed documents."""
+    metrics.add("upload_batches")
+    metrics.add("upload_documents", report.document_count)
+    metrics.add("upload_bytes", report.payload_bytes)
+    metrics.add("upload_retries", max(report.attempts - 1, 0))
+    metrics.add("upload_failures", len(report.failed))
+
+
+class _BatchState:
+    """Tracks which documents of a batch still have to be sent."""
+
+    def __init__(
+        self,
+        batch_index: int,
+        batch: Tuple[List[Document], int],
+        max_retries: int,
+    ):
+        self.max_retries = max_retries
+        self.remaining, payload_bytes = batch
+        self.report = BatchReport(
+            batch_index=batch_index,
+            document_count=len(self.remaining),
+            payload_bytes=payload_bytes,
+        )
+
+    def record_results(self, results: Iterable[IndexingResult]):
+        """Keep only the documents whose result failed with a transient error.
+
+        Documents the service returned no result for are retried too, or
+        failed once no attempts remain.
+        """
+        by_key = {document["id"]: document for document in self.remaining}
+        can_retry = self.report.attempts <= self.max_retries
+        retry: List[Document] = []
+        for result in results:
+            document = by_key.pop(result.key, None)
+            if document is None:
+                continue
+            if result.succeeded:
+                self.report.succeeded.append(result.key)
+            elif result.status_code in RETRYABLE_STATUS_CODES and can_retry:
+                retry.append(document)
+            else:
+                self.report.failed[result.key] = (
+                    f"{result.status_code}: {result.error_message}"
+                )
+        for key, document in by_key.items():
+            if can_retry:
+                retry.append(document)
+            else:
+                self.report.failed[key] = "No indexing result was returned."
+        self.remaining = retry
+
+    def record_error(self, error: Exception):
+        """Fail all remaining documents unless the whole request can be retried."""
+        if is_retryable(error) and self.report.attempts <= self.max_retries:
+            return
+        for document in self.remaining:
+            self.report.failed[document["id"]] = str(error)
+        self.remaining = []
+
+
+class _BaseBatchUploader:
+    def __init__(
+        self,
+        send: Any,
+        max_documents: int = 1000,
+        max_bytes: int = 8 * 1024 * 1024,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+    ):
+        self.send = send
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    def backoff(self, attempts: int) -> float:
+        return self.backoff_seconds * 2 ** (attempts - 1)
+
+
+class BatchUploader(_BaseBatchUploader):
+    """Uploads documents in size-aware batches from a thread pool.
+
+    Batches are sent concurrently through `send` (e.g.
+    `SearchDocumentsClient.upload_documents`, which shares one connection
+    pool).
+    Only documents whose `IndexingResult` failed with a transient status
+    are retried, with exponential backoff.
+    """
+
+    send: SendBatch
+
+    def upload(self, documents: List[Document]) -> UploadReport:
+        batches = split_batches(documents, self.max_documents, self.max_bytes)
+        logger.debug(f"Uploading {len(documents)} documents in {len(batches)} batches.")
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            reports = list(
+                executor.map(self._upload_batch, range(len(batches)), batches)
+            )
+        return UploadReport(reports)
+
+    def _upload_batch(
+        self, batch_index: int, batch: Tuple[List[Document], int]
+    ) -> BatchReport:
+        state = _BatchState(batch_index, batch, self.max_retries)
+        started = time.perf_counter()
+        with metrics.span("upload", documents=state.report.document_count):
+            while state.remaining:
+                if state.report.attempts:
+                    time.sleep(self.backoff(state.report.attempts))
+                state.report.attempts += 1
+                try:
+                    state.record_results(self.send(state.remaining))
+                except Exception as e:
+                    logger.warning(f"Upload of batch {batch_index} failed: {e}")
+                    state.record_error(e)
+        state.report.elapsed_seconds = time.perf_counter() - started
+        record_batch(state.report)
+        return state.report
+
+
+class AsyncBatchUploader(_BaseBatchUploader):
+    """Asyncio version of `BatchUploader` for an async `send`."""
+
+    send: AsyncSendBatch
+
+    async def upload(self, documents: List[Document]) -> UploadReport:
+        batches = split_batches(documents, self.max_documents, self.max_bytes)
+        logger.debug(f"Uploading {len(documents)} documents in {len(batches)} batches.")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def upload_batch(batch_index: int, batch: Tuple[List[Document], int]):
+            async with semaphore:
+                return await self._upload_batch(batch_index, batch)
+
+        reports = await asyncio.gather(
+            *(upload_batch(i, batch) for i, batch in enumerate(batches))
+        )
+        return UploadReport(list(reports))
+
+    async def _upload_batch(
+        self, batch_index: int, batch: Tuple[List[Document], int]
+    ) -> BatchReport:
+        state = _BatchState(batch_index, batch, self.max_retries)
+        started = time.perf_counter()
+        with metrics.span("upload", documents=state.report.document_count):
+            while state.remaining:
+                if state.report.attempts:
+                    await asyncio.sleep(self.backoff(state.report.attempts))
+                state.report.attempts += 1
+                try:
+                    state.record_results(await self.send(state.remaining))
+                except Exception as e:
+                    logger.warning(f"Upload of batch {batch_index} failed: {e}")
+                    state.record_error(e)
+        state.report.elapsed_seconds = time.perf_counter() - started
+        record_batch(state.report)
+        return state.report
@@ -0,0 +1,193 @@
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Memory held regardless of the file: a window of chunks and their vectors
+BASE_COST_BYTES = 16 * 1024 * 1024
+# The upload, the extractor's copy of it and the text extracted from it
+FILE_COST_MULTIPLIER = 3
+# Share of the worker's memory limit that requests may use together
+MEMORY_BUDGET_SHARE = 0.5
+
+
+def estimate_cost(file_bytes: int, pages: int = 0, bytes_per_page: int = 0) -> int:
+    """Estimate the peak memory of indexing one upload, in bytes."""
+    return BASE_COST_BYTES + file_bytes * FILE_COST_MULTIPLIER + pages * bytes_per_page
+
+
+def memory_limit() -> int:
+    """The container's memory limit, or the host's physical memory."""
+    try:
+        with open("/sys/fs/cgroup/memory.max") as file:
+            value = file.read().strip()
+        if value != "max":
+            return int(value)
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return 4 * 1024**3
+
+
+def default_memory_budget() -> int:
+    """Half of the memory limit, split across the host's worker processes."""
+    workers = int(os.environ.get("FUNCTIONS_WORKER_PROCESS_COUNT", "1") or 1)
+    return int(memory_limit() * MEMORY_BUDGET_SHARE / max(workers, 1))
+
+
+class AdmissionRejected(Exception):
+    """The worker is too busy; the request should be retried later."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds the memory and number of requests a worker handles at once.
+
+    A request is admitted when it fits in both `max_concurrent` and
+    `memory_budget_bytes`; one larger than the whole budget is admitted
+    only while the worker is otherwise idle. Otherwise it waits, in
+    arrival order, for up to `queue_timeout_seconds` with at most
+    `max_queued` others, and is rejected with a suggested retry delay
+    after that, so load sheds before the worker runs out of memory.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        max_concurrent: int = 4,
+        max_queued: int = 16,
+        queue_timeout_seconds: float = 30.0,
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._condition = threading.Condition()
+        self._waiting: Deque[object] = deque()
+        self._in_use = 0
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        # Moving average of how long requests hold their admission
+        self._hold_seconds = 1.0
+
+    def acquire(self, cost: int, timeout: float | None = None):
+        """Wait until `cost` bytes may be used, or raise `AdmissionRejected`.
+
+        `timeout` defaults to `queue_timeout_seconds`. With `math.inf`, the
+        caller (e.g. a background job) waits for as long as it takes and
+        is never rejected.
+        """
+        if timeout is None:
+            timeout = self.queue_timeout_seconds
+        started = time.monotonic()
+        ticket = object()
+        with self._condition:
+            if not self._waiting and self._fits(cost):
+                self._admit(cost)
+                return
+            if len(self._waiting) >= self.max_queued and timeout != math.inf:
+                self._reject("the admission queue is full")
+            self._waiting.append(ticket)
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self._waiting[0] is ticket and self._fits(cost),
+                    None if timeout == math.inf else timeout,
+                )
+            finally:
+                self._waiting.remove(ticket)
+                # The next waiter may now be at the head of the queue
+                self._condition.notify_all()
+            if not admitted:
+                self._reject(f"no capacity within {timeout:g}s")
+            self._admit(cost)
+        metrics.observe("admission_wait", time.monotonic() - started)
+
+    def release(self, cost: int, held_seconds: float = 0.0):
+        with self._condition:
+            self._in_use -= cost
+            self._active -= 1
+            self._hold_seconds += 0.2 * (held_seconds - self._hold_seconds)
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, cost: int, timeout: float | None = None) -> Iterator[None]:
+        self.acquire(cost, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(cost, time.monotonic() - started)
+
+    @asynccontextmanager
+    async def admit_async(self, cost: int) -> AsyncIterator[None]:
+        """`admit` for coroutines; waiting happens in a worker thread."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire, cost))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # Give back an admission granted after the caller went away
+            acquiring.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or self.release(cost)
+            )
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(cost, time.monotonic() - started)
+
+    def utilization(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "memory_in_use_bytes": self._in_use,
+                "memory_utilization": round(
+                    self._in_use / max(self.memory_budget_bytes, 1), 3
+                ),
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "queued": len(self._waiting),
+                "max_queued": self.max_queued,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "average_hold_seconds": round(self._hold_seconds, 3),
+            }
+
+    def _fits(self, cost: int) -> bool:
+        if self._active == 0:
+            return True
+        return (
+            self._active < self.max_concurrent
+            and self._in_use + cost <= self.memory_budget_bytes
+        )
+
+    def _admit(self, cost: int):
+        self._in_use += cost
+        self._active += 1
+        self._admitted += 1
+        metrics.add("admission_admitted")
+
+    def _reject(self, reason: str):
+        self._rejected += 1
+        metrics.add("admission_rejected")
+        # Roughly when enough running requests will have finished
+        retry_after = math.ceil(
+            self._hold_seconds * (len(self._waiting) + 1) / max(self.max_concurrent, 1)
+        )
+        logger.warning(f"Rejected a request: {reason}.")
+        raise AdmissionRejected(f"Too busy: {reason}.", max(retry_after, 1))
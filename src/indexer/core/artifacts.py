@@ -0,0 +1,258 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from core.manifest import document_digest
+
+logger = logging.getLogger(__name__)
+
+# Rows of a document are buffered until this many are written as one part
+PART_ROWS = 512
+
+Rows = Tuple[List[str], List[str], np.ndarray]
+
+
+def pack_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Store strings as one UTF-8 byte column plus offsets."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    return [
+        raw[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+def write_part(path: str, ids: List[str], chunks: List[str], vectors: np.ndarray):
+    """Write rows as a compressed NPZ file, atomically."""
+    ids_data, ids_offsets = pack_strings(ids)
+    text_data, text_offsets = pack_strings(chunks)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        np.savez_compressed(
+            file,
+            ids_data=ids_data,
+            ids_offsets=ids_offsets,
+            text_data=text_data,
+            text_offsets=text_offsets,
+            vectors=vectors,
+        )
+    os.replace(temp_path, path)
+
+
+def read_part(path: str) -> Rows:
+    with np.load(path) as part:
+        return (
+            unpack_strings(part["ids_data"], part["ids_offsets"]),
+            unpack_strings(part["text_data"], part["text_offsets"]),
+            part["vectors"],
+        )
+
+
+@dataclass
+class DocumentSnapshot:
+    """The manifest of a document's artifacts: which parts hold its rows."""
+
+    document_key: str
+    content_hash: str
+    model: str
+    chunks: int
+    # Chunks indexed before artifacts were kept, so they have no row
+    missing: int = 0
+    parts: List[str] = field(default_factory=list)
+    updated_at: float = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return self.missing == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ArtifactStore:
+    """Keeps each document's chunks, chunk IDs and vectors on disk.
+
+    Snapshots are compressed NPZ parts (one column each for IDs, texts and
+    vectors) plus a JSON manifest per document, under `root`. They let an
+    index be rebuilt or migrated without extracting or embedding again.
+
+    Writes happen on a background thread: `record` and `commit` only queue
+    work, so they stay off the request path. Rows are routed to their
+    document by the chunk ID prefix, so batches may mix documents. At
+    `commit`, the rows of chunks that did not change are carried over from
+    the previous snapshot and rows of removed chunks are dropped.
+    """
+
+    def __init__(self, root: str, model: str = "", part_rows: int = PART_ROWS):
+        self.root = root
+        self.model = model
+        self.part_rows = part_rows
+        os.makedirs(os.path.join(root, "documents"), exist_ok=True)
+        os.makedirs(os.path.join(root, "parts"), exist_ok=True)
+        self._queue: queue.Queue[Any] = queue.Queue()
+        self._buffers: Dict[str, List[Rows]] = {}
+        self._thread = threading.Thread(
+            target=self._run, name="artifact-writer", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, ids: List[str], chunks: List[str], vectors: np.ndarray):
+        """Queue embedded rows for writing."""
+        if ids:
+            self._queue.put(("record", (list(ids), list(chunks), vectors)))
+
+    def commit(self, document_key: str, content_hash: str, chunk_ids: List[str]):
+        """Queue writing the snapshot of a document's current chunks."""
+        self._queue.put(("commit", (document_key, content_hash, list(chunk_ids))))
+
+    def flush(self):
+        """Wait until queued work is written."""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def snapshot(self, document_key: str) -> DocumentSnapshot | None:
+        path = self._snapshot_path(document_digest(document_key))
+        try:
+            with open(path, encoding="utf-8") as file:
+                return DocumentSnapshot(**json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def iter_snapshots(self) -> Iterator[DocumentSnapshot]:
+        directory = os.path.join(self.root, "documents")
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name), encoding="utf-8") as file:
+                    yield DocumentSnapshot(**json.load(file))
+
+    def iter_rows(self, snapshot: DocumentSnapshot) -> Iterator[Rows]:
+        """Yield (ids, chunks, vectors) for a document, one part at a time."""
+        directory = self._parts_dir(document_digest(snapshot.document_key))
+        for name in snapshot.parts:
+            yield read_part(os.path.join(directory, name))
+
+    def _run(self):
+        while (item := self._queue.get()) is not None:
+            action, payload = item
+            try:
+                if action == "record":
+                    self._record(*payload)
+                else:
+                    self._commit(*payload)
+            except Exception as e:
+                logger.error(f"Failed to write artifacts: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def _record(self, ids: List[str], chunks: List[str], vectors: np.ndarray):
+        rows_by_digest: Dict[str, List[int]] = {}
+        for i, chunk_id in enumerate(ids):
+            rows_by_digest.setdefault(chunk_id.split("-", 1)[0], []).append(i)
+        for digest, rows in rows_by_digest.items():
+            buffer = self._buffers.setdefault(digest, [])
+            buffer.append(
+                ([ids[i] for i in rows], [chunks[i] for i in rows], vectors[rows])
+            )
+            if sum(len(part_ids) for part_ids, _, _ in buffer) >= self.part_rows:
+                self._flush_buffer(digest)
+
+    def _flush_buffer(self, digest: str):
+        buffer = self._buffers.pop(digest, [])
+        if not buffer:
+            return
+        directory = self._parts_dir(digest)
+        os.makedirs(directory, exist_ok=True)
+        write_part(
+            os.path.join(directory, self._part_name()),
+            [chunk_id for ids, _, _ in buffer for chunk_id in ids],
+            [chunk for _, chunks, _ in buffer for chunk in chunks],
+            np.concatenate([vectors for _, _, vectors in buffer]),
+        )
+
+    def _commit(self, document_key: str, content_hash: str, chunk_ids: List[str]):
+        digest = document_digest(document_key)
+        self._flush_buffer(digest)
+        directory = self._parts_dir(digest)
+        os.makedirs(directory, exist_ok=True)
+        previous = self.snapshot(document_key)
+        # Rows written since the last commit follow the previous parts
+        staged = sorted(
+            name
+            for name in os.listdir(directory)
+            if name.endswith(".npz")
+            and (previous is None or name not in previous.parts)
+        )
+        candidates = (previous.parts if previous else []) + staged
+
+        wanted = set(chunk_ids)
+        taken: set[str] = set()
+        parts: List[str] = []
+        # Newest rows win when a chunk was embedded more than once
+        for name in reversed(candidates):
+            ids, chunks, vectors = read_part(os.path.join(directory, name))
+            remaining = wanted - taken
+            rows = [i for i, chunk_id in enumerate(ids) if chunk_id in remaining]
+            taken.update(ids[i] for i in rows)
+            if len(rows) == len(ids):
+                parts.append(name)
+            elif rows:
+                filtered = self._part_name()
+                write_part(
+                    os.path.join(directory, filtered),
+                    [ids[i] for i in rows],
+                    [chunks[i] for i in rows],
+                    vectors[rows],
+                )
+                parts.append(filtered)
+        parts.reverse()
+
+        snapshot = DocumentSnapshot(
+            document_key=document_key,
+            content_hash=content_hash,
+            model=self.model,
+            chunks=len(wanted),
+            missing=len(wanted - taken),
+            parts=parts,
+            updated_at=time.time(),
+        )
+        path = self._snapshot_path(digest)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(snapshot.to_dict(), file, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+        for name in set(os.listdir(directory)) - set(parts):
+            os.remove(os.path.join(directory, name))
+        if snapshot.missing:
+            logger.warning(
+                f"Artifacts of '{document_key}' lack {snapshot.missing} of "
+                f"{snapshot.chunks} chunks indexed before artifacts were kept."
+            )
+        logger.debug(f"Saved artifacts of '{document_key}' in {len(parts)} parts.")
+
+    def _part_name(self) -> str:
+        # Sortable by creation time, so staged parts keep their order
+        return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.npz"
+
+    def _parts_dir(self, digest: str) -> str:
+        return os.path.join(self.root, "parts", digest)
+
+    def _snapshot_path(self, digest: str) -> str:
+        return os.path.join(self.root, "documents", f"{digest}.json")
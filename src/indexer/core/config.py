@@ -1,31 +1,328 @@
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List
+from urllib.parse import urlparse
+import json
 import os
-import httpx
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def service_url(name: str, template: str) -> str:
+    """Build a service URL from its resource name.
+
+    A full URL (e.g. a private endpoint or a local stand-in) is used as-is.
+    """
+    if name.startswith(("http://", "https://")):
+        return name.rstrip("/")
+    return template.format(name)
+
+
+def job_store_path() -> str:
+    """Where queued jobs are kept; readable without loading all settings."""
+    return os.environ.get(
+        "JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "index_jobs.sqlite")
+    )
+
+
+@dataclass
+class EmbeddingDeployment:
+    """An Azure OpenAI deployment that serves the embedding model."""
+
+    endpoint: str
+    deployment: str
+    api_key: str
+    weight: float = 1.0
+    tokens_per_minute: int = 0
+    requests_per_minute: int = 0
+    # Underlying model, e.g. "text-embedding-3-large"; vectors are only
+    # interchangeable between deployments of the same model
+    model: str = ""
+
+    @property
+    def name(self) -> str:
+        return f"{urlparse(self.endpoint).netloc}/{self.deployment}"
+
+
+def parse_deployments(
+    value: str, default: EmbeddingDeployment
+) -> List[EmbeddingDeployment]:
+    """Parse `AOAI_DEPLOYMENTS`, a JSON list of deployment objects.
+
+    Missing fields are taken from `default`, the deployment configured by
+    the `AOAI_*` variables. An empty value means only `default`.
+    """
+    if not value.strip():
+        return [default]
+    entries = json.loads(value)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("AOAI_DEPLOYMENTS must be a non-empty JSON list.")
+    known = {field.name for field in fields(EmbeddingDeployment)}
+    deployments = []
+    for entry in entries:
+        unknown = set(entry) - known
+        if unknown:
+            raise ValueError(f"Unknown AOAI_DEPLOYMENTS fields: {sorted(unknown)}")
+        if "endpoint" in entry:
+            entry = {
+                **entry,
+                "endpoint": service_url(
+                    entry["endpoint"], "https://{}.openai.azure.com/"
+                ),
+            }
+        deployments.append(EmbeddingDeployment(**{**asdict(default), **entry}))
+    return deployments
+
+
 class Settings:
     """Mnages this application's settings."""
 
     def __init__(self):
         try:
-            self.search_service_endpoint = (
-                f"https://{os.environ['SEARCH_SERVICE_ENDPOINT']}.search.windows.net"
+            self.search_service_endpoint = service_url(
+                os.environ["SEARCH_SERVICE_ENDPOINT"], "https://{}.search.windows.net"
             )
             self.search_service_api_key = os.environ["SEARCH_SERVICE_API_KEY"]
             self.search_service_index_name = os.environ["SEARCH_SERVICE_INDEX_NAME"]
+            self.search_service_api_version = os.environ.get(
+                "SEARCH_SERVICE_API_VERSION", "2024-07-01"
+            )
 
-            self.aoai_endpoint = (
-                f"https://{os.environ['AOAI_ENDPOINT']}.openai.azure.com/"
+            self.aoai_endpoint = service_url(
+                os.environ["AOAI_ENDPOINT"], "https://{}.openai.azure.com/"
             )
             self.aoai_api_version = os.environ["AOAI_API_VERSION"]
             self.aoai_api_key = os.environ["AOAI_API_KEY"]
             self.aoai_embedding_model_name = os.environ["AOAI_EMBEDDING_MODEL_NAME"]
             self.PERFORM_INDEXING = os.environ.get("PERFORM_INDEXING", "true")
+            self.metrics_exporter = os.environ.get("METRICS_EXPORTER", "none").lower()
+
+            self.embedding_batch_size = int(
+                os.environ.get("EMBEDDING_BATCH_SIZE", "16")
+            )
+            self.embedding_batch_max_tokens = int(
+                os.environ.get("EMBEDDING_BATCH_MAX_TOKENS", "64000")
+            )
+            self.embedding_max_concurrency = int(
+                os.environ.get("EMBEDDING_MAX_CONCURRENCY", "4")
+            )
+            self.embedding_max_retries = int(
+                os.environ.get("EMBEDDING_MAX_RETRIES", "5")
+            )
+            # Deployment quotas; 0 leaves the rate unlimited
+            self.aoai_tokens_per_minute = int(
+                os.environ.get("AOAI_TOKENS_PER_MINUTE", "0")
+            )
+            self.aoai_requests_per_minute = int(
+                os.environ.get("AOAI_REQUESTS_PER_MINUTE", "0")
+            )
+            self.aoai_deployments = parse_deployments(
+                os.environ.get("AOAI_DEPLOYMENTS", ""),
+                EmbeddingDeployment(
+                    endpoint=self.aoai_endpoint,
+                    deployment=self.aoai_embedding_model_name,
+                    api_key=self.aoai_api_key,
+                    tokens_per_minute=self.aoai_tokens_per_minute,
+                    requests_per_minute=self.aoai_requests_per_minute,
+                    model=os.environ.get("AOAI_EMBEDDING_MODEL", ""),
+                ),
+            )
+            # Request shorter vectors (text-embedding-3 models); 0 keeps the
+            # model's full size. Must match the index's vector field.
+            self.embedding_dimensions = int(os.environ.get("EMBEDDING_DIMENSIONS", "0"))
+            # Vectors are held as float32, or float16 to halve memory for
+            # indexes with Collection(Edm.Half) vector fields
+            self.embedding_dtype = os.environ.get("EMBEDDING_DTYPE", "float32").lower()
+            if self.embedding_dtype not in ("float32", "float16"):
+                raise ValueError("EMBEDDING_DTYPE must be float32 or float16")
+            self.embedding_cache_path = os.environ.get("EMBEDDING_CACHE_PATH", "")
+            self.embedding_cache_memory_items = int(
+                os.environ.get("EMBEDDING_CACHE_MEMORY_ITEMS", "10000")
+            )
+            self.embedding_cache_max_bytes = int(
+                os.environ.get("EMBEDDING_CACHE_MAX_BYTES", str(1024**3))
+            )
+            self.pdf_parallel_page_threshold = int(
+                os.environ.get("PDF_PARALLEL_PAGE_THRESHOLD", "200")
+            )
+            self.pdf_extraction_workers = int(
+                os.environ.get("PDF_EXTRACTION_WORKERS", "0")
+            )
+            self.extract_segment_bytes = int(
+                os.environ.get("EXTRACT_SEGMENT_BYTES", str(256 * 1024))
+            )
+            # "off", "document" (within each document) or "global" (also
+            # against chunks kept by other documents)
+            self.dedup_mode = os.environ.get("DEDUP_MODE", "document").lower()
+            if self.dedup_mode not in ("off", "document", "global"):
+                raise ValueError("DEDUP_MODE must be off, document or global")
+            # Estimated Jaccard similarity above which chunks are near
+            # duplicates; 1 keeps only exact duplicate detection
+            self.dedup_near_threshold = float(
+                os.environ.get("DEDUP_NEAR_THRESHOLD", "0.9")
+            )
+            self.dedup_num_perm = int(os.environ.get("DEDUP_NUM_PERM", "128"))
+            self.dedup_shingle_size = int(os.environ.get("DEDUP_SHINGLE_SIZE", "5"))
+            self.dedup_min_chars = int(os.environ.get("DEDUP_MIN_CHARS", "50"))
+            self.dedup_store_path = os.environ.get(
+                "DEDUP_STORE_PATH",
+                os.path.join(tempfile.gettempdir(), "dedup_signatures.sqlite"),
+            )
+            self.stream_window_chunks = int(
+                os.environ.get("STREAM_WINDOW_CHUNKS", "256")
+            )
+            self.index_manifest_path = os.environ.get(
+                "INDEX_MANIFEST_PATH",
+                os.path.join(tempfile.gettempdir(), "index_manifest.sqlite"),
+            )
+            # "azure" (Azure AI Search) or "local" (a memory-mapped vector
+            # store under LOCAL_INDEX_PATH, for offline runs and edge hosts)
+            self.index_backend = os.environ.get("INDEX_BACKEND", "azure").lower()
+            if self.index_backend not in ("azure", "local"):
+                raise ValueError("INDEX_BACKEND must be azure or local")
+            self.local_index_path = os.environ.get(
+                "LOCAL_INDEX_PATH", os.path.join(tempfile.gettempdir(), "local_index")
+            )
+            # Clusters for approximate search over the local index; 0 keeps
+            # search exact
+            self.local_index_ivf_lists = int(
+                os.environ.get("LOCAL_INDEX_IVF_LISTS", "0")
+            )
+            self.local_index_ivf_probes = int(
+                os.environ.get("LOCAL_INDEX_IVF_PROBES", "8")
+            )
+            # Directory of chunk and vector snapshots for replay; empty
+            # disables them
+            self.artifact_store_path = os.environ.get("ARTIFACT_STORE_PATH", "")
+            # Query vectors and search results are cached per worker; 0
+            # items disables a cache. Indexing invalidates results early.
+            self.query_embedding_cache_items = int(
+                os.environ.get("QUERY_EMBEDDING_CACHE_ITEMS", "10000")
+            )
+            self.query_embedding_cache_ttl_seconds = float(
+                os.environ.get("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "86400")
+            )
+            self.search_result_cache_items = int(
+                os.environ.get("SEARCH_RESULT_CACHE_ITEMS", "1000")
+            )
+            self.search_result_cache_ttl_seconds = float(
+                os.environ.get("SEARCH_RESULT_CACHE_TTL_SECONDS", "300")
+            )
+            self.search_max_top = int(os.environ.get("SEARCH_MAX_TOP", "50"))
+            # Per-worker admission control of indexing requests; a budget of
+            # 0 uses half of the memory limit split across worker processes
+            self.admission_memory_budget_bytes = int(
+                os.environ.get("ADMISSION_MEMORY_BUDGET_BYTES", "0")
+            )
+            self.admission_max_concurrent = int(
+                os.environ.get("ADMISSION_MAX_CONCURRENT", "4")
+            )
+            self.admission_max_queued = int(
+                os.environ.get("ADMISSION_MAX_QUEUED", "16")
+            )
+            self.admission_queue_timeout_seconds = float(
+                os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30")
+            )
+            # Estimated memory per PDF page, on top of a multiple of the
+            # file size
+            self.admission_bytes_per_page = int(
+                os.environ.get("ADMISSION_BYTES_PER_PAGE", str(256 * 1024))
+            )
+            self.bulk_max_parallel_documents = int(
+                os.environ.get("BULK_MAX_PARALLEL_DOCUMENTS", "4")
+            )
+            self.job_store_path = job_store_path()
+            self.job_workers = int(os.environ.get("JOB_WORKERS", "1"))
+            # Finished jobs are deleted after this long
+            self.job_retention_seconds = float(
+                os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600))
+            )
+            # Resumable uploads, sent in parts and assembled into a job
+            self.upload_store_path = os.environ.get(
+                "UPLOAD_STORE_PATH",
+                os.path.join(tempfile.gettempdir(), "index_uploads.sqlite"),
+            )
+            self.upload_part_bytes = int(
+                os.environ.get("UPLOAD_PART_BYTES", str(4 * 1024 * 1024))
+            )
+            self.upload_max_bytes = int(
+                os.environ.get("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024))
+            )
+            self.upload_ttl_seconds = float(
+                os.environ.get("UPLOAD_TTL_SECONDS", str(24 * 3600))
+            )
+            self.http2_enabled = (
+                os.environ.get("HTTP2_ENABLED", "true").lower() == "true"
+            )
+            self.http_connect_timeout_seconds = float(
+                os.environ.get("HTTP_CONNECT_TIMEOUT_SECONDS", "5")
+            )
+            self.http_read_timeout_seconds = float(
+                os.environ.get("HTTP_READ_TIMEOUT_SECONDS", "120")
+            )
+            self.http_pool_timeout_seconds = float(
+                os.environ.get("HTTP_POOL_TIMEOUT_SECONDS", "30")
+            )
+            self.http_keepalive_expiry_seconds = float(
+                os.environ.get("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")
+            )
+            self.http_default_pool_size = int(
+                os.environ.get("HTTP_DEFAULT_POOL_SIZE", "10")
+            )
+            # JSON object of host -> max connections, overriding the sizes
+            # derived from the configured concurrency
+            self.http_pool_sizes = {
+                host: int(size)
+                for host, size in json.loads(
+                    os.environ.get("HTTP_POOL_SIZES", "") or "{}"
+                ).items()
+            }
+            self.upload_batch_size = int(os.environ.get("UPLOAD_BATCH_SIZE", "100"))
+            self.upload_batch_max_bytes = int(
+                os.environ.get("UPLOAD_BATCH_MAX_BYTES", str(8 * 1024 * 1024))
+            )
+            self.upload_max_concurrency = int(
+                os.environ.get("UPLOAD_MAX_CONCURRENCY", "2")
+            )
+            self.upload_max_retries = int(os.environ.get("UPLOAD_MAX_RETRIES", "3"))
+            self.upload_retry_backoff_seconds = float(
+                os.environ.get("UPLOAD_RETRY_BACKOFF_SECONDS", "1.0")
+            )
         except KeyError as e:
             logger.critical(f"Missing environment variable {e}", exc_info=True)
             raise e
+        except ValueError as e:
+            logger.critical(f"Invalid environment variable value: {e}", exc_info=True)
+            raise e
+
+        from core.http import HttpClientFactory
 
-        self.global_http_client = httpx.Client()
-        self.async_http_client = httpx.AsyncClient()
+        http_clients = HttpClientFactory(
+            self.connection_pool_sizes(),
+            default_pool_size=self.http_default_pool_size,
+            http2=self.http2_enabled,
+            connect_timeout=self.http_connect_timeout_seconds,
+            read_timeout=self.http_read_timeout_seconds,
+            write_timeout=self.http_read_timeout_seconds,
+            pool_timeout=self.http_pool_timeout_seconds,
+            keepalive_expiry=self.http_keepalive_expiry_seconds,
+        )
+        self.global_http_client = http_clients.create_client()
+        self.async_http_client = http_clients.create_async_client()
+
+    def connection_pool_sizes(self) -> Dict[str, int]:
+        """Connections per host, sized for the concurrency used against it."""
+        from core.http import host_of, pool_sizes
+
+        hosts = [
+            (
+                host_of(self.search_service_endpoint),
+                self.upload_max_concurrency * self.bulk_max_parallel_documents,
+            )
+        ]
+        hosts += [
+            (host_of(deployment.endpoint), self.embedding_max_concurrency)
+            for deployment in self.aoai_deployments
+        ]
+        return pool_sizes(hosts, self.http_pool_sizes)
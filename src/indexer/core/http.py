@@ -0,0 +1,195 @@
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Iterable
+from urllib.parse import urlparse
+import logging
+import time
+
+import httpx
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events that mark the start of sending a request
+SEND_STARTED = (
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+HEADERS_RECEIVED = (
+    "http11.receive_response_headers.complete",
+    "http2.receive_response_headers.complete",
+)
+CONNECT_STARTED = "connection.connect_tcp.started"
+
+
+class RequestTimer:
+    """Splits a request's latency using httpcore trace events.
+
+    - pool wait: until a connection is picked or opening one starts
+    - connect: opening a new connection, including TLS and HTTP/2 setup
+    - wire: from sending the request until the response headers arrive
+    """
+
+    def __init__(self, forward: Callable[[str, Dict[str, Any]], Any] | None = None):
+        self.forward = forward
+        self.started = time.perf_counter()
+        self.connect_started: float | None = None
+        self.send_started: float | None = None
+        self.waited = False
+
+    def on_event(self, name: str):
+        now = time.perf_counter()
+        if not self.waited and (name == CONNECT_STARTED or name in SEND_STARTED):
+            self.waited = True
+            metrics.observe("http_pool_wait", now - self.started)
+        if name == CONNECT_STARTED:
+            self.connect_started = now
+            metrics.add("http_connections_opened")
+        elif name in SEND_STARTED:
+            if self.connect_started is not None:
+                metrics.observe("http_connect", now - self.connect_started)
+            self.send_started = now
+        elif name in HEADERS_RECEIVED and self.send_started is not None:
+            metrics.observe("http_wire", now - self.send_started)
+            metrics.add("http_requests")
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Records pool wait, connect and wire time of every request."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if metrics.enabled:
+            timer = RequestTimer(request.extensions.get("trace"))
+
+            def trace(name: str, info: Dict[str, Any]):
+                timer.on_event(name)
+                if timer.forward is not None:
+                    timer.forward(name, info)
+
+            request.extensions["trace"] = trace
+        return self.transport.handle_request(request)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Asyncio version of `InstrumentedTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if metrics.enabled:
+            timer = RequestTimer(request.extensions.get("trace"))
+
+            async def trace(name: str, info: Dict[str, Any]):
+                timer.on_event(name)
+                if timer.forward is not None:
+                    await timer.forward(name, info)
+
+            request.extensions["trace"] = trace
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def http2_available(enabled: bool) -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)."""
+    if enabled and find_spec("h2") is None:
+        logger.warning("HTTP/2 is enabled but 'h2' is not installed; using HTTP/1.1.")
+        return False
+    return enabled
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc
+
+
+def pool_sizes(
+    hosts: Iterable[tuple[str, int]], overrides: Dict[str, int]
+) -> Dict[str, int]:
+    """Sum the connections needed per host, then apply explicit overrides.
+
+    `hosts` lists (host, connections) for every service the clients call;
+    a host serving several of them (e.g. two deployments on one resource)
+    gets the sum.
+    """
+    sizes: Dict[str, int] = {}
+    for host, connections in hosts:
+        sizes[host] = sizes.get(host, 0) + connections
+    sizes.update(overrides)
+    return sizes
+
+
+class HttpClientFactory:
+    """Builds the shared sync and async `httpx` clients.
+
+    Every service host gets its own connection pool, sized for the
+    concurrency the application uses against it, so a burst of uploads
+    cannot take the connections that embedding requests need. Other hosts
+    share a default pool.
+    """
+
+    def __init__(
+        self,
+        pool_sizes: Dict[str, int],
+        default_pool_size: int = 10,
+        http2: bool = True,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        write_timeout: float = 120.0,
+        pool_timeout: float = 30.0,
+        keepalive_expiry: float = 30.0,
+    ):
+        self.pool_sizes = pool_sizes
+        self.default_pool_size = default_pool_size
+        self.http2 = http2_available(http2)
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        )
+        self.keepalive_expiry = keepalive_expiry
+
+    def limits(self, size: int) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=size,
+            max_keepalive_connections=size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def create_client(self) -> httpx.Client:
+        def transport(size: int) -> httpx.BaseTransport:
+            return InstrumentedTransport(
+                httpx.HTTPTransport(limits=self.limits(size), http2=self.http2)
+            )
+
+        return httpx.Client(
+            timeout=self.timeout,
+            transport=transport(self.default_pool_size),
+            mounts={
+                f"all://{host}": transport(size)
+                for host, size in self.pool_sizes.items()
+            },
+        )
+
+    def create_async_client(self) -> httpx.AsyncClient:
+        def transport(size: int) -> httpx.AsyncBaseTransport:
+            return AsyncInstrumentedTransport(
+                httpx.AsyncHTTPTransport(limits=self.limits(size), http2=self.http2)
+            )
+
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            transport=transport(self.default_pool_size),
+            mounts={
+                f"all://{host}": transport(size)
+                for host, size in self.pool_sizes.items()
+            },
+        )
@@ -0,0 +1,408 @@
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, TypeVar
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    job_id: str
+    file_name: str
+    status: str
+    stage: str
+    processed_chunks: int
+    attempts: int
+    message: str
+    created_at: float
+    updated_at: float
+    # Identifies the claim that holds the lease; not part of the status
+    lease_owner: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = asdict(self)
+        del state["lease_owner"]
+        return state
+
+
+class JobDeferred(Exception):
+    """Raised by a job that cannot run yet; it is queued again for later."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """A durable indexing job queue in a local SQLite file.
+
+    Uploaded bytes are kept in the database until the job finishes, so
+    queued jobs survive a restart. Each claim of a running job holds a
+    lease, which its worker renews while the job runs; a job whose lease
+    expired (its worker died) is handed to the next worker, up to
+    `max_attempts` times. Renewing and finishing a job only take effect
+    for the claim that currently holds the lease. A deferred job goes
+    back to the queue and is not claimed again before its delay passed.
+    Finished jobs are kept for `retention_seconds`, so clients can still
+    read their outcome.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+        retention_seconds: float = 7 * 24 * 3600,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " file_name TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " processed_chunks INTEGER NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " message TEXT NOT NULL DEFAULT '',"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " lease_expires REAL NOT NULL DEFAULT 0,"
+            " lease_owner TEXT NOT NULL DEFAULT '')"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "lease_owner" not in columns:
+            # Queues created before leases had owners
+            self._db.execute(
+                "ALTER TABLE jobs ADD COLUMN lease_owner TEXT NOT NULL DEFAULT ''"
+            )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS payloads ("
+            " job_id TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)"
+        )
+        self._db.commit()
+
+    def enqueue(self, file_name: str, data: bytes) -> Job:
+        """Store an uploaded file and queue it for indexing."""
+        self.prune()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, file_name, status, stage, created_at,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, file_name, QUEUED, QUEUED, now, now),
+            )
+            self._db.execute("INSERT INTO payloads VALUES (?, ?)", (job_id, data))
+        logger.info(f"Queued job {job_id} for '{file_name}'.")
+        return self.get(job_id)  # type: ignore
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {self._columns()} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return Job(*row) if row else None
+
+    def claim(self) -> Job | None:
+        """Lease the oldest runnable job to the calling worker."""
+        now = time.time()
+        with self._lock, self._db:
+            # Fail jobs whose workers keep dying instead of retrying forever
+            self._db.execute(
+                "UPDATE jobs SET status = ?, message = ?, updated_at = ?"
+                " WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (
+                    FAILED,
+                    "The job was interrupted too many times.",
+                    now,
+                    RUNNING,
+                    now,
+                    self.max_attempts,
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM payloads WHERE job_id IN"
+                " (SELECT job_id FROM jobs WHERE status = ?)",
+                (FAILED,),
+            )
+            # Queued jobs use lease_expires as the time they may start
+            row = self._db.execute(
+                "SELECT job_id FROM jobs"
+                " WHERE (status = ? AND lease_expires <= ?)"
+                " OR (status = ? AND lease_expires < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, stage = ?, attempts = attempts + 1,"
+                " lease_expires = ?, lease_owner = ?, updated_at = ?"
+                " WHERE job_id = ?",
+                (
+                    RUNNING,
+                    "starting",
+                    now + self.lease_seconds,
+                    uuid.uuid4().hex,
+                    now,
+                    row[0],
+                ),
+            )
+        return self.get(row[0])
+
+    def pending(self) -> int:
+        """Count the jobs that are queued or were running before a restart."""
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()
+        return count
+
+    def renew(self, job: Job) -> bool:
+        """Extend the lease of a claimed job; False if another claim took it."""
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires = ?"
+                " WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (now + self.lease_seconds, job.job_id, job.lease_owner, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def defer(self, job: Job, delay: float) -> bool:
+        """Queue a claimed job again, to be claimed after `delay` seconds.
+
+        The claim does not count as an attempt, since the job never ran.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, stage = ?, attempts = attempts - 1,"
+                " lease_expires = ?, lease_owner = '', updated_at = ?"
+                " WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (
+                    QUEUED,
+                    "waiting",
+                    now + delay,
+                    now,
+                    job.job_id,
+                    job.lease_owner,
+                    RUNNING,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def read_payload(self, job_id: str) -> bytes:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM payloads WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No payload stored for job {job_id}")
+        return row[0]
+
+    def update_progress(self, job: Job, stage: str, processed_chunks: int = 0):
+        """Record progress, unless another claim took over the job."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, processed_chunks = ?, updated_at = ?"
+                " WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (
+                    stage,
+                    processed_chunks,
+                    time.time(),
+                    job.job_id,
+                    job.lease_owner,
+                    RUNNING,
+                ),
+            )
+
+    def finish(self, job: Job, message: str) -> bool:
+        return self._complete(job, SUCCEEDED, message)
+
+    def fail(self, job: Job, message: str) -> bool:
+        return self._complete(job, FAILED, message)
+
+    def _complete(self, job: Job, status: str, message: str) -> bool:
+        """Record the outcome, unless another claim took over the job."""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, stage = ?, message = ?, updated_at = ?"
+                " WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (
+                    status,
+                    status,
+                    message,
+                    time.time(),
+                    job.job_id,
+                    job.lease_owner,
+                    RUNNING,
+                ),
+            )
+            if cursor.rowcount != 1:
+                logger.warning(
+                    f"Job {job.job_id} was taken over by another worker; "
+                    f"its result '{status}' is discarded."
+                )
+                return False
+            self._db.execute("DELETE FROM payloads WHERE job_id = ?", (job.job_id,))
+        return True
+
+    def prune(self) -> int:
+        """Delete jobs that finished more than `retention_seconds` ago."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, cutoff),
+            )
+            self._db.execute(
+                "DELETE FROM payloads WHERE job_id NOT IN (SELECT job_id FROM jobs)"
+            )
+        if cursor.rowcount:
+            logger.info(f"Deleted {cursor.rowcount} finished jobs.")
+        return cursor.rowcount
+
+    @staticmethod
+    def _columns() -> str:
+        return (
+            "job_id, file_name, status, stage, processed_chunks, attempts,"
+            " message, created_at, updated_at, lease_owner"
+        )
+
+
+class JobWorker:
+    """Background threads that drain a `JobStore`.
+
+    `process` runs one job and returns a message describing the result.
+    An exception marks the job as failed with the error message, except
+    `JobDeferred`, which queues the job again.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        process: Callable[[Job], str],
+        workers: int = 1,
+        poll_interval: float = 1.0,
+    ):
+        self.store = store
+        self.process = process
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} job workers.")
+
+    def notify(self):
+        """Wake idle workers, e.g. right after a job was queued."""
+        self._wake.set()
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_pending(self) -> int:
+        """Process queued jobs on the calling thread until none are left."""
+        count = 0
+        while (job := self.store.claim()) is not None:
+            self._process(job)
+            count += 1
+        return count
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_pending():
+                    continue
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _process(self, job: Job):
+        logger.info(f"Processing job {job.job_id} for '{job.file_name}'.")
+        started = time.perf_counter()
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job, done),
+            name=f"job-heartbeat-{job.job_id[:8]}",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            message = self.process(job)
+        except JobDeferred as e:
+            logger.info(f"Job {job.job_id} deferred for {e.retry_after}s: {e}")
+            self.store.defer(job, e.retry_after)
+            return
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+            self.store.fail(job, str(e) or e.__class__.__name__)
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+        if self.store.finish(job, message):
+            logger.info(
+                f"Job {job.job_id} finished in {time.perf_counter() - started:.1f}s."
+            )
+
+    def _heartbeat(self, job: Job, done: threading.Event):
+        """Renew the job's lease while it runs, however long a stage takes."""
+        interval = max(self.store.lease_seconds / 3, 0.01)
+        while not done.wait(interval):
+            try:
+                if not self.store.renew(job):
+                    logger.warning(f"Job {job.job_id} lost its lease.")
+                    return
+            except Exception as e:
+                logger.error(f"Could not renew the lease of job {job.job_id}: {e}")
+
+
+def report_progress(
+    items: Iterable[T], report: Callable[[int], None], interval: float = 1.0
+) -> Iterator[T]:
+    """Yield items, calling `report` with the count at most every `interval` s."""
+    count = 0
+    last_report = time.monotonic()
+    for item in items:
+        count += 1
+        yield item
+        if time.monotonic() - last_report >= interval:
+            report(count)
+            last_report = time.monotonic()
+    report(count)
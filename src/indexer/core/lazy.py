@@ -0,0 +1,47 @@
+from typing import Callable, Generic, TypeVar
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """A value created on first use, at most once across threads.
+
+    A factory that raises is retried on the next `get`, so a transient
+    startup error does not disable the worker until it is recycled.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str | None = None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "value")
+        self._value: T | None = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    def get(self) -> T:
+        if self._initialized:
+            return self._value  # type: ignore
+        with self._lock:
+            if not self._initialized:
+                started = time.perf_counter()
+                self._value = self.factory()
+                self._initialized = True
+                logger.info(
+                    f"Initialized {self.name} in "
+                    f"{time.perf_counter() - started:.3f}s."
+                )
+        return self._value  # type: ignore
+
+    def reset(self):
+        """Drop the value so the next `get` creates it again."""
+        with self._lock:
+            self._value = None
+            self._initialized = False
@@ -0,0 +1,201 @@
+from typing import Iterable, Iterator, List
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return the hex SHA-256 digest of a document's raw bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def document_digest(document_key: str) -> str:
+    """Return the prefix shared by the chunk IDs of a document."""
+    return hashlib.sha256(document_key.encode("utf-8")).hexdigest()[:16]
+
+
+class ChunkIdGenerator:
+    """Derives deterministic Azure AI Search keys for a document's chunks.
+
+    IDs depend on the document key and the chunk content, so an unchanged
+    chunk keeps its ID when the rest of the document is edited. Repeated
+    chunks within a document are told apart by their occurrence count.
+    """
+
+    def __init__(self, document_key: str):
+        self.doc_digest = document_digest(document_key)
+        self.seen: dict[str, int] = {}
+
+    def __call__(self, chunk: str) -> str:
+        chunk_digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:24]
+        occurrence = self.seen.get(chunk_digest, 0)
+        self.seen[chunk_digest] = occurrence + 1
+        return f"{self.doc_digest}-{chunk_digest}-{occurrence}"
+
+
+def make_chunk_ids(document_key: str, chunks: List[str]) -> List[str]:
+    """Derive deterministic Azure AI Search keys for a document's chunks."""
+    make_id = ChunkIdGenerator(document_key)
+    return [make_id(chunk) for chunk in chunks]
+
+
+class ManifestStore:
+    """Records which chunk IDs each document currently has in the index.
+
+    Backed by a local SQLite file in WAL mode so several worker processes
+    on the same host can share it.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " document_key TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " document_key TEXT NOT NULL,"
+            " chunk_id TEXT NOT NULL,"
+            " PRIMARY KEY (document_key, chunk_id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            " key TEXT PRIMARY KEY,"
+            " value INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, document_key: str) -> tuple[str, set[str]] | None:
+        """Return the content hash and chunk IDs recorded for a document."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash FROM documents WHERE document_key = ?",
+                (document_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            chunk_ids = {
+                chunk_id
+                for (chunk_id,) in self._db.execute(
+                    "SELECT chunk_id FROM chunks WHERE document_key = ?",
+                    (document_key,),
+                )
+            }
+        return row[0], chunk_ids
+
+    def save(self, document_key: str, content_hash: str, chunk_ids: List[str]):
+        """Replace the recorded state of a document."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?)",
+                (document_key, content_hash, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM chunks WHERE document_key = ?", (document_key,)
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+                [(document_key, chunk_id) for chunk_id in chunk_ids],
+            )
+            self._db.execute(
+                "INSERT INTO meta VALUES ('revision', 1)"
+                " ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+
+    def revision(self) -> int:
+        """A number that changes whenever any document is (re)indexed.
+
+        Shared through the SQLite file, so caches of search results in
+        every worker process can tell that the index changed.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'revision'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def is_unchanged(self, document_key: str, content_hash: str) -> bool:
+        """Return True if the document was last indexed with identical bytes."""
+        previous = self.get(document_key)
+        return previous is not None and previous[0] == content_hash
+
+
+class ReindexTracker:
+    """Diffs a streamed new version of a document against the manifest.
+
+    `new_chunks` yields only the chunks that are not indexed yet, while
+    recording every chunk ID, so stale IDs are known once the stream ends.
+    """
+
+    def __init__(self, manifest: ManifestStore, document_key: str, content_hash: str):
+        self.manifest = manifest
+        self.document_key = document_key
+        self.content_hash = content_hash
+        previous = manifest.get(document_key)
+        self.unchanged = previous is not None and previous[0] == content_hash
+        self.previous_hash = previous[0] if previous else None
+        self.previous_ids = previous[1] if previous else set()
+        self.chunk_ids: List[str] = []
+
+    def new_chunks(self, chunks: Iterable[str]) -> Iterator[tuple[str, str]]:
+        """Yield (chunk_id, chunk) for chunks missing from the manifest."""
+        make_id = ChunkIdGenerator(self.document_key)
+        for chunk in chunks:
+            chunk_id = make_id(chunk)
+            self.chunk_ids.append(chunk_id)
+            if chunk_id not in self.previous_ids:
+                yield chunk_id, chunk
+
+    @property
+    def stale_ids(self) -> List[str]:
+        """IDs indexed before that are not part of the new version."""
+        return sorted(self.previous_ids - set(self.chunk_ids))
+
+    def commit(self, undeleted_ids: Iterable[str] = ()) -> List[str]:
+        """Record the new version once all of its chunks are indexed.
+
+        Stale chunks whose deletion failed stay recorded, and the content
+        hash is left empty so the next upload retries deleting them.
+        Returns the IDs recorded as indexed.
+        """
+        undeleted = sorted(set(undeleted_ids))
+        self.manifest.save(
+            self.document_key,
+            "" if undeleted else self.content_hash,
+            self.chunk_ids + undeleted,
+        )
+        return self.chunk_ids
+
+    def abandon(self, uploaded_ids: Iterable[str]):
+        """Keep the previous version after a failed or incomplete indexing run.
+
+        Its content hash and chunks stay as they were; only the chunks
+        uploaded before the failure are added, so a later version deletes
+        them if it no longer has them.
+        """
+        uploaded = set(uploaded_ids) - self.previous_ids
+        if not uploaded:
+            return
+        self.manifest.save(
+            self.document_key,
+            self.previous_hash or "",
+            sorted(self.previous_ids | uploaded),
+        )
+
+
+class IndexingFailed(Exception):
+    """Some chunks of a document could not be indexed.
+
+    Nothing was deleted and the document's previous version stays
+    recorded, so indexing the same bytes again retries it.
+    """
@@ -0,0 +1,217 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, TypeVar
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+EXPORTERS = ("none", "prometheus", "otel")
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, metrics: "Metrics", stage: str, attributes: Dict[str, Any]):
+        self.metrics = metrics
+        self.stage = stage
+        self.attributes = attributes
+        self._otel_span: Any = None
+
+    def __enter__(self):
+        if self.metrics._tracer is not None:
+            self._otel_span = self.metrics._tracer.start_as_current_span(
+                self.stage, attributes=self.attributes
+            )
+            self._otel_span.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self._started)
+        if exc_info[0] is not None:
+            self.metrics.add(f"{self.stage}_errors")
+        if self._otel_span is not None:
+            self._otel_span.__exit__(*exc_info)
+        return False
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-stage timings and counters for the indexing pipeline.
+
+    Disabled by default: `span` then returns a shared no-op context manager
+    and `add` returns immediately, so instrumented code pays one attribute
+    check. When enabled, values are kept in-process for the Prometheus text
+    endpoint and, with the "otel" exporter, also sent to OpenTelemetry.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+        self._tracer: Any = None
+        self._meter: Any = None
+        self._otel_instruments: Dict[str, Any] = {}
+
+    def configure(self, exporter: str):
+        """Enable metrics for an exporter: "none", "prometheus" or "otel"."""
+        if exporter not in EXPORTERS:
+            raise ValueError(f"Unknown metrics exporter '{exporter}'.")
+        self.enabled = exporter != "none"
+        if exporter == "otel":
+            self._configure_otel()
+        logger.info(f"Metrics exporter: {exporter}.")
+
+    def span(self, stage: str, **attributes: Any):
+        """Time a block of work as one observation of `stage`."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage, attributes)
+
+    def add(self, name: str, value: float = 1):
+        """Increase the counter `name`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        if self._meter is not None:
+            self._otel_instrument(name, "counter").add(value)
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram()
+            histogram.observe(seconds)
+        if self._meter is not None:
+            self._otel_instrument(stage, "histogram").record(seconds)
+
+    def timed_iter(self, stage: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from `items`, recording the time spent producing them.
+
+        Time spent by the consumer between items is not counted, so nested
+        lazy stages (e.g. extraction feeding chunking) are not double-counted
+        by the outer one.
+        """
+        if not self.enabled:
+            return iter(items)
+        return self._timed_iter(stage, iter(items))
+
+    def _timed_iter(self, stage: str, iterator: Iterator[T]) -> Iterator[T]:
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield item
+        finally:
+            self.observe(stage, elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current counters and per-stage count and total seconds."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "stages": {
+                    stage: {"count": histogram.count, "seconds": histogram.sum}
+                    for stage, histogram in self._histograms.items()
+                },
+            }
+
+    def render_prometheus(self, prefix: str = "indexer") -> str:
+        """Render all values in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value:g}")
+
+            metric = f"{prefix}_stage_duration_seconds"
+            if self._histograms:
+                lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(
+                        f'{metric}_bucket{{stage="{stage}",le="{le}"}} {cumulative}'
+                    )
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _configure_otel(self):
+        try:
+            from opentelemetry import metrics as otel_metrics, trace
+        except ImportError:
+            logger.warning(
+                "opentelemetry is not installed; metrics are only kept in-process."
+            )
+            return
+        try:
+            # Exports to Application Insights when its connection string is set
+            from azure.monitor.opentelemetry import configure_azure_monitor
+
+            configure_azure_monitor()
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"Azure Monitor could not be configured: {e}")
+        self._tracer = trace.get_tracer("indexer")
+        self._meter = otel_metrics.get_meter("indexer")
+
+    def _otel_instrument(self, name: str, kind: str) -> Any:
+        key = f"{kind}:{name}"
+        instrument = self._otel_instruments.get(key)
+        if instrument is None:
+            if kind == "counter":
+                instrument = self._meter.create_counter(f"indexer.{name}")
+            else:
+                instrument = self._meter.create_histogram(
+                    f"indexer.{name}.duration", unit="s"
+                )
+            self._otel_instruments[key] = instrument
+        return instrument
+
+
+metrics = Metrics()
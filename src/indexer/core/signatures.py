@@ -0,0 +1,97 @@
+from typing import List, Tuple
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SignatureStore:
+    """Remembers the chunks each document kept, for cross-document dedup.
+
+    Holds the exact digest, MinHash signature and LSH band buckets of every
+    kept chunk. Backed by a local SQLite file in WAL mode, like the
+    manifest, so worker processes on the same host share it.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " id INTEGER PRIMARY KEY,"
+            " document_key TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " signature BLOB NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS signatures_digest ON signatures (digest)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS signatures_document"
+            " ON signatures (document_key)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " bucket INTEGER NOT NULL,"
+            " signature_id INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket)")
+        self._db.commit()
+
+    def find_exact(self, digest: str, document_key: str) -> bool:
+        """Return True if another document kept a chunk with this digest."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM signatures WHERE digest = ? AND document_key != ?"
+                " LIMIT 1",
+                (digest, document_key),
+            ).fetchone()
+        return row is not None
+
+    def candidates(self, bands: List[int], document_key: str) -> List[np.ndarray]:
+        """Signatures of other documents' chunks sharing a band bucket."""
+        if not bands:
+            return []
+        placeholders = ", ".join("?" * len(bands))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT s.id, s.signature FROM bands b"
+                " JOIN signatures s ON s.id = b.signature_id"
+                f" WHERE b.bucket IN ({placeholders}) AND s.document_key != ?",
+                (*bands, document_key),
+            ).fetchall()
+        return [np.frombuffer(signature, dtype=np.uint32) for _, signature in rows]
+
+    def replace_document(
+        self, document_key: str, entries: List[Tuple[str, np.ndarray, List[int]]]
+    ):
+        """Replace the kept chunks recorded for a document.
+
+        `entries` holds (digest, signature, band buckets) per kept chunk;
+        chunks only checked for exact duplicates have no bands.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM bands WHERE signature_id IN"
+                " (SELECT id FROM signatures WHERE document_key = ?)",
+                (document_key,),
+            )
+            self._db.execute(
+                "DELETE FROM signatures WHERE document_key = ?", (document_key,)
+            )
+            for digest, signature, bands in entries:
+                cursor = self._db.execute(
+                    "INSERT INTO signatures (document_key, digest, signature)"
+                    " VALUES (?, ?, ?)",
+                    (document_key, digest, signature.astype(np.uint32).tobytes()),
+                )
+                self._db.executemany(
+                    "INSERT INTO bands VALUES (?, ?)",
+                    [(bucket, cursor.lastrowid) for bucket in bands],
+                )
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Hashable, Tuple, TypeVar
+import threading
+import time
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TtlCache(Generic[K, V]):
+    """A bounded LRU cache whose entries expire `ttl_seconds` after being set.
+
+    A `max_items` of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 1000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: K, value: V):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Coalescer(Generic[K, V]):
+    """Runs one call per key at a time; concurrent callers share its outcome.
+
+    A caller arriving while a call for the same key is in flight waits for
+    that call's result (or exception) instead of making its own.
+    `on_coalesced` is called for each such caller.
+    """
+
+    def __init__(self, on_coalesced: Callable[[], None] | None = None):
+        self.on_coalesced = on_coalesced
+        self._calls: Dict[K, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def run(self, key: K, call: Callable[[], V]) -> V:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            if self.on_coalesced is not None:
+                self.on_coalesced()
+            return future.result()
+        try:
+            result = call()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
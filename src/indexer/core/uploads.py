@@ -0,0 +1,173 @@
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Upload:
+    upload_id: str
+    file_name: str
+    size: int
+    part_size: int
+    received: List[int]
+    created_at: float
+    updated_at: float
+
+    @property
+    def part_count(self) -> int:
+        return max(math.ceil(self.size / self.part_size), 1)
+
+    @property
+    def missing(self) -> List[int]:
+        received = set(self.received)
+        return [part for part in range(self.part_count) if part not in received]
+
+    def part_length(self, part: int) -> int:
+        """The exact number of bytes part `part` must contain."""
+        if part < self.part_count - 1:
+            return self.part_size
+        return self.size - self.part_size * (self.part_count - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "part_count": self.part_count,
+            "missing": self.missing,
+        }
+
+
+class UploadStore:
+    """Resumable uploads sent as fixed-size parts, in a local SQLite file.
+
+    A client creates an upload with the file's size, sends its parts in
+    any order and from several connections, and asks which parts arrived
+    to resume after an interruption. Sending a part again replaces it, so
+    retries are safe. Uploads idle for longer than `ttl_seconds` are
+    discarded.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 24 * 3600):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " upload_id TEXT PRIMARY KEY,"
+            " file_name TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " part_size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS parts ("
+            " upload_id TEXT NOT NULL,"
+            " part INTEGER NOT NULL,"
+            " data BLOB NOT NULL,"
+            " PRIMARY KEY (upload_id, part))"
+        )
+        self._db.commit()
+
+    def create(self, file_name: str, size: int, part_size: int) -> Upload:
+        if size < 0:
+            raise ValueError("The file size must not be negative.")
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+                (upload_id, file_name, size, part_size, now, now),
+            )
+        logger.info(f"Started upload {upload_id} of '{file_name}' ({size} bytes).")
+        return self.get(upload_id)  # type: ignore
+
+    def get(self, upload_id: str) -> Upload | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT upload_id, file_name, size, part_size, created_at,"
+                " updated_at FROM uploads WHERE upload_id = ?",
+                (upload_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            received = [
+                part
+                for (part,) in self._db.execute(
+                    "SELECT part FROM parts WHERE upload_id = ? ORDER BY part",
+                    (upload_id,),
+                )
+            ]
+        upload_id, file_name, size, part_size, created_at, updated_at = row
+        return Upload(
+            upload_id, file_name, size, part_size, received, created_at, updated_at
+        )
+
+    def write_part(self, upload: Upload, part: int, data: bytes):
+        """Store one part, which must have exactly its expected length."""
+        if not 0 <= part < upload.part_count:
+            raise ValueError(
+                f"Part {part} is out of range; the upload has {upload.part_count} parts."
+            )
+        expected = upload.part_length(part)
+        if len(data) != expected:
+            raise ValueError(
+                f"Part {part} must be {expected} bytes long, not {len(data)}."
+            )
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO parts VALUES (?, ?, ?)",
+                (upload.upload_id, part, data),
+            )
+            self._db.execute(
+                "UPDATE uploads SET updated_at = ? WHERE upload_id = ?",
+                (time.time(), upload.upload_id),
+            )
+
+    def assemble(self, upload: Upload) -> bytes:
+        """Join the parts of a complete upload into the original file."""
+        with self._lock:
+            parts = [
+                data
+                for (data,) in self._db.execute(
+                    "SELECT data FROM parts WHERE upload_id = ? ORDER BY part",
+                    (upload.upload_id,),
+                )
+            ]
+        if len(parts) != upload.part_count:
+            raise ValueError(f"Upload {upload.upload_id} is missing parts.")
+        return b"".join(parts)
+
+    def delete(self, upload_id: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM parts WHERE upload_id = ?", (upload_id,))
+            self._db.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+
+    def expire(self) -> int:
+        """Discard uploads idle for longer than `ttl_seconds`."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._db:
+            expired = [
+                upload_id
+                for (upload_id,) in self._db.execute(
+                    "SELECT upload_id FROM uploads WHERE updated_at < ?", (cutoff,)
+                )
+            ]
+            for upload_id in expired:
+                self._db.execute("DELETE FROM parts WHERE upload_id = ?", (upload_id,))
+                self._db.execute(
+                    "DELETE FROM uploads WHERE upload_id = ?", (upload_id,)
+                )
+        if expired:
+            logger.info(f"Discarded {len(expired)} abandoned uploads.")
+        return len(expired)
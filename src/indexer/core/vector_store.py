@@ -0,0 +1,474 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix product, bounding the temporary score matrix
+BLOCK_ROWS = 65536
+# k-means needs a few dozen points per list to place its centroids; it is
+# trained on a sample of up to TRAIN_ROWS_PER_LIST rows per list
+MIN_ROWS_PER_LIST = 39
+TRAIN_ROWS_PER_LIST = 64
+
+
+@dataclass
+class SearchHit:
+    id: str
+    content: str
+    score: float
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length; zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def merge_top_k(
+    scores: np.ndarray, rows: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the `k` best (score, row) columns of each query, unordered."""
+    if scores.shape[1] <= k:
+        return scores, rows
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return (
+        np.take_along_axis(scores, best, axis=1),
+        np.take_along_axis(rows, best, axis=1),
+    )
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid of each row."""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = vectors[start : start + BLOCK_ROWS]
+        assignment[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def train_centroids(
+    vectors: np.ndarray, lists: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means over unit vectors, returning unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign_lists(vectors, centroids)
+        # Sum the rows of each list in one pass over rows sorted by list
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=lists)
+        # A list that lost all its rows keeps its previous centroid
+        filled = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = normalize(np.add.reduceat(vectors[order], starts))
+    return centroids
+
+
+class IvfIndex:
+    """Inverted file index: rows grouped by their nearest centroid.
+
+    Covers the rows below `covered`; rows appended after it was built are
+    searched exhaustively until the index is rebuilt.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        covered: int,
+    ):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.covered = covered
+
+    @classmethod
+    def build(
+        cls, vectors: np.ndarray, row_numbers: np.ndarray, lists: int, covered: int
+    ) -> "IvfIndex":
+        """Cluster unit `vectors` (the live rows `row_numbers`) into `lists`."""
+        rng = np.random.default_rng(0)
+        sample_size = min(len(vectors), lists * TRAIN_ROWS_PER_LIST)
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+        centroids = train_centroids(sample, lists)
+        assignment = assign_lists(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=lists), out=offsets[1:])
+        return cls(centroids, offsets, row_numbers[order], covered)
+
+    @classmethod
+    def load(cls, path: str) -> "IvfIndex":
+        with np.load(path) as data:
+            return cls(
+                data["centroids"], data["offsets"], data["rows"], int(data["covered"])
+            )
+
+    def save(self, path: str):
+        with open(f"{path}.tmp", "wb") as file:
+            np.savez(
+                file,
+                centroids=self.centroids,
+                offsets=self.offsets,
+                rows=self.rows,
+                covered=self.covered,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    def candidates(self, query: np.ndarray, probes: int) -> np.ndarray:
+        """Rows in the `probes` lists whose centroids are closest to `query`."""
+        probes = min(probes, len(self.centroids))
+        scores = self.centroids @ query
+        lists = np.argpartition(-scores, probes - 1)[:probes]
+        return np.concatenate(
+            [self.rows[self.offsets[i] : self.offsets[i + 1]] for i in lists]
+        )
+
+
+class VectorStore:
+    """A local vector index: float32 rows in a memory-mapped file.
+
+    Vectors are appended to a flat file that is searched through `np.memmap`,
+    so the OS page cache, not the Python heap, holds them. A SQLite table maps
+    each document ID to its row and content. Replacing a document appends a
+    new row; deleted and replaced rows are skipped by search and dropped
+    when they outnumber the live rows.
+
+    Search ranks by cosine similarity. It is exact by default, scoring blocks
+    of rows with one matrix product each. With `ivf_lists`, rows are also
+    clustered into an inverted file index once there are enough of them, and
+    only the `ivf_probes` closest lists are scored.
+
+    One process should write to a store at a time.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        ivf_lists: int = 0,
+        ivf_probes: int = 8,
+        rebuild_ratio: float = 0.25,
+    ):
+        self.root = root
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        # The IVF index is rebuilt when unindexed rows exceed this share
+        self.rebuild_ratio = rebuild_ratio
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            os.path.join(root, "rows.sqlite"), timeout=30, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " id TEXT PRIMARY KEY,"
+            " row INTEGER NOT NULL,"
+            " content TEXT NOT NULL)"
+        )
+        self._db.commit()
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self.dimensions = int(meta.get("dimensions", 0))
+        self._file_name = meta.get("file", "vectors.f32")
+        self._mapped: np.memmap | None = None
+        self._ivf: IvfIndex | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def upsert(self, ids: List[str], contents: List[str], vectors: np.ndarray):
+        """Add or replace documents."""
+        if not ids:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one vector per ID.")
+        with self._lock:
+            if not self.dimensions:
+                self._set_meta("dimensions", str(vectors.shape[1]))
+                self.dimensions = vectors.shape[1]
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Expected {self.dimensions}-dimension vectors, "
+                    f"got {vectors.shape[1]}."
+                )
+            start = self._rows
+            # Vectors are written before the rows that point at them, so a
+            # crash in between only leaves unreferenced rows behind
+            with open(self._path(self._file_name), "ab") as file:
+                file.write(vectors.tobytes())
+            self._grow(start + len(ids))
+            self._norms[start : start + len(ids)] = np.linalg.norm(vectors, axis=1)
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO rows (id, row, content) VALUES (?, ?, ?)"
+                    " ON CONFLICT (id) DO UPDATE SET"
+                    " row = excluded.row, content = excluded.content",
+                    [(key, start + i, contents[i]) for i, key in enumerate(ids)],
+                )
+            for i, key in enumerate(ids):
+                self._retire(key)
+                self._index[key] = start + i
+                self._row_ids[start + i] = key
+                self._live[start + i] = True
+            self._rows = start + len(ids)
+            self._maybe_compact()
+
+    def delete(self, ids: Iterable[str]):
+        """Remove documents; unknown IDs are ignored."""
+        with self._lock:
+            keys = [key for key in ids if key in self._index]
+            if not keys:
+                return
+            with self._db:
+                self._db.executemany(
+                    "DELETE FROM rows WHERE id = ?", [(key,) for key in keys]
+                )
+            for key in keys:
+                self._retire(key)
+            self._maybe_compact()
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            row = self._index.get(key)
+            return None if row is None else np.array(self._vectors()[row])
+
+    def search(
+        self, vector: np.ndarray, top: int = 5, exact: bool = False
+    ) -> List[SearchHit]:
+        """Return the `top` documents most similar to `vector`."""
+        return self.search_batch(np.asarray(vector)[np.newaxis], top, exact)[0]
+
+    def search_batch(
+        self, vectors: np.ndarray, top: int = 5, exact: bool = False
+    ) -> List[List[SearchHit]]:
+        """Search for several query vectors at once.
+
+        `exact` bypasses the IVF index, e.g. to measure its recall.
+        """
+        queries = normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if not self._index or top <= 0:
+                return [[] for _ in queries]
+            if queries.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Expected {self.dimensions}-dimension queries, "
+                    f"got {queries.shape[1]}."
+                )
+            ivf = None if exact else self._ivf_index()
+            if ivf is None:
+                scores, rows = self._search_exact(queries, top)
+            else:
+                scores, rows = self._search_ivf(ivf, queries, top)
+            return self._hits(scores, rows)
+
+    def build_ivf(self):
+        """Cluster the live rows into `ivf_lists` lists now."""
+        with self._lock:
+            live = np.flatnonzero(self._live[: self._rows])
+            lists = min(self.ivf_lists, len(live))
+            if not lists:
+                return
+            vectors = normalize(np.asarray(self._vectors()[live]))
+            self._ivf = IvfIndex.build(vectors, live, lists, self._rows)
+            self._ivf.save(self._path("ivf.npz"))
+            logger.info(f"Built an IVF index of {len(live)} rows in {lists} lists.")
+
+    def compact(self):
+        """Rewrite the vector file without deleted and replaced rows."""
+        with self._lock:
+            live = np.flatnonzero(self._live[: self._rows])
+            file_name = f"vectors-{uuid.uuid4().hex[:8]}.f32"
+            with open(self._path(file_name), "wb") as file:
+                for start in range(0, len(live), BLOCK_ROWS):
+                    rows = live[start : start + BLOCK_ROWS]
+                    file.write(np.ascontiguousarray(self._vectors()[rows]).tobytes())
+            old_file = self._file_name
+            # Rows and the file they point into are switched in one transaction
+            with self._db:
+                self._db.executemany(
+                    "UPDATE rows SET row = ? WHERE id = ?",
+                    [(i, self._row_ids[row]) for i, row in enumerate(live)],
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('file', ?)",
+                    (file_name,),
+                )
+            self._file_name = file_name
+            self._mapped = None
+            self._drop_ivf()
+            self._load()
+            if os.path.exists(self._path(old_file)):
+                os.remove(self._path(old_file))
+            logger.info(f"Compacted the vector store to {len(live)} rows.")
+
+    def close(self):
+        with self._lock:
+            self._mapped = None
+            self._db.close()
+
+    def _load(self):
+        path = self._path(self._file_name)
+        row_bytes = self.dimensions * 4
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._rows = size // row_bytes if row_bytes else 0
+        if row_bytes and size % row_bytes:
+            # Drop a partially written row
+            os.truncate(path, self._rows * row_bytes)
+        self._row_ids: List[str | None] = [None] * self._rows
+        self._live = np.zeros(self._rows, dtype=bool)
+        self._index: Dict[str, int] = {}
+        for key, row in self._db.execute("SELECT id, row FROM rows"):
+            self._index[key] = row
+            self._row_ids[row] = key
+            self._live[row] = True
+        self._norms = np.zeros(self._rows, dtype=np.float32)
+        for start in range(0, self._rows, BLOCK_ROWS):
+            block = self._vectors()[start : start + BLOCK_ROWS]
+            self._norms[start : start + len(block)] = np.linalg.norm(block, axis=1)
+        if self.ivf_lists and os.path.exists(self._path("ivf.npz")):
+            self._ivf = IvfIndex.load(self._path("ivf.npz"))
+
+    def _grow(self, rows: int):
+        if rows <= len(self._live):
+            self._row_ids.extend([None] * (rows - len(self._row_ids)))
+            return
+        capacity = max(rows, len(self._live) * 2)
+        self._live = np.concatenate(
+            [self._live, np.zeros(capacity - len(self._live), dtype=bool)]
+        )
+        self._norms = np.concatenate(
+            [self._norms, np.zeros(capacity - len(self._norms), dtype=np.float32)]
+        )
+        self._row_ids.extend([None] * (rows - len(self._row_ids)))
+
+    def _retire(self, key: str):
+        row = self._index.pop(key, None)
+        if row is not None:
+            self._live[row] = False
+            self._row_ids[row] = None
+
+    def _maybe_compact(self):
+        dead = self._rows - len(self._index)
+        if dead > max(len(self._index), BLOCK_ROWS // 16):
+            self.compact()
+
+    def _vectors(self) -> np.ndarray:
+        """The vector file, mapped again when rows were appended."""
+        if not self._rows:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        if self._mapped is None or len(self._mapped) < self._rows:
+            self._mapped = np.memmap(
+                self._path(self._file_name),
+                dtype=np.float32,
+                mode="r",
+                shape=(self._rows, self.dimensions),
+            )
+        return self._mapped
+
+    def _ivf_index(self) -> IvfIndex | None:
+        if not self.ivf_lists or len(self._index) < self.ivf_lists * MIN_ROWS_PER_LIST:
+            return None
+        if self._ivf is None or (
+            self._rows - self._ivf.covered > self._ivf.covered * self.rebuild_ratio
+        ):
+            self.build_ivf()
+        return self._ivf
+
+    def _drop_ivf(self):
+        self._ivf = None
+        if os.path.exists(self._path("ivf.npz")):
+            os.remove(self._path("ivf.npz"))
+
+    def _score(self, queries: np.ndarray, rows: np.ndarray | slice) -> np.ndarray:
+        """Cosine similarity of unit queries to rows; dead rows score -inf."""
+        scores = queries @ np.asarray(self._vectors()[rows]).T
+        scores /= np.maximum(self._norms[rows], np.finfo(np.float32).tiny)
+        scores[:, ~self._live[rows]] = -np.inf
+        return scores
+
+    def _search_exact(
+        self, queries: np.ndarray, top: int, start: int = 0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for block_start in range(start, self._rows, BLOCK_ROWS):
+            block = slice(block_start, min(block_start + BLOCK_ROWS, self._rows))
+            scores = self._score(queries, block)
+            rows = np.broadcast_to(np.arange(block.start, block.stop), scores.shape)
+            best_scores, best_rows = merge_top_k(
+                np.hstack([best_scores, scores]), np.hstack([best_rows, rows]), top
+            )
+        return best_scores, best_rows
+
+    def _search_ivf(
+        self, ivf: IvfIndex, queries: np.ndarray, top: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Rows appended since the index was built are scored exhaustively
+        tail_scores, tail_rows = self._search_exact(queries, top, start=ivf.covered)
+        results = []
+        for i, query in enumerate(queries):
+            rows = np.sort(ivf.candidates(query, self.ivf_probes))
+            scores = self._score(query[np.newaxis], rows)
+            results.append(
+                merge_top_k(
+                    np.hstack([tail_scores[i : i + 1], scores]),
+                    np.hstack([tail_rows[i : i + 1], rows[np.newaxis]]),
+                    top,
+                )
+            )
+        width = max(len(scores[0]) for scores, _ in results)
+        best_scores = np.full((len(queries), width), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), width), dtype=np.int64)
+        for i, (scores, rows) in enumerate(results):
+            best_scores[i, : scores.shape[1]] = scores[0]
+            best_rows[i, : rows.shape[1]] = rows[0]
+        return best_scores, best_rows
+
+    def _hits(self, scores: np.ndarray, rows: np.ndarray) -> List[List[SearchHit]]:
+        ranked: List[List[Tuple[str, float]]] = []
+        for query_scores, query_rows in zip(scores, rows):
+            order = np.argsort(-query_scores, kind="stable")
+            ranked.append(
+                [
+                    (self._row_ids[query_rows[j]], float(query_scores[j]))  # type: ignore
+                    for j in order
+                    if np.isfinite(query_scores[j])
+                ]
+            )
+        keys = list({key for hits in ranked for key, _ in hits})
+        contents: Dict[str, str] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            contents.update(
+                self._db.execute(
+                    "SELECT id, content FROM rows WHERE id IN"
+                    f" ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+            )
+        return [
+            [SearchHit(key, contents[key], score) for key, score in hits]
+            for hits in ranked
+        ]
+
+    def _set_meta(self, key: str, value: str):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
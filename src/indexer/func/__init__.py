@@ -1,12 +1,41 @@
+from .archive import iter_uploaded_files, iter_zip_members, uploaded_size
 from .chunker import DocChunker
-from .extractor_factory import extract_text_from_file
+from .docx_extractor import DocxExtractor
+from .extractor_factory import (
+    Extractor,
+    extract_pages,
+    extract_text_from_file,
+    is_supported,
+    register_extractor,
+    supported_extensions,
+)
+from .html_extractor import HtmlExtractor
+from .pdf_extractor import PdfExtractor, count_pages
+from .text_extractor import TextExtractor
+from .text_splitter import RecursiveTextSplitter
 
 _default_chunker = DocChunker(chunk_size=1000, overlap=200)
 chunk_text = _default_chunker.chunk_text
+iter_chunks = _default_chunker.iter_chunks
 
 
 __all__ = [
     "DocChunker",
+    "DocxExtractor",
+    "Extractor",
+    "HtmlExtractor",
+    "PdfExtractor",
+    "RecursiveTextSplitter",
+    "TextExtractor",
     "chunk_text",
+    "count_pages",
+    "extract_pages",
     "extract_text_from_file",
+    "is_supported",
+    "iter_chunks",
+    "iter_uploaded_files",
+    "iter_zip_members",
+    "register_extractor",
+    "supported_extensions",
+    "uploaded_size",
 ]
@@ -0,0 +1,100 @@
+from pathlib import PurePosixPath
+from typing import BinaryIO, Callable, Iterable, Iterator
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Members larger than this once decompressed are skipped
+MAX_MEMBER_BYTES = 512 * 1024 * 1024
+
+
+def is_zip(file_name: str) -> bool:
+    return file_name.lower().endswith(".zip")
+
+
+def iter_zip_members(
+    source: BinaryIO,
+    max_member_bytes: int = MAX_MEMBER_BYTES,
+    accept: Callable[[str], bool] | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (member path, bytes) of each file in a ZIP archive, one at a time.
+
+    Members are decompressed in memory only when they are reached, so the
+    archive is never extracted to disk. Members rejected by `accept` are
+    skipped without being decompressed. `source` must be seekable.
+    """
+    with zipfile.ZipFile(source) as archive:
+        for info in _members(archive, max_member_bytes, accept):
+            with archive.open(info) as member:
+                yield info.filename, member.read()
+
+
+def _members(
+    archive: zipfile.ZipFile,
+    max_member_bytes: int,
+    accept: Callable[[str], bool] | None,
+    log: bool = True,
+) -> Iterator[zipfile.ZipInfo]:
+    """Yield the members of an archive that are read as documents."""
+    for info in archive.infolist():
+        path = PurePosixPath(info.filename)
+        if info.is_dir() or "__MACOSX" in path.parts or path.name.startswith("."):
+            continue
+        if info.file_size > max_member_bytes:
+            if log:
+                logger.warning(
+                    f"Skipping '{info.filename}': {info.file_size} bytes exceeds "
+                    f"the {max_member_bytes} byte limit."
+                )
+            continue
+        if accept is not None and not accept(info.filename):
+            if log:
+                logger.warning(f"Skipping '{info.filename}': unsupported file type.")
+            continue
+        yield info
+
+
+def iter_uploaded_files(
+    files: Iterable[tuple[str, BinaryIO]],
+    accept: Callable[[str], bool] | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (name, bytes) for uploaded files, expanding ZIP archives.
+
+    Files and archive members rejected by `accept` are skipped unread.
+    """
+    for file_name, stream in files:
+        if is_zip(file_name):
+            logger.info(f"Reading documents from archive '{file_name}'.")
+            yield from iter_zip_members(stream, accept=accept)
+        elif accept is not None and not accept(file_name):
+            logger.warning(f"Skipping '{file_name}': unsupported file type.")
+        else:
+            yield file_name, stream.read()
+
+
+def uploaded_size(
+    file_name: str,
+    stream: BinaryIO,
+    accept: Callable[[str], bool] | None = None,
+) -> int:
+    """Return how many bytes an upload expands to once read.
+
+    For a ZIP archive, this is the uncompressed size of the members that
+    `iter_uploaded_files` would read, taken from the archive's directory
+    without decompressing anything. `stream` must be seekable; its
+    position is left unchanged.
+    """
+    position = stream.tell()
+    try:
+        if is_zip(file_name):
+            with zipfile.ZipFile(stream) as archive:
+                return sum(
+                    info.file_size
+                    for info in _members(archive, MAX_MEMBER_BYTES, accept, log=False)
+                )
+        if accept is not None and not accept(file_name):
+            return 0
+        return stream.seek(0, 2)
+    finally:
+        stream.seek(position)
@@ -1,9 +1,14 @@
+from typing import Iterable, Iterator
 import logging
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from core.metrics import metrics
+from .text_splitter import RecursiveTextSplitter
 
 logger = logging.getLogger(__name__)
 
+# Chunks at the end of the buffer that may still change when more text arrives
+RETAINED_CHUNKS = 2
+
 
 class DocChunker:
     def __init__(
@@ -13,11 +18,59 @@ class DocChunker:
         separators: list[str] = ["\n\n", "\n", " ", ""],
     ):
         """Separate text into chunks of specified size with overlap."""
-        self.chunker = RecursiveCharacterTextSplitter(
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.chunker = RecursiveTextSplitter(
             chunk_size=chunk_size, chunk_overlap=overlap, separators=separators
         )
 
     def chunk_text(self, text: str) -> list[str]:
         """Chunk the provided text and return a list of chunks."""
-        logger.info(f"Chunking text (first 30 chars): '{text[:30]}...'")
-        return self.chunker.split_text(text)
+        logger.debug(f"Chunking text (first 30 chars): '{text[:30]}...'")
+        return self._split(text)
+
+    def iter_chunks(
+        self, pages: Iterable[str], window: int | None = None
+    ) -> Iterator[str]:
+        """Chunk a stream of page texts, yielding chunks as soon as they are final.
+
+        Pages are buffered until about `window` characters (default: 8 chunks)
+        are available. The buffer is then split, all but the last chunks are
+        yielded, and the buffer restarts where the first retained chunk
+        starts, so chunks keep overlapping across page boundaries.
+        """
+        window = window or self.chunk_size * 8
+        buffer = ""
+        for page in pages:
+            buffer += page
+            if len(buffer) < window:
+                continue
+
+            chunks = self._split(buffer)
+            if len(chunks) <= RETAINED_CHUNKS:
+                continue
+            starts = self._chunk_starts(buffer, chunks)
+            metrics.add("chunks", len(chunks) - RETAINED_CHUNKS)
+            yield from chunks[:-RETAINED_CHUNKS]
+            buffer = buffer[starts[-RETAINED_CHUNKS] :]
+
+        if buffer:
+            chunks = self._split(buffer)
+            metrics.add("chunks", len(chunks))
+            yield from chunks
+
+    def _split(self, text: str) -> list[str]:
+        with metrics.span("chunk"):
+            return self.chunker.split_text(text)
+
+    def _chunk_starts(self, text: str, chunks: list[str]) -> list[int]:
+        """Find where each chunk starts in the text it was split from."""
+        starts: list[int] = []
+        offset = 0
+        for chunk in chunks:
+            index = text.find(chunk, offset)
+            if index < 0:
+                index = offset
+            starts.append(index)
+            offset = max(index + 1, index + len(chunk) - self.overlap)
+        return starts
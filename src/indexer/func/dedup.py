@@ -0,0 +1,282 @@
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Protocol, Tuple
+import hashlib
+import logging
+import re
+import threading
+
+import numpy as np
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_BASE = 1_000_003
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Case-fold and collapse whitespace, so trivial variations compare equal."""
+    return WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    """Hash every `size`-character shingle of a normalized text.
+
+    Character shingles work for languages without spaces between words.
+    The rolling polynomial hash is computed with numpy, not per shingle.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < size:
+        size = max(len(codes), 1)
+    count = len(codes) - size + 1
+    hashes = np.zeros(max(count, 0), dtype=np.uint64)
+    for offset in range(size):
+        # Wraps around modulo 2**64, which is fine for hashing
+        hashes = hashes * np.uint64(SHINGLE_BASE) + codes[offset : offset + count]
+    return np.unique(hashes)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) whose LSH threshold (1/b)^(1/r) is closest below
+    `threshold`, so that near-duplicates rarely miss each other's buckets.
+    Candidates are confirmed with the estimated similarity afterwards.
+    """
+    best = (num_perm, 1)
+    best_distance = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        lsh_threshold = (1 / bands) ** (1 / rows)
+        if lsh_threshold <= threshold and threshold - lsh_threshold < best_distance:
+            best = (bands, rows)
+            best_distance = threshold - lsh_threshold
+    return best
+
+
+class MinHasher:
+    """Computes MinHash signatures whose agreement estimates Jaccard similarity.
+
+    Each permutation is a multiply-shift hash: the high 32 bits of
+    `a * x + b` modulo 2**64 with odd `a`, which needs no division.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        max_value = np.iinfo(np.uint64).max
+        self.a = rng.integers(0, max_value, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, max_value, num_perm, dtype=np.uint64)
+
+    def signature(self, normalized_text: str) -> np.ndarray:
+        hashes = shingle_hashes(normalized_text, self.shingle_size)
+        if not len(hashes):
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        permuted = self.a[:, None] * hashes[None, :]
+        permuted += self.b[:, None]
+        permuted >>= np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    return float(np.mean(a == b))
+
+
+def band_hashes(signature: np.ndarray, bands: int, rows: int) -> List[int]:
+    """Hash each band of a signature into a bucket key (a signed 64-bit int).
+
+    The band number is part of the key, so buckets of different bands never
+    collide and can share one lookup table.
+    """
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                signature[i * rows : (i + 1) * rows].tobytes(),
+                digest_size=8,
+                salt=i.to_bytes(8, "little"),
+            ).digest(),
+            "little",
+            signed=True,
+        )
+        for i in range(bands)
+    ]
+
+
+class SignatureIndex(Protocol):
+    """Signatures of chunks already kept by other documents."""
+
+    def find_exact(self, digest: str, document_key: str) -> bool: ...
+
+    def candidates(
+        self, bands: List[int], document_key: str
+    ) -> Iterable[np.ndarray]: ...
+
+    def replace_document(
+        self, document_key: str, entries: List[Tuple[str, np.ndarray, List[int]]]
+    ): ...
+
+
+@dataclass
+class DedupReport:
+    """How many chunks of a document were dropped as duplicates."""
+
+    document_key: str
+    chunks: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    cross_document_duplicates: int = 0
+
+    @property
+    def dropped(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "dropped": self.dropped}
+
+
+class ChunkDeduplicator:
+    """Drops exact and near-duplicate chunks before they are embedded.
+
+    Exact duplicates are found by hashing normalized text. Near-duplicates
+    are found with MinHash signatures and LSH banding: chunks sharing a
+    band bucket are compared, and a chunk whose estimated Jaccard
+    similarity to a kept chunk reaches `threshold` is dropped. A threshold
+    of 1 or more keeps only the exact check. Chunks shorter than
+    `min_chars` are only checked for exact duplicates, as a few shingles
+    say little about similarity.
+
+    Duplicates are looked up within the document and, when `store` is
+    given, among the chunks kept by other documents.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        min_chars: int = 50,
+        store: SignatureIndex | None = None,
+    ):
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.store = store
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = choose_bands(num_perm, min(threshold, 1.0))
+        # Signatures of filtered documents that are not indexed yet
+        self._pending: Dict[str, List[Tuple[str, np.ndarray, List[int]]]] = {}
+        self._pending_lock = threading.Lock()
+
+    @property
+    def near_duplicates_enabled(self) -> bool:
+        return self.threshold < 1
+
+    def filter(
+        self, document_key: str, chunks: Iterable[str], report: DedupReport
+    ) -> Iterator[str]:
+        """Yield the chunks of a document that are not duplicates.
+
+        `report` is updated as chunks are read. The signatures of kept
+        chunks are held back once the stream is exhausted, until `commit`
+        saves them in place of the document's previous version.
+        """
+        seen_digests: set[str] = set()
+        buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        signatures: List[np.ndarray] = []
+        entries: List[Tuple[str, np.ndarray, List[int]]] = []
+
+        for chunk in chunks:
+            report.chunks += 1
+            normalized = normalize(chunk)
+            digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+            if digest in seen_digests:
+                report.exact_duplicates += 1
+                continue
+            if self.store is not None and self.store.find_exact(digest, document_key):
+                report.exact_duplicates += 1
+                report.cross_document_duplicates += 1
+                continue
+            seen_digests.add(digest)
+
+            signature = None
+            bands: List[int] = []
+            if self.near_duplicates_enabled and len(normalized) >= self.min_chars:
+                signature = self.hasher.signature(normalized)
+                bands = band_hashes(signature, self.bands, self.rows)
+                if self._has_near_duplicate(signature, bands, buckets, signatures):
+                    report.near_duplicates += 1
+                    continue
+                if self.store is not None and any(
+                    similarity(signature, other) >= self.threshold
+                    for other in self.store.candidates(bands, document_key)
+                ):
+                    report.near_duplicates += 1
+                    report.cross_document_duplicates += 1
+                    continue
+                for band, bucket in zip(buckets, bands):
+                    band.setdefault(bucket, []).append(len(signatures))
+                signatures.append(signature)
+
+            entries.append(
+                (
+                    digest,
+                    signature if signature is not None else np.empty(0, np.uint32),
+                    bands,
+                )
+            )
+            yield chunk
+
+        if self.store is not None:
+            with self._pending_lock:
+                self._pending[document_key] = entries
+        record_dedup(report)
+
+    def commit(self, document_key: str):
+        """Save a document's signatures, once its chunks are all indexed.
+
+        Until then other documents are not compared with its chunks, which
+        might never reach the index.
+        """
+        with self._pending_lock:
+            entries = self._pending.pop(document_key, None)
+        if entries is not None and self.store is not None:
+            self.store.replace_document(document_key, entries)
+
+    def discard(self, document_key: str):
+        """Forget a document's signatures, e.g. because indexing failed."""
+        with self._pending_lock:
+            self._pending.pop(document_key, None)
+
+    def _has_near_duplicate(
+        self,
+        signature: np.ndarray,
+        bands: List[int],
+        buckets: List[Dict[int, List[int]]],
+        signatures: List[np.ndarray],
+    ) -> bool:
+        compared: set[int] = set()
+        for band, bucket in zip(buckets, bands):
+            for index in band.get(bucket, ()):
+                if index in compared:
+                    continue
+                compared.add(index)
+                if similarity(signature, signatures[index]) >= self.threshold:
+                    return True
+        return False
+
+
+def record_dedup(report: DedupReport):
+    """Count deduplicated chunks and log the document's summary."""
+    metrics.add("dedup_chunks", report.chunks)
+    metrics.add("dedup_exact_duplicates", report.exact_duplicates)
+    metrics.add("dedup_near_duplicates", report.near_duplicates)
+    if report.dropped:
+        logger.info(
+            f"'{report.document_key}': dropped {report.dropped} of {report.chunks} "
+            f"chunks as duplicates ({report.exact_duplicates} exact, "
+            f"{report.near_duplicates} near, {report.cross_document_duplicates} "
+            "from other documents)."
+        )
@@ -0,0 +1,99 @@
+from typing import BinaryIO, Iterator, List
+import io
+import logging
+import xml.etree.ElementTree as ET
+import zipfile
+
+from .text_extractor import SEGMENT_BYTES
+
+logger = logging.getLogger(__name__)
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Story parts read in order; headers and footers repeat on every page
+DOCX_MEMBERS = ("word/document.xml", "word/footnotes.xml", "word/endnotes.xml")
+
+
+def paragraph_text(paragraph: ET.Element) -> str:
+    parts: List[str] = []
+    for element in paragraph.iter():
+        if element.tag == f"{W}t" and element.text:
+            parts.append(element.text)
+        elif element.tag == f"{W}tab":
+            parts.append("\t")
+        elif element.tag in (f"{W}br", f"{W}cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def iter_paragraphs(member: BinaryIO) -> Iterator[str]:
+    """Yield paragraph texts of a WordprocessingML part as it is parsed.
+
+    Each paragraph is detached from the tree once read, so memory does not
+    grow with the size of the part.
+    """
+    parents: List[ET.Element] = []
+    for event, element in ET.iterparse(member, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag == f"{W}p":
+            yield paragraph_text(element)
+            if parents:
+                parents[-1].remove(element)
+
+
+class DocxExtractor:
+    def __init__(self, segment_bytes: int = SEGMENT_BYTES):
+        """Extract text from Word documents (.docx), one part at a time.
+
+        The package is read member by member from the ZIP container and each
+        XML part is parsed incrementally; paragraphs are grouped into
+        segments of at most `segment_bytes` UTF-8 bytes, and longer
+        paragraphs are split across segments.
+        """
+        self.segment_bytes = segment_bytes
+
+    def iter_pages(self, source: str | bytes | BinaryIO) -> Iterator[str]:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        with zipfile.ZipFile(source) as package:
+            names = set(package.namelist())
+            for name in DOCX_MEMBERS:
+                if name not in names:
+                    continue
+                with package.open(name) as member:
+                    yield from self._segments(iter_paragraphs(member))
+
+    def _segments(self, paragraphs: Iterator[str]) -> Iterator[str]:
+        segment: List[str] = []
+        size = 0
+        for paragraph in paragraphs:
+            if not paragraph.strip():
+                continue
+            text = paragraph + "\n\n"
+            text_bytes = len(text.encode("utf-8"))
+            if segment and size + text_bytes > self.segment_bytes:
+                yield "".join(segment)
+                segment = []
+                size = 0
+            if text_bytes > self.segment_bytes:
+                yield from self._split(text)
+                continue
+            segment.append(text)
+            size += text_bytes
+        if segment:
+            yield "".join(segment)
+
+    def _split(self, text: str) -> Iterator[str]:
+        """Cut a paragraph into pieces of at most `segment_bytes` bytes."""
+        data = text.encode("utf-8")
+        start = 0
+        while start < len(data):
+            end = min(start + self.segment_bytes, len(data))
+            # Back off continuation bytes so characters are never cut
+            while end < len(data) and end > start + 1 and data[end] & 0xC0 == 0x80:
+                end -= 1
+            yield data[start:end].decode("utf-8")
+            start = end
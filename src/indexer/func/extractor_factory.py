@@ -1,32 +1,96 @@
+from typing import BinaryIO, Dict, Iterator, List, Protocol
 import logging
 from pathlib import Path
+
+from core.metrics import metrics
+from .docx_extractor import DocxExtractor
+from .html_extractor import HtmlExtractor
 from .pdf_extractor import PdfExtractor
+from .text_extractor import TextExtractor
 
 logger = logging.getLogger(__name__)
 
-EXTRACTOR_MAP = {
+
+class Extractor(Protocol):
+    def iter_pages(self, source: str | bytes | BinaryIO) -> Iterator[str]:
+        """Lazily yield the text of a file as pages or segments, in order."""
+        ...
+
+
+EXTRACTOR_MAP: Dict[str, Extractor] = {
     ".pdf": PdfExtractor(),
+    ".txt": TextExtractor(),
+    ".md": TextExtractor(),
+    ".markdown": TextExtractor(),
+    ".html": HtmlExtractor(),
+    ".htm": HtmlExtractor(),
+    ".docx": DocxExtractor(),
 }
 
 
-def extract_text_from_file(filepath: str) -> str:
-    """Extract text from a file based on its extension."""
-    ext = Path(filepath).suffix.lower()
-    extractor = EXTRACTOR_MAP.get(ext)
+def register_extractor(ext: str, extractor: Extractor):
+    """Register (or replace) the extractor used for a file extension."""
+    EXTRACTOR_MAP[ext.lower()] = extractor
+
+
+def get_extractor(filepath: str) -> Extractor | None:
+    return EXTRACTOR_MAP.get(Path(filepath).suffix.lower())
+
+
+def is_supported(filepath: str) -> bool:
+    """Return True if a file can be extracted, judging by its extension."""
+    return get_extractor(filepath) is not None
+
+
+def supported_extensions() -> List[str]:
+    return sorted(EXTRACTOR_MAP)
+
+
+def extract_pages(
+    filepath: str, source: bytes | BinaryIO | None = None
+) -> Iterator[str]:
+    """Lazily yield page texts of a file based on its extension.
+
+    When `source` is given, the content is read from it and `filepath` is
+    only used to pick the extractor, so no temporary file is needed.
+    Extraction errors are logged and re-raised, even after some pages were
+    yielded, so a truncated document is never taken for a complete one.
+    """
+    extractor = get_extractor(filepath)
     if not extractor:
         logger.warning(
-            f"No extractor found for file type '{ext}'. Skipping file: {filepath}"
+            f"No extractor found for file type '{Path(filepath).suffix.lower()}'. "
+            f"Skipping file: {filepath}"
         )
-        return ""
+        return
 
     try:
         logger.info(
             f"Extracting text from '{filepath}' using {extractor.__class__.__name__}."
         )
-        return extractor.extract(filepath)
+        metrics.add("documents")
+        if isinstance(source, (bytes, bytearray)):
+            metrics.add("bytes_in", len(source))
+        pages = extractor.iter_pages(filepath if source is None else source)
+        for page in metrics.timed_iter("extract", pages):
+            metrics.add("pages")
+            yield page
     except Exception as e:
         logger.error(
             f"Failed to extract text from '{filepath}' with {extractor.__class__.__name__}: {e}",
             exc_info=True,
         )
+        raise
+
+
+def extract_text_from_file(
+    filepath: str, source: bytes | BinaryIO | None = None
+) -> str:
+    """Extract text from a file based on its extension.
+
+    Returns an empty string if the file cannot be extracted completely.
+    """
+    try:
+        return "".join(extract_pages(filepath, source))
+    except Exception:
         return ""
@@ -0,0 +1,136 @@
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, List
+import codecs
+import logging
+import re
+
+from .text_extractor import SEGMENT_BYTES, decode_blocks, iter_blocks
+
+logger = logging.getLogger(__name__)
+
+# Elements whose content is not text for a reader
+SKIPPED_TAGS = {"script", "style", "head", "template", "noscript", "svg"}
+
+# Elements that start on a new line when rendered
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+    "td", "th", "tr", "ul",
+}  # fmt: skip
+
+CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w-]+)""", re.I)
+WHITESPACE = re.compile(r"\s+")
+CHARSET_SCAN_BYTES = 4096
+
+# A line longer than this is emitted before it ends
+MAX_PENDING_CHARS = 1024 * 1024
+
+
+class _TextParser(HTMLParser):
+    """Collects readable text from HTML fed in pieces."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.skipping = 0
+        self.preformatted = 0
+        self.line_start = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.newline()
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag == "pre":
+            self.preformatted += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.newline()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag == "pre":
+            self.preformatted = max(self.preformatted - 1, 0)
+        if tag in BLOCK_TAGS:
+            self.newline()
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        if not self.preformatted:
+            data = WHITESPACE.sub(" ", data)
+            if self.line_start:
+                data = data.lstrip(" ")
+        if data:
+            self.parts.append(data)
+            self.line_start = data.endswith("\n")
+
+    def newline(self):
+        if self.parts and not self.preformatted:
+            self.parts[-1] = self.parts[-1].rstrip(" ")
+        self.parts.append("\n")
+        self.line_start = True
+
+    def take_text(self, final: bool = False) -> str:
+        """Return the complete lines collected so far, keeping a partial one."""
+        text = "".join(self.parts)
+        self.parts.clear()
+        end = text.rfind("\n") + 1
+        if final or (end == 0 and len(text) > MAX_PENDING_CHARS):
+            end = len(text)
+        if end < len(text):
+            self.parts.append(text[end:])
+        return text[:end]
+
+
+def sniff_charset(head: bytes, default: str = "utf-8") -> str:
+    """Read the charset from a `<meta>` tag near the start of the document."""
+    match = CHARSET_PATTERN.search(head[:CHARSET_SCAN_BYTES])
+    if not match:
+        return default
+    try:
+        return codecs.lookup(match.group(1).decode("ascii")).name
+    except LookupError:
+        return default
+
+
+class HtmlExtractor:
+    def __init__(self, segment_bytes: int = SEGMENT_BYTES):
+        """Convert HTML to text while streaming it in segments.
+
+        Scripts, styles and the document head are dropped, whitespace is
+        collapsed outside `<pre>`, and block elements start new lines.
+        """
+        self.segment_bytes = segment_bytes
+
+    def iter_pages(self, source: str | bytes | BinaryIO) -> Iterator[str]:
+        blocks = iter_blocks(source, self.segment_bytes)
+        # The charset is declared near the start, possibly beyond one block
+        head: List[bytes] = []
+        while sum(map(len, head)) < CHARSET_SCAN_BYTES:
+            block = next(blocks, None)
+            if block is None:
+                break
+            head.append(block)
+        parser = _TextParser()
+
+        def all_blocks() -> Iterator[bytes]:
+            yield from head
+            yield from blocks
+
+        charset = sniff_charset(b"".join(head))
+        for text in decode_blocks(all_blocks(), charset):
+            parser.feed(text)
+            if segment := tidy(parser.take_text()):
+                yield segment
+        parser.close()
+        if segment := tidy(parser.take_text(final=True)):
+            yield segment
+
+
+def tidy(text: str) -> str:
+    """Collapse runs of blank lines left by nested block elements."""
+    return re.sub(r"\n{3,}", "\n\n", text)
@@ -1,23 +1,177 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, BinaryIO, Deque, Iterator, List
 import logging
+import math
+import os
+import re
+import threading
 
-import fitz  # type: ignore
+if TYPE_CHECKING:
+    import fitz  # type: ignore
 
 logger = logging.getLogger(__name__)
 
+# Page ranges smaller than this are not worth a round-trip to a worker
+MIN_PAGES_PER_SHARD = 16
+# Shards submitted ahead of the one being yielded, per worker process
+SHARDS_IN_FLIGHT_PER_WORKER = 2
+
+PAGE_OBJECT = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+# Assumed page size when pages are hidden in compressed object streams
+BYTES_PER_PAGE_GUESS = 50 * 1024
+
+
+def count_pages(data: bytes) -> int:
+    """Cheaply estimate the page count of a PDF without parsing it.
+
+    Counts uncompressed page objects; PDFs that keep them in compressed
+    object streams fall back to a guess from the file size.
+    """
+    pages = len(PAGE_OBJECT.findall(data))
+    return pages or math.ceil(len(data) / BYTES_PER_PAGE_GUESS)
+
+
+def available_cores() -> int:
+    """Return the number of cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _extract_range(source: str | tuple[str, int], start: int, end: int) -> List[str]:
+    """Extract pages [start, end) in a worker process with its own document.
+
+    `source` is either a file path or the (name, size) of a shared memory
+    block holding the PDF bytes.
+    """
+    import fitz  # type: ignore
+
+    if isinstance(source, str):
+        document = fitz.open(source)
+    else:
+        name, size = source
+        shm = SharedMemory(name=name)
+        try:
+            document = fitz.open(stream=bytes(shm.buf[:size]), filetype="pdf")
+        finally:
+            shm.close()
+    with document:
+        return [document.load_page(i).get_text() for i in range(start, end)]
+
 
 class PdfExtractor:
-    def __init__(self):
-        pass
+    def __init__(self, parallel_page_threshold: int = 200, max_workers: int = 0):
+        """Extract text from PDFs.
+
+        Documents with at least `parallel_page_threshold` pages are split into
+        page ranges extracted by a process pool of up to `max_workers`
+        processes (0 means all available cores).
+        """
+        self.parallel_page_threshold = parallel_page_threshold
+        self.max_workers = min(max_workers or available_cores(), available_cores())
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
 
-    def extract(self, filepath: str) -> str:
+    def open(self, source: str | bytes | BinaryIO) -> "fitz.Document":
+        """Open a PDF from a path, raw bytes or a binary file-like object."""
+        # PyMuPDF is imported on first use to keep worker start-up fast
+        import fitz  # type: ignore
+
+        if isinstance(source, str):
+            return fitz.open(source)
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            source = source.read()
+        return fitz.open(stream=source, filetype="pdf")
+
+    def iter_pages(self, source: str | bytes | BinaryIO) -> Iterator[str]:
+        """Yield the text of each page lazily, without writing to disk."""
+        if not isinstance(source, (str, bytes, bytearray, memoryview)):
+            source = source.read()
+
+        with self.open(source) as document:
+            page_count = document.page_count
+            if self.max_workers < 2 or page_count < self.parallel_page_threshold:
+                for page in document:
+                    yield page.get_text()  # type: ignore
+                return
+
+        yield from self.iter_pages_parallel(source, page_count)  # type: ignore
+
+    def iter_pages_parallel(
+        self, source: str | bytes, page_count: int
+    ) -> Iterator[str]:
+        """Yield page texts in order while page ranges are extracted in parallel."""
+        shard_size = max(
+            MIN_PAGES_PER_SHARD, math.ceil(page_count / (self.max_workers * 4))
+        )
+        logger.info(
+            f"Extracting {page_count} pages with {self.max_workers} processes "
+            f"in shards of {shard_size} pages."
+        )
+
+        shm: SharedMemory | None = None
+        if isinstance(source, str):
+            worker_source: str | tuple[str, int] = source
+        else:
+            # Share the bytes once instead of pickling them for every shard
+            shm = SharedMemory(create=True, size=max(len(source), 1))
+            shm.buf[: len(source)] = source
+            worker_source = (shm.name, len(source))
+
+        # Only a window of shards runs ahead of the consumer, so the texts
+        # held in memory stay bounded however long the document is
+        futures: Deque[Future[List[str]]] = deque()
+        starts = iter(range(0, page_count, shard_size))
+        try:
+            pool = self._get_pool()
+            while True:
+                while len(futures) < self.max_workers * SHARDS_IN_FLIGHT_PER_WORKER:
+                    start = next(starts, None)
+                    if start is None:
+                        break
+                    end = min(start + shard_size, page_count)
+                    futures.append(
+                        pool.submit(_extract_range, worker_source, start, end)
+                    )
+                if not futures:
+                    break
+                pages = futures[0].result()
+                futures.popleft()
+                yield from pages
+        finally:
+            for future in futures:
+                future.cancel()
+            if shm is not None:
+                # Wait for running shards before releasing their shared memory
+                for future in futures:
+                    if not future.cancelled():
+                        future.exception()
+                shm.close()
+                shm.unlink()
+
+    def extract(self, source: str | bytes | BinaryIO) -> str:
         try:
-            document = fitz.open(filepath)
-            all_text = ""
-            for page_num in range(len(document)):
-                page = document.load_page(page_num)  # type: ignore
-                all_text += page.get_text()  # type: ignore
-            return all_text  # type: ignore
+            return "".join(self.iter_pages(source))
 
         except Exception as e:
-            logger.error(f"Error extracting text from {filepath}: {e}")
+            logger.error(f"Error extracting text from {_describe(source)}: {e}")
             return ""
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn is safe to use from a process that already runs threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=get_context("spawn")
+                )
+            return self._pool
+
+
+def _describe(source: str | bytes | BinaryIO) -> str:
+    """Describe an extraction source for log messages."""
+    if isinstance(source, str):
+        return source
+    return f"<{len(source)} bytes>" if isinstance(source, bytes) else "<stream>"
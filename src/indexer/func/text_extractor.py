@@ -0,0 +1,102 @@
+from typing import BinaryIO, Iterator
+import codecs
+import io
+import logging
+import mmap
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_BYTES = 256 * 1024
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def iter_blocks(
+    source: str | bytes | BinaryIO, block_bytes: int = SEGMENT_BYTES
+) -> Iterator[bytes]:
+    """Yield the bytes of a file in blocks of at most `block_bytes`.
+
+    Paths and real files are memory-mapped; other streams (e.g. uploads
+    spooled in memory) are read block by block.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), block_bytes):
+            yield bytes(view[start : start + block_bytes])
+        return
+    if isinstance(source, str):
+        with open(source, "rb") as file:
+            yield from iter_mapped_blocks(file, block_bytes)
+        return
+    try:
+        source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        while block := source.read(block_bytes):
+            yield block
+        return
+    yield from iter_mapped_blocks(source, block_bytes)
+
+
+def iter_mapped_blocks(file: BinaryIO, block_bytes: int) -> Iterator[bytes]:
+    """Read a file through a memory map, releasing pages once they are read.
+
+    Without releasing them, every page read stays resident until the map is
+    closed, so memory would grow with the file size.
+    """
+    # Page-aligned blocks, so that consumed ranges can be released
+    block_bytes = max(mmap.PAGESIZE, block_bytes // mmap.PAGESIZE * mmap.PAGESIZE)
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files cannot be mapped
+        return
+    with mapped:
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        for start in range(0, len(mapped), block_bytes):
+            yield mapped[start : start + block_bytes]
+            if hasattr(mmap, "MADV_DONTNEED"):
+                length = min(block_bytes, len(mapped) - start)
+                mapped.madvise(mmap.MADV_DONTNEED, start, length)
+
+
+def detect_bom(head: bytes, default: str) -> str:
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    return default
+
+
+def decode_blocks(blocks: Iterator[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """Decode blocks incrementally, so characters split across blocks survive.
+
+    A byte order mark overrides `encoding`; undecodable bytes are replaced.
+    """
+    decoder = None
+    for block in blocks:
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(detect_bom(block, encoding))(
+                errors="replace"
+            )
+        if text := decoder.decode(block):
+            yield text
+    if decoder is not None and (text := decoder.decode(b"", final=True)):
+        yield text
+
+
+class TextExtractor:
+    def __init__(self, segment_bytes: int = SEGMENT_BYTES, encoding: str = "utf-8"):
+        """Extract plain text and Markdown in segments of `segment_bytes`.
+
+        Only one segment is decoded at a time, so large text dumps are
+        indexed with bounded memory.
+        """
+        self.segment_bytes = segment_bytes
+        self.encoding = encoding
+
+    def iter_pages(self, source: str | bytes | BinaryIO) -> Iterator[str]:
+        yield from decode_blocks(iter_blocks(source, self.segment_bytes), self.encoding)
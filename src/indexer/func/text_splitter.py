@@ -0,0 +1,98 @@
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+class RecursiveTextSplitter:
+    """Split text recursively on a list of separators.
+
+    Produces the same chunks as LangChain's `RecursiveCharacterTextSplitter`
+    with its defaults (separators kept at the start of the following piece,
+    surrounding whitespace stripped, length measured in characters).
+    Separators are matched literally with `str.split`, and each chunk is
+    joined once from a contiguous slice of the pieces.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: List[str] | None = None,
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Chunk overlap ({chunk_overlap}) is larger than "
+                f"chunk size ({chunk_size})."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or DEFAULT_SEPARATORS
+
+    def split_text(self, text: str) -> List[str]:
+        chunks: List[str] = []
+        self._split(text, self.separators, chunks)
+        return chunks
+
+    def _split(self, text: str, separators: List[str], chunks: List[str]):
+        separator = separators[-1]
+        remaining: List[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if candidate in text:
+                separator = candidate
+                remaining = separators[i + 1 :]
+                break
+
+        good: List[str] = []
+        for piece in split_keeping_separator(text, separator):
+            if len(piece) < self.chunk_size:
+                good.append(piece)
+                continue
+            if good:
+                self._merge(good, chunks)
+                good = []
+            if remaining:
+                self._split(piece, remaining, chunks)
+            else:
+                chunks.append(piece)
+        if good:
+            self._merge(good, chunks)
+
+    def _merge(self, pieces: List[str], chunks: List[str]):
+        """Merge small pieces into chunks, overlapping by up to chunk_overlap."""
+        lengths = [len(piece) for piece in pieces]
+        head = 0
+        total = 0
+        for i, length in enumerate(lengths):
+            if total + length > self.chunk_size and i > head:
+                _append_stripped(chunks, "".join(pieces[head:i]))
+                # Drop pieces from the front until only the overlap is left
+                # and the next piece fits
+                while total > self.chunk_overlap or (
+                    total + length > self.chunk_size and total > 0
+                ):
+                    total -= lengths[head]
+                    head += 1
+            total += length
+        _append_stripped(chunks, "".join(pieces[head:]))
+
+
+def split_keeping_separator(text: str, separator: str) -> List[str]:
+    """Split text, keeping each separator at the start of the next piece."""
+    if not separator:
+        return list(text)
+    first, *rest = text.split(separator)
+    pieces = [first] if first else []
+    pieces.extend(separator + piece for piece in rest)
+    return pieces
+
+
+def _append_stripped(chunks: List[str], chunk: str):
+    chunk = chunk.strip()
+    if chunk:
+        chunks.append(chunk)
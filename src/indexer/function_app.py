@@ -1,37 +1,442 @@
+from contextlib import contextmanager
+from dataclasses import asdict
+from itertools import chain
+from typing import TYPE_CHECKING, Iterator, TypeVar
+import asyncio
+import json
 import logging
-import tempfile
 import os
+import threading
+import time
 
 import azure.functions as func
 
-from clients import AzureSearchClient, AzureEmbeddingClient
-from func import chunk_text, extract_text_from_file
-from core.config import Settings
-from utilities.utils import save_chunks_to_file
+from core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    default_memory_budget,
+    estimate_cost,
+)
+from core.config import Settings, job_store_path
+from core.jobs import Job, JobDeferred, JobStore, JobWorker, report_progress
+from core.lazy import Lazy
+from core.manifest import ManifestStore, hash_bytes
+from core.metrics import metrics
+from core.ttl_cache import TtlCache
+from core.uploads import Upload, UploadStore
+from func import (
+    DocxExtractor,
+    HtmlExtractor,
+    PdfExtractor,
+    TextExtractor,
+    count_pages,
+    extract_pages,
+    is_supported,
+    iter_chunks,
+    iter_uploaded_files,
+    register_extractor,
+    supported_extensions,
+    uploaded_size,
+)
+
+if TYPE_CHECKING:
+    from clients import (
+        AsyncIndexingPipeline,
+        AzureSearchClient,
+        DeploymentPool,
+        EmbeddingCache,
+        LocalIndexBackend,
+        Retriever,
+    )
+    from core.artifacts import ArtifactStore
+    from func.dedup import ChunkDeduplicator
 
 logger = logging.getLogger(__name__)
 
-if os.environ.get("ENVIRONMENT") == "test":
-    search_client = None
-    logger.info("Running in TEST environment. Dependencies will be mocked.")
-else:
+T = TypeVar("T")
+
+
+# Clients are created on first use rather than at import time, so the
+# OpenAI and Azure SDKs are only imported once a request needs them.
+def create_settings() -> Settings:
+    config = Settings()
+    metrics.configure(config.metrics_exporter)
+    return config
+
+
+def create_embedding_cache() -> "EmbeddingCache":
+    from clients import EmbeddingCache
+
+    config = settings.get()
+    return EmbeddingCache(
+        config.embedding_cache_path or None,
+        max_memory_items=config.embedding_cache_memory_items,
+        max_disk_bytes=config.embedding_cache_max_bytes,
+        dtype=config.embedding_dtype,
+    )
+
+
+def create_embedding_pool() -> "DeploymentPool":
+    from clients import DeploymentPool
+
+    config = settings.get()
+    return DeploymentPool(
+        config.aoai_deployments,
+        max_concurrency=config.embedding_max_concurrency,
+        max_retries=config.embedding_max_retries,
+    )
+
+
+def create_local_backend() -> "LocalIndexBackend | None":
+    from clients import LocalIndexBackend
+    from core.vector_store import VectorStore
+
+    config = settings.get()
+    if config.index_backend != "local":
+        return None
+    return LocalIndexBackend(
+        VectorStore(
+            config.local_index_path,
+            ivf_lists=config.local_index_ivf_lists,
+            ivf_probes=config.local_index_ivf_probes,
+        )
+    )
+
+
+def create_search_client() -> "AzureSearchClient":
+    from clients import AzureEmbeddingClient, AzureSearchClient
+
+    config = settings.get()
+    embedding_client = AzureEmbeddingClient(
+        config, embedding_cache.get(), embedding_pool.get()
+    )
+    return AzureSearchClient(
+        config,
+        embedding_client,
+        manifest.get(),
+        artifact_store.get(),
+        backend=local_backend.get(),
+    )
+
+
+def create_indexing_pipeline() -> "AsyncIndexingPipeline":
+    from clients import (
+        AsyncAzureEmbeddingClient,
+        AsyncAzureSearchClient,
+        AsyncIndexingPipeline,
+        AsyncLocalIndexBackend,
+    )
+
+    config = settings.get()
+    pool = embedding_pool.get()
+    backend = local_backend.get()
+    return AsyncIndexingPipeline(
+        AsyncAzureEmbeddingClient(config, embedding_cache.get(), pool),
+        (
+            AsyncAzureSearchClient(config)
+            if backend is None
+            else AsyncLocalIndexBackend(backend)
+        ),
+        max_concurrent_embeddings=pool.max_concurrency,
+        max_concurrent_uploads=config.upload_max_concurrency,
+        upload_batch_size=config.upload_batch_size,
+        manifest=manifest.get(),
+        upload_max_bytes=config.upload_batch_max_bytes,
+        upload_max_retries=config.upload_max_retries,
+        upload_retry_backoff_seconds=config.upload_retry_backoff_seconds,
+        artifacts=artifact_store.get(),
+    )
+
+
+def create_retriever() -> "Retriever":
+    from clients import Retriever
+
+    config = settings.get()
+    # Shares the embedding client and index backend used for indexing
+    client = search_client.get()
+    return Retriever(
+        client.embedding_client,
+        client.client,  # type: ignore
+        embedding_cache=TtlCache(
+            config.query_embedding_cache_items,
+            config.query_embedding_cache_ttl_seconds,
+        ),
+        result_cache=TtlCache(
+            config.search_result_cache_items, config.search_result_cache_ttl_seconds
+        ),
+        revision=manifest.get().revision,
+    )
+
+
+def configure_extractors():
+    config = settings.get()
+    register_extractor(
+        ".pdf",
+        PdfExtractor(
+            parallel_page_threshold=config.pdf_parallel_page_threshold,
+            max_workers=config.pdf_extraction_workers,
+        ),
+    )
+    for ext in (".txt", ".md", ".markdown"):
+        register_extractor(ext, TextExtractor(config.extract_segment_bytes))
+    for ext in (".html", ".htm"):
+        register_extractor(ext, HtmlExtractor(config.extract_segment_bytes))
+    register_extractor(".docx", DocxExtractor(config.extract_segment_bytes))
+
+
+def create_artifact_store() -> "ArtifactStore | None":
+    from clients.clients import cache_namespace
+    from core.artifacts import ArtifactStore
+
+    config = settings.get()
+    if not config.artifact_store_path:
+        return None
+    pool = embedding_pool.get()
+    return ArtifactStore(
+        config.artifact_store_path,
+        model=cache_namespace(
+            pool.model, config.embedding_dimensions, config.embedding_dtype
+        ),
+    )
+
+
+def create_deduplicator() -> "ChunkDeduplicator | None":
+    from core.signatures import SignatureStore
+    from func.dedup import ChunkDeduplicator
+
+    config = settings.get()
+    if config.dedup_mode == "off":
+        return None
+    return ChunkDeduplicator(
+        threshold=config.dedup_near_threshold,
+        num_perm=config.dedup_num_perm,
+        shingle_size=config.dedup_shingle_size,
+        min_chars=config.dedup_min_chars,
+        store=(
+            SignatureStore(config.dedup_store_path)
+            if config.dedup_mode == "global"
+            else None
+        ),
+    )
+
+
+def create_admission_controller() -> AdmissionController:
+    config = settings.get()
+    return AdmissionController(
+        config.admission_memory_budget_bytes or default_memory_budget(),
+        max_concurrent=config.admission_max_concurrent,
+        max_queued=config.admission_max_queued,
+        queue_timeout_seconds=config.admission_queue_timeout_seconds,
+    )
+
+
+def create_job_worker() -> JobWorker:
+    worker = JobWorker(
+        job_store.get(), run_indexing_job, workers=settings.get().job_workers
+    )
+    worker.start()
+    return worker
+
+
+settings = Lazy(create_settings, "settings")
+manifest = Lazy(lambda: ManifestStore(settings.get().index_manifest_path), "manifest")
+embedding_cache = Lazy(create_embedding_cache, "embedding cache")
+# Shared by the sync and async embedding clients, so quotas cover both
+embedding_pool = Lazy(create_embedding_pool, "embedding deployment pool")
+artifact_store = Lazy(create_artifact_store, "artifact store")
+# Shared by the sync and async clients, which write to the same store
+local_backend = Lazy(create_local_backend, "local index")
+extractors = Lazy(configure_extractors, "extractors")
+deduplicator = Lazy(create_deduplicator, "chunk deduplicator")
+search_client = Lazy(create_search_client, "search client")
+retriever = Lazy(create_retriever, "retriever")
+indexing_pipeline = Lazy(create_indexing_pipeline, "indexing pipeline")
+admission = Lazy(create_admission_controller, "admission controller")
+job_store = Lazy(
+    lambda: JobStore(
+        settings.get().job_store_path,
+        retention_seconds=settings.get().job_retention_seconds,
+    ),
+    "job store",
+)
+job_worker = Lazy(create_job_worker, "job worker")
+upload_store = Lazy(
+    lambda: UploadStore(
+        settings.get().upload_store_path, settings.get().upload_ttl_seconds
+    ),
+    "upload store",
+)
+
+
+def get_or_none(lazy: Lazy[T]) -> T | None:
+    """Return a lazily created client, or None if it could not be created."""
     try:
-        settings = Settings()
-        embedding_client = AzureEmbeddingClient(settings)
-        search_client = AzureSearchClient(settings, embedding_client)
-        logger.info("Clients initialized successfully.")
+        return lazy.get()
     except Exception as e:
-        logger.critical(f"Fatal error during client initialization: {e}", exc_info=True)
-        search_client = None
+        logger.critical(
+            f"Fatal error during initialization of {lazy.name}: {e}", exc_info=True
+        )
+        return None
+
+
+def warm_up():
+    """Create all clients and import PyMuPDF ahead of the first request."""
+    # Starting the job worker also resumes jobs queued before a restart
+    for lazy in (
+        settings,
+        extractors,
+        deduplicator,
+        search_client,
+        retriever,
+        indexing_pipeline,
+        job_worker,
+    ):
+        get_or_none(lazy)
+    import fitz  # type: ignore # noqa: F401
+
+    logger.info("Warm-up finished.")
+
+
+def resume_jobs():
+    """Start the job worker if jobs were queued before a restart.
+
+    Only the job file is read to check; settings and clients are created
+    once there is a job to run.
+    """
+    path = job_store_path()
+    try:
+        pending = os.path.exists(path) and JobStore(path).pending()
+    except Exception as e:
+        logger.error(f"Could not check for queued jobs: {e}", exc_info=True)
+        return
+    if pending:
+        get_or_none(job_worker)
+
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
+if os.environ.get("WARM_UP_ON_START", "false").lower() == "true":
+    # Overlap initialization with the host start-up instead of the first request
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+elif os.environ.get("ENVIRONMENT") != "test":
+    threading.Thread(target=resume_jobs, name="resume-jobs", daemon=True).start()
+
+
+@app.warm_up_trigger("warmup")
+def warmup(warmup) -> None:
+    """Runs when the platform adds an instance (Premium and Dedicated plans)."""
+    warm_up()
+
+
+def read_uploaded_file(req: func.HttpRequest) -> tuple[str, bytes] | func.HttpResponse:
+    """Return the name and bytes of the uploaded file, or an error response."""
+    file = req.files.get("file")
+    if not file:
+        return func.HttpResponse("Please provide a file to index.", status_code=400)
+
+    file_name = file.filename
+    if not file_name:
+        return func.HttpResponse("File name could not be determined.", status_code=400)
+    # Reject unsupported types before reading the upload
+    if not is_supported(file_name):
+        return func.HttpResponse(
+            f"Unsupported file type for '{file_name}'. "
+            f"Supported types: {', '.join(supported_extensions())}.",
+            status_code=415,
+        )
+    file_bytes: bytes = file.read()
+    return file_name, file_bytes
+
+
+def extract_chunks(
+    file_name: str, file_bytes: bytes
+) -> tuple[str, Iterator[str]] | func.HttpResponse:
+    """Start streaming the chunks of a file.
+
+    Returns the content hash and a lazy stream of chunks, or a response to
+    send back as-is (errors, or a file that was already indexed unchanged).
+    Pages are extracted and chunked only as the stream is read.
+    """
+    content_hash = hash_bytes(file_bytes)
+    manifest_store = get_or_none(manifest)
+    if manifest_store and manifest_store.is_unchanged(file_name, content_hash):
+        message = f"'{file_name}' is already indexed and unchanged. Skipped."
+        logger.info(message)
+        return func.HttpResponse(message, status_code=200)
+
+    logger.info(f"Received file: {file_name}. Extracting text.")
+
+    # 2. Extract text from file and 3. chunk it, page by page
+    extractors.get()
+    chunks = iter_chunks(extract_pages(file_name, file_bytes))
+    try:
+        first_chunk = next(chunks, None)
+    except Exception:
+        # Logged by extract_pages; the file is broken rather than the service
+        first_chunk = None
+    if first_chunk is None:
+        logger.warning(f"No text could be extracted from {file_name}.")
+        return func.HttpResponse(
+            f"Could not extract text from '{file_name}'. This may be an unsupported file format or the file may be empty.",
+            status_code=400,
+        )
+
+    return content_hash, deduplicate(file_name, chain([first_chunk], chunks))
+
+
+def deduplicate(file_name: str, chunks: Iterator[str]) -> Iterator[str]:
+    """Drop duplicate chunks from the stream, so they are never embedded."""
+    chunk_deduplicator = get_or_none(deduplicator)
+    if chunk_deduplicator is None:
+        return chunks
+    from func.dedup import DedupReport
+
+    return chunk_deduplicator.filter(file_name, chunks, DedupReport(file_name))
+
+
+def save_signatures(file_name: str, indexed: bool):
+    """Keep a document's dedup signatures only once it was fully indexed."""
+    chunk_deduplicator = get_or_none(deduplicator)
+    if chunk_deduplicator is None:
+        return
+    if indexed:
+        chunk_deduplicator.commit(file_name)
+    else:
+        chunk_deduplicator.discard(file_name)
+
+
+@contextmanager
+def signatures_saved_on_success(file_name: str) -> Iterator[None]:
+    try:
+        yield
+    except BaseException:
+        save_signatures(file_name, False)
+        raise
+    save_signatures(file_name, True)
+
+
+def upload_cost(file_name: str, file_bytes: bytes) -> int:
+    """Estimate the memory needed to index an upload, for admission control."""
+    pages = count_pages(file_bytes) if file_name.lower().endswith(".pdf") else 0
+    return estimate_cost(
+        len(file_bytes), pages, settings.get().admission_bytes_per_page
+    )
+
+
+def too_busy(rejection: AdmissionRejected) -> func.HttpResponse:
+    return func.HttpResponse(
+        f"{rejection} Retry after {rejection.retry_after}s.",
+        status_code=429,
+        headers={"Retry-After": str(rejection.retry_after)},
+    )
+
 
 @app.route(route="indexer")
 def indexer(req: func.HttpRequest) -> func.HttpResponse:
     logger.info("Python HTTP trigger function processed a request.")
 
-    if not search_client:
+    client = get_or_none(search_client)
+    if not client:
         logger.error("Search client is not initialized due to a startup error.")
         return func.HttpResponse(
             "Internal Server Error: Service is not available.", status_code=500
@@ -39,59 +444,520 @@ def indexer(req: func.HttpRequest) -> func.HttpResponse:
 
     try:
         # 1. Get file from request
-        file = req.files.get("file")
-        if not file:
-            return func.HttpResponse("Please provide a file to index.", status_code=400)
-
-        file_bytes: bytes = file.read()
-        file_name = file.filename
-        if not file_name:
-            return func.HttpResponse(
-                "File name could not be determined.", status_code=400
+        uploaded = read_uploaded_file(req)
+        if isinstance(uploaded, func.HttpResponse):
+            return uploaded
+        # Extracted text, chunks and vectors are held until indexing ends
+        with admission.get().admit(upload_cost(*uploaded)):
+            return index_upload(client, *uploaded)
+
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        return func.HttpResponse("An unexpected error occurred.", status_code=500)
+
+
+def index_upload(
+    client: "AzureSearchClient", file_name: str, file_bytes: bytes
+) -> func.HttpResponse:
+    extracted = extract_chunks(file_name, file_bytes)
+    if isinstance(extracted, func.HttpResponse):
+        return extracted
+    content_hash, chunks = extracted
+
+    # 4. Index chunks to Azure Search as they are produced
+    config = settings.get()
+    if config.PERFORM_INDEXING.lower() != "false":
+        logger.info(f"Indexing chunks of {file_name} to Azure Search.")
+
+        with signatures_saved_on_success(file_name):
+            uploaded = client.index_document(
+                file_name,
+                content_hash,
+                chunks,
+                window=config.stream_window_chunks,
             )
 
-        logger.info(f"Received file: {file_name}. Creating temporary file.")
+        success_message = (
+            f"Finished all processes for {file_name} and indexed {uploaded} chunks ."
+        )
+        logger.info(success_message)
+    else:
+        chunk_count = sum(1 for _ in chunks)
+        save_signatures(file_name, False)
+        success_message = f"DRY RUN: Finished all processes for {file_name} ({chunk_count} chunks). Indexing was skipped."
+        logger.info(success_message)
 
-        # 2. Extract text from file
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_file_path = os.path.join(temp_dir, file_name)
+    return func.HttpResponse(success_message, status_code=200)
 
-            with open(temp_file_path, "wb") as f:
-                f.write(file_bytes)
 
-            logger.info(f"Temporary file created at {temp_file_path}. Extracting text.")
+@app.route(route="indexer/async")
+async def indexer_async(req: func.HttpRequest) -> func.HttpResponse:
+    """Same as `indexer`, but embeds and uploads concurrently without blocking."""
+    logger.info("Python async HTTP trigger function processed a request.")
 
-            text = extract_text_from_file(temp_file_path)
+    # Creating the pipeline imports the SDKs, so keep it off the event loop
+    pipeline = await asyncio.to_thread(get_or_none, indexing_pipeline)
+    if not pipeline:
+        logger.error("Indexing pipeline is not initialized due to a startup error.")
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
 
-        if not text:
-            logger.warning(f"No text could be extracted from {file_name}.")
-            return func.HttpResponse(
-                f"Could not extract text from '{file_name}'. This may be an unsupported file format or the file may be empty.",
-                status_code=400,
-            )
+    try:
+        uploaded = await asyncio.to_thread(read_uploaded_file, req)
+        if isinstance(uploaded, func.HttpResponse):
+            return uploaded
+        # Counting PDF pages scans the whole file, so keep it off the event loop
+        cost = await asyncio.to_thread(upload_cost, *uploaded)
+        async with admission.get().admit_async(cost):
+            return await index_upload_async(pipeline, *uploaded)
+
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        return func.HttpResponse("An unexpected error occurred.", status_code=500)
+
+
+async def index_upload_async(
+    pipeline: "AsyncIndexingPipeline", file_name: str, file_bytes: bytes
+) -> func.HttpResponse:
+    # Extraction is CPU-bound, so keep it off the event loop
+    extracted = await asyncio.to_thread(extract_chunks, file_name, file_bytes)
+    if isinstance(extracted, func.HttpResponse):
+        return extracted
+    content_hash, chunks = extracted
 
-        # 3. Chunk text
-        logger.info(f"Extracted text from {file_name}. Chunking text.")
-        chunks = chunk_text(text)
+    # 4. Index chunks to Azure Search as they are produced
+    if settings.get().PERFORM_INDEXING.lower() != "false":
+        logger.info(f"Indexing chunks of {file_name} to Azure Search.")
+
+        with signatures_saved_on_success(file_name):
+            uploaded = await pipeline.index_document(file_name, content_hash, chunks)
+
+        success_message = (
+            f"Finished all processes for {file_name} and indexed {uploaded} chunks ."
+        )
+        logger.info(success_message)
+    else:
+        chunk_count = await asyncio.to_thread(sum, (1 for _ in chunks))
+        save_signatures(file_name, False)
+        success_message = f"DRY RUN: Finished all processes for {file_name} ({chunk_count} chunks). Indexing was skipped."
+        logger.info(success_message)
+
+    return func.HttpResponse(success_message, status_code=200)
+
+
+def iter_bulk_documents(
+    req: func.HttpRequest,
+) -> Iterator[tuple[str, str, Iterator[str]]]:
+    """Lazily yield (file name, content hash, chunks) for a bulk upload.
+
+    Every `file` field of the request is a document or a ZIP archive whose
+    members are read one at a time. Chunks are extracted as they are read.
+    """
+    extractors.get()
+    files = ((file.filename or "", file.stream) for file in req.files.getlist("file"))
+    for file_name, file_bytes in iter_uploaded_files(files, accept=is_supported):
+        chunks = iter_chunks(extract_pages(file_name, file_bytes))
+        yield file_name, hash_bytes(file_bytes), deduplicate(file_name, chunks)
+
+
+@app.route(route="indexer/bulk", methods=["POST"])
+async def indexer_bulk(req: func.HttpRequest) -> func.HttpResponse:
+    """Index many files or ZIP archives, sharing batches across documents."""
+    logger.info("Python async HTTP trigger function processed a bulk request.")
+
+    pipeline = await asyncio.to_thread(get_or_none, indexing_pipeline)
+    if not pipeline:
+        logger.error("Indexing pipeline is not initialized due to a startup error.")
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
 
-        save_chunks_to_file(chunks, file_name)
+    files = req.files.getlist("file")
+    if not files:
+        return func.HttpResponse("Please provide files to index.", status_code=400)
 
-        # 4. Index chunks to Azure Search
-        if settings.PERFORM_INDEXING.lower() != "false":
-            logger.info(
-                f"Chunking complete. Indexing {len(chunks)} chunks to Azure Search."
+    try:
+        # ZIP archives are charged by the size of their decompressed members
+        cost = estimate_cost(
+            sum(
+                uploaded_size(file.filename or "", file.stream, accept=is_supported)
+                for file in files
             )
+        )
+        async with admission.get().admit_async(cost):
+            return await index_bulk_upload(pipeline, req)
 
-            search_client.index_chunks(chunks)
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        return func.HttpResponse("An unexpected error occurred.", status_code=500)
 
-            success_message = f"Finished all processes for {file_name} and indexed {len(chunks)} chunks ."
-            logger.info(success_message)
-        else:
-            success_message = f"DRY RUN: Finished all processes for {file_name}. Indexing was skipped."
-            logger.info(success_message)
 
+async def index_bulk_upload(
+    pipeline: "AsyncIndexingPipeline", req: func.HttpRequest
+) -> func.HttpResponse:
+    if settings.get().PERFORM_INDEXING.lower() == "false":
+        counts = await asyncio.to_thread(
+            lambda: {
+                name: sum(1 for _ in chunks)
+                for name, _, chunks in iter_bulk_documents(req)
+            }
+        )
+        for name in counts:
+            save_signatures(name, False)
+        success_message = f"DRY RUN: Finished all processes for {len(counts)} files ({sum(counts.values())} chunks). Indexing was skipped."
+        logger.info(success_message)
         return func.HttpResponse(success_message, status_code=200)
 
+    names: list[str] = []
+
+    def documents() -> Iterator[tuple[str, str, Iterator[str]]]:
+        for document in iter_bulk_documents(req):
+            names.append(document[0])
+            yield document
+
+    started = time.perf_counter()
+    try:
+        results = await pipeline.index_documents(
+            documents(),
+            max_parallel_documents=settings.get().bulk_max_parallel_documents,
+        )
+    except BaseException:
+        for name in names:
+            save_signatures(name, False)
+        raise
+    elapsed = time.perf_counter() - started
+    for result in results:
+        save_signatures(result.document_key, result.status == "indexed")
+
+    summary = {
+        "documents": len(results),
+        "indexed": sum(result.status == "indexed" for result in results),
+        "unchanged": sum(result.status == "unchanged" for result in results),
+        "failed": sum(result.status == "failed" for result in results),
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_minute": round(len(results) / max(elapsed, 1e-6) * 60, 1),
+        "results": [result.to_dict() for result in results],
+    }
+    logger.info(
+        f"Bulk indexing finished: {summary['documents']} documents in "
+        f"{elapsed:.1f}s ({summary['documents_per_minute']} documents/min)."
+    )
+    # 207: the body holds a per-file status, some of which may be failures
+    status_code = 207 if summary["failed"] else 200
+    return func.HttpResponse(
+        json.dumps(summary, ensure_ascii=False),
+        status_code=status_code,
+        mimetype="application/json",
+    )
+
+
+def run_indexing_job(job: Job) -> str:
+    """Index a queued upload, reporting progress to the job store."""
+    payload = job_store.get().read_payload(job.job_id)
+    # A busy worker defers the job rather than failing it or blocking forever
+    try:
+        with admission.get().admit(upload_cost(job.file_name, payload)):
+            return index_job_payload(job, payload)
+    except AdmissionRejected as e:
+        raise JobDeferred(str(e), e.retry_after) from e
+
+
+def index_job_payload(job: Job, payload: bytes) -> str:
+    store = job_store.get()
+    client = search_client.get()
+    config = settings.get()
+
+    store.update_progress(job, "extracting")
+    extracted = extract_chunks(job.file_name, payload)
+    if isinstance(extracted, func.HttpResponse):
+        message = extracted.get_body().decode("utf-8")
+        if extracted.status_code != 200:
+            raise ValueError(message)
+        return message
+    content_hash, chunks = extracted
+    chunks = report_progress(
+        chunks, lambda count: store.update_progress(job, "indexing", count)
+    )
+
+    if config.PERFORM_INDEXING.lower() == "false":
+        chunk_count = sum(1 for _ in chunks)
+        save_signatures(job.file_name, False)
+        return f"DRY RUN: Finished all processes for {job.file_name} ({chunk_count} chunks). Indexing was skipped."
+
+    with signatures_saved_on_success(job.file_name):
+        uploaded = client.index_document(
+            job.file_name, content_hash, chunks, window=config.stream_window_chunks
+        )
+    return f"Finished all processes for {job.file_name} and indexed {uploaded} chunks ."
+
+
+@app.route(route="indexer/jobs", methods=["POST"])
+def submit_indexing_job(req: func.HttpRequest) -> func.HttpResponse:
+    """Queue an upload for background indexing and return 202 with its job ID."""
+    logger.info("Python HTTP trigger function received an indexing job.")
+
+    worker = get_or_none(job_worker)
+    if not worker:
+        logger.error("Job worker is not initialized due to a startup error.")
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    try:
+        uploaded = read_uploaded_file(req)
+        if isinstance(uploaded, func.HttpResponse):
+            return uploaded
+        file_name, file_bytes = uploaded
+
+        return enqueue_job(worker, file_name, file_bytes)
+
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}", exc_info=True)
         return func.HttpResponse("An unexpected error occurred.", status_code=500)
+
+
+def enqueue_job(worker: JobWorker, file_name: str, data: bytes) -> func.HttpResponse:
+    """Queue a file for indexing and return 202 pointing at the job."""
+    job = worker.store.enqueue(file_name, data)
+    worker.notify()
+
+    status_url = f"/api/indexer/jobs/{job.job_id}"
+    return func.HttpResponse(
+        json.dumps(
+            {"job_id": job.job_id, "status": job.status, "status_url": status_url}
+        ),
+        status_code=202,
+        mimetype="application/json",
+        headers={"Location": status_url},
+    )
+
+
+def upload_response(upload: Upload, status_code: int = 200) -> func.HttpResponse:
+    return func.HttpResponse(
+        json.dumps(upload.to_dict()),
+        status_code=status_code,
+        mimetype="application/json",
+    )
+
+
+@app.route(route="indexer/uploads", methods=["POST"])
+def create_upload(req: func.HttpRequest) -> func.HttpResponse:
+    """Start a resumable upload of a file that is sent in fixed-size parts.
+
+    The JSON body names the file and its size in bytes. The response holds
+    the upload ID, the part size and the number of parts to send.
+    """
+    store = get_or_none(upload_store)
+    if not store:
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    try:
+        body = req.get_json()
+        file_name = str(body.get("file_name") or "")
+        size = int(body.get("size", -1))
+    except (AttributeError, TypeError, ValueError):
+        return func.HttpResponse(
+            "Please provide a JSON body with 'file_name' and 'size'.", status_code=400
+        )
+    if not file_name or size < 0:
+        return func.HttpResponse(
+            "Please provide a JSON body with 'file_name' and 'size'.", status_code=400
+        )
+    if not is_supported(file_name):
+        return func.HttpResponse(
+            f"Unsupported file type for '{file_name}'. "
+            f"Supported types: {', '.join(supported_extensions())}.",
+            status_code=415,
+        )
+    config = settings.get()
+    if size > config.upload_max_bytes:
+        return func.HttpResponse(
+            f"Files larger than {config.upload_max_bytes} bytes are not accepted.",
+            status_code=413,
+        )
+
+    upload = store.create(file_name, size, config.upload_part_bytes)
+    return upload_response(upload, status_code=201)
+
+
+@app.route(route="indexer/uploads/{upload_id}", methods=["GET", "DELETE"])
+def get_upload(req: func.HttpRequest) -> func.HttpResponse:
+    """Report which parts of an upload arrived, or abandon the upload."""
+    store = get_or_none(upload_store)
+    if not store:
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    upload = store.get(req.route_params.get("upload_id", ""))
+    if upload is None:
+        return func.HttpResponse("Upload not found.", status_code=404)
+    if req.method == "DELETE":
+        store.delete(upload.upload_id)
+        return func.HttpResponse(status_code=204)
+    return upload_response(upload)
+
+
+@app.route(route="indexer/uploads/{upload_id}/parts/{part:int}", methods=["PUT"])
+def put_upload_part(req: func.HttpRequest) -> func.HttpResponse:
+    """Store one part of an upload; the body holds the part's raw bytes."""
+    store = get_or_none(upload_store)
+    if not store:
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    upload = store.get(req.route_params.get("upload_id", ""))
+    if upload is None:
+        return func.HttpResponse("Upload not found.", status_code=404)
+    try:
+        store.write_part(upload, int(req.route_params["part"]), req.get_body())
+    except ValueError as e:
+        return func.HttpResponse(str(e), status_code=400)
+    return func.HttpResponse(status_code=204)
+
+
+@app.route(route="indexer/uploads/{upload_id}/complete", methods=["POST"])
+def complete_upload(req: func.HttpRequest) -> func.HttpResponse:
+    """Assemble an upload whose parts all arrived and queue it for indexing."""
+    worker = get_or_none(job_worker)
+    store = get_or_none(upload_store)
+    if not worker or not store:
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    upload = store.get(req.route_params.get("upload_id", ""))
+    if upload is None:
+        return func.HttpResponse("Upload not found.", status_code=404)
+    if upload.missing:
+        # The client resends these and completes the upload again
+        return upload_response(upload, status_code=409)
+
+    try:
+        response = enqueue_job(worker, upload.file_name, store.assemble(upload))
+        store.delete(upload.upload_id)
+        return response
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        return func.HttpResponse("An unexpected error occurred.", status_code=500)
+
+
+@app.route(route="indexer/jobs/{job_id}", methods=["GET"])
+def get_indexing_job(req: func.HttpRequest) -> func.HttpResponse:
+    """Report the status, stage and progress of an indexing job."""
+    store = get_or_none(job_store)
+    if not store:
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    job = store.get(req.route_params.get("job_id", ""))
+    if job is None:
+        return func.HttpResponse("Job not found.", status_code=404)
+    return func.HttpResponse(
+        json.dumps(job.to_dict()), status_code=200, mimetype="application/json"
+    )
+
+
+def parse_search_request(
+    req: func.HttpRequest,
+) -> tuple[str, int, str | None] | func.HttpResponse:
+    """Return the query, result count and filter, or an error response.
+
+    GET takes `query`, `top` and `filter` parameters; POST takes the same
+    fields as a JSON object.
+    """
+    if req.method == "POST":
+        try:
+            body = req.get_json()
+        except ValueError:
+            return func.HttpResponse("The body must be a JSON object.", status_code=400)
+        if not isinstance(body, dict):
+            return func.HttpResponse("The body must be a JSON object.", status_code=400)
+    else:
+        body = req.params
+
+    query = str(body.get("query") or "").strip()
+    if not query:
+        return func.HttpResponse("Please provide a query.", status_code=400)
+    max_top = settings.get().search_max_top
+    try:
+        top = int(body.get("top") or 5)
+    except (TypeError, ValueError):
+        top = 0
+    if not 1 <= top <= max_top:
+        return func.HttpResponse(
+            f"top must be an integer from 1 to {max_top}.", status_code=400
+        )
+    return query, top, body.get("filter") or None
+
+
+@app.route(route="search", methods=["GET", "POST"])
+def search(req: func.HttpRequest) -> func.HttpResponse:
+    """Hybrid keyword and vector search over the indexed chunks."""
+    search_retriever = get_or_none(retriever)
+    if not search_retriever:
+        logger.error("Retriever is not initialized due to a startup error.")
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+
+    parsed = parse_search_request(req)
+    if isinstance(parsed, func.HttpResponse):
+        return parsed
+    query, top, search_filter = parsed
+
+    try:
+        hits = search_retriever.search(query, top, search_filter)
+    except ValueError as e:
+        return func.HttpResponse(f"Invalid search request: {e}", status_code=400)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        return func.HttpResponse("An unexpected error occurred.", status_code=500)
+
+    return func.HttpResponse(
+        json.dumps(
+            {"query": query, "results": [asdict(hit) for hit in hits]},
+            ensure_ascii=False,
+        ),
+        status_code=200,
+        mimetype="application/json",
+    )
+
+
+@app.route(route="indexer/admission", methods=["GET"])
+def admission_status(req: func.HttpRequest) -> func.HttpResponse:
+    """Report the memory and concurrency used by admitted indexing requests."""
+    controller = get_or_none(admission)
+    if not controller:
+        return func.HttpResponse(
+            "Internal Server Error: Service is not available.", status_code=500
+        )
+    return func.HttpResponse(
+        json.dumps(controller.utilization()),
+        status_code=200,
+        mimetype="application/json",
+    )
+
+
+@app.route(route="metrics", methods=["GET"])
+def metrics_endpoint(req: func.HttpRequest) -> func.HttpResponse:
+    """Expose per-stage timings and counters in the Prometheus text format."""
+    if not get_or_none(settings) or not metrics.enabled:
+        return func.HttpResponse("Metrics are disabled.", status_code=404)
+    return func.HttpResponse(
+        metrics.render_prometheus(),
+        status_code=200,
+        mimetype="text/plain; version=0.0.4",
+    )
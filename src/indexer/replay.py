@@ -0,0 +1,186 @@
+"""Rebuild or migrate a search index from artifact snapshots.
+
+Uploads the chunks and vectors kept in `ARTIFACT_STORE_PATH` without
+extracting or embedding anything, e.g. to recover a lost index or to fill
+a new index after a schema change. Reads the same environment variables
+as the Function app.
+
+Usage (from src/indexer):
+    python replay.py
+    python replay.py --index docs-v2 --vector-field embedding
+    python replay.py --index docs-small --dimensions 256 --dtype float16
+    python replay.py --match "manuals/*" --dry-run
+"""
+
+from dataclasses import asdict, dataclass
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, Iterator, List
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from core.artifacts import ArtifactStore, DocumentSnapshot
+from core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplayReport:
+    documents: int = 0
+    incomplete_documents: int = 0
+    chunks: int = 0
+    uploaded: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def resize_vectors(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """Shorten vectors to `dimensions` and scale them back to unit length.
+
+    Valid for models trained to support shortening, such as
+    text-embedding-3; it matches requesting `dimensions` from the API.
+    """
+    if dimensions > vectors.shape[1]:
+        raise ValueError(
+            f"Cannot grow {vectors.shape[1]}-dimension vectors to {dimensions}."
+        )
+    shortened = vectors[:, :dimensions].astype(np.float32)
+    norms = np.linalg.norm(shortened, axis=1, keepdims=True)
+    return shortened / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def iter_documents(
+    store: ArtifactStore,
+    snapshot: DocumentSnapshot,
+    fields: Dict[str, str],
+    dimensions: int = 0,
+    dtype: str = "",
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the search documents of a snapshot, one part at a time."""
+    for ids, chunks, vectors in store.iter_rows(snapshot):
+        if dimensions and dimensions != vectors.shape[1]:
+            vectors = resize_vectors(vectors, dimensions)
+        if dtype:
+            vectors = vectors.astype(dtype, copy=False)
+        yield [
+            {
+                fields["key"]: ids[i],
+                fields["content"]: chunks[i],
+                fields["vector"]: vectors[i],
+            }
+            for i in range(len(ids))
+        ]
+
+
+def replay(
+    store: ArtifactStore,
+    upload: Callable[[List[Dict[str, Any]]], Any],
+    fields: Dict[str, str],
+    match: str = "*",
+    dimensions: int = 0,
+    dtype: str = "",
+) -> ReplayReport:
+    """Upload the snapshots whose document key matches `match`.
+
+    `upload` takes a list of documents and returns an `UploadReport`, or
+    None for a dry run.
+    """
+    report = ReplayReport()
+    started = time.perf_counter()
+    for snapshot in store.iter_snapshots():
+        if not fnmatch(snapshot.document_key, match):
+            continue
+        report.documents += 1
+        if not snapshot.complete:
+            report.incomplete_documents += 1
+            logger.warning(
+                f"'{snapshot.document_key}' lacks {snapshot.missing} of "
+                f"{snapshot.chunks} chunks; re-index it to complete the snapshot."
+            )
+        for documents in iter_documents(store, snapshot, fields, dimensions, dtype):
+            report.chunks += len(documents)
+            upload_report = upload(documents)
+            if upload_report is not None:
+                report.uploaded += len(upload_report.succeeded)
+                report.failed += len(upload_report.failed)
+        logger.info(f"Replayed '{snapshot.document_key}'.")
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    return report
+
+
+def make_upload(config: Settings) -> Callable[[List[Dict[str, Any]]], Any]:
+    from clients.clients import SearchDocumentsClient, log_upload_report
+    from clients.uploader import BatchUploader
+
+    uploader = BatchUploader(
+        SearchDocumentsClient(config).upload_documents,
+        max_documents=config.upload_batch_size,
+        max_bytes=config.upload_batch_max_bytes,
+        max_concurrency=config.upload_max_concurrency,
+        max_retries=config.upload_max_retries,
+        backoff_seconds=config.upload_retry_backoff_seconds,
+    )
+
+    def upload(documents: List[Dict[str, Any]]):
+        upload_report = uploader.upload(documents)
+        log_upload_report(upload_report, len(documents))
+        return upload_report
+
+    return upload
+
+
+def dry_run(documents: List[Dict[str, Any]]):
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--artifacts", help="defaults to ARTIFACT_STORE_PATH")
+    parser.add_argument("--index", help="defaults to SEARCH_SERVICE_INDEX_NAME")
+    parser.add_argument("--match", default="*", help="glob over document keys")
+    parser.add_argument("--dimensions", type=int, default=0)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="")
+    parser.add_argument("--key-field", default="id")
+    parser.add_argument("--content-field", default="content")
+    parser.add_argument("--vector-field", default="contentVector")
+    parser.add_argument("--dry-run", action="store_true", help="read only")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    config = Settings()
+    if args.index:
+        config.search_service_index_name = args.index
+    root = args.artifacts or config.artifact_store_path
+    if not root:
+        parser.error("Set ARTIFACT_STORE_PATH or pass --artifacts.")
+
+    store = ArtifactStore(root)
+    try:
+        report = replay(
+            store,
+            dry_run if args.dry_run else make_upload(config),
+            {
+                "key": args.key_field,
+                "content": args.content_field,
+                "vector": args.vector_field,
+            },
+            match=args.match,
+            dimensions=args.dimensions,
+            dtype=args.dtype,
+        )
+    finally:
+        store.close()
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,275 @@
 # Streamlit app for uploading and indexing documents via a backend API
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+import time
 
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 BACKEND_URL = os.environ.get("BACKEND_API_URL", "http://localhost:7071/api/indexer")
+UPLOADS_URL = f"{BACKEND_URL.rstrip('/')}/uploads"
+JOBS_URL = f"{BACKEND_URL.rstrip('/')}/jobs"
+POLL_INTERVAL_SECONDS = float(os.environ.get("JOB_POLL_INTERVAL_SECONDS", "2"))
+# How long to follow jobs; they keep running on the backend afterwards
+JOB_MAX_WAIT_SECONDS = float(os.environ.get("JOB_MAX_WAIT_SECONDS", "300"))
+# Parts sent at once, across all files; also the size of the connection pool
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", "4"))
+# Rounds of resending parts the backend reports missing before giving up
+UPLOAD_COMPLETE_ATTEMPTS = 3
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One pooled session, so parts reuse connections instead of reconnecting."""
+    session = requests.Session()
+    # Parts are idempotent PUTs, so transient errors are retried transparently
+    retry = Retry(
+        total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)
+    )
+    adapter = HTTPAdapter(
+        pool_connections=UPLOAD_CONCURRENCY,
+        pool_maxsize=UPLOAD_CONCURRENCY,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def start_upload(session: requests.Session, name: str, size: int) -> dict:
+    """Resume this file's upload if the backend still has it, or start one."""
+    upload_ids = st.session_state.setdefault("upload_ids", {})
+    upload_id = upload_ids.get((name, size))
+    if upload_id:
+        response = session.get(f"{UPLOADS_URL}/{upload_id}", timeout=30)
+        if response.status_code == 200:
+            return response.json()
+
+    response = session.post(
+        UPLOADS_URL, json={"file_name": name, "size": size}, timeout=30
+    )
+    response.raise_for_status()
+    upload = response.json()
+    upload_ids[(name, size)] = upload["upload_id"]
+    return upload
+
+
+def put_part(session: requests.Session, upload: dict, part: int, data: bytes) -> int:
+    start = part * upload["part_size"]
+    chunk = data[start : start + upload["part_size"]]
+    response = session.put(
+        f"{UPLOADS_URL}/{upload['upload_id']}/parts/{part}", data=chunk, timeout=120
+    )
+    response.raise_for_status()
+    return len(chunk)
+
+
+def send_parts(
+    session: requests.Session,
+    uploads: dict[str, dict],
+    files: dict[str, bytes],
+    progress: dict,
+):
+    """Send the missing parts of all uploads concurrently, tracking progress."""
+    with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(put_part, session, upload, part, files[name]): name
+            for name, upload in uploads.items()
+            for part in upload["missing"]
+        }
+        # Widgets are only updated from the script thread
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                progress[name]["sent"] += future.result()
+            except requests.exceptions.RequestException as e:
+                progress[name]["error"] = str(e)
+            show_upload_progress(name, progress[name])
+
+
+def received_bytes(upload: dict, size: int) -> int:
+    """Bytes of the parts the backend already holds."""
+    missing = set(upload["missing"])
+    return sum(
+        min(upload["part_size"], size - part * upload["part_size"])
+        for part in range(upload["part_count"])
+        if part not in missing
+    )
+
+
+def show_upload_progress(name: str, state: dict):
+    size = max(state["size"], 1)
+    state["bar"].progress(
+        min(state["sent"] / size, 1.0),
+        text=f"{name}: uploaded {state['sent'] / 1024:.0f} of {size / 1024:.0f} KB",
+    )
+
+
+def poll_job(session: requests.Session, job_id: str) -> dict | None:
+    """Return the job's status, or None if the backend could not be reached."""
+    try:
+        response = session.get(f"{JOBS_URL}/{job_id}", timeout=30)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return None
+    except requests.exceptions.RequestException as e:
+        return {"status": "failed", "message": str(e)}
+    # e.g. 404 when the job is unknown to this backend
+    if response.status_code != 200:
+        return {
+            "status": "failed",
+            "message": f"HTTP {response.status_code}: {response.text}",
+        }
+    try:
+        return response.json()
+    except ValueError:
+        return {"status": "failed", "message": response.text}
+
+
+def complete_upload(session: requests.Session, upload: dict) -> tuple[bool, dict]:
+    """Queue a finished upload.
+
+    Returns True and the job, or False and the upload with the parts the
+    backend is still missing.
+    """
+    response = session.post(
+        f"{UPLOADS_URL}/{upload['upload_id']}/complete", timeout=120
+    )
+    if response.status_code == 409:
+        return False, response.json()
+    response.raise_for_status()
+    return True, response.json()
+
 
 st.set_page_config(page_title="Document Indexer", layout="wide")
 st.title("📄 Document Indexer for RAG Applications")
 st.markdown("---")
 
-st.subheader("Upload a file to be indexed")
-uploaded_file = st.file_uploader("Choose a file", type=["pdf", "docx", "txt"])
+st.subheader("Upload files to be indexed")
+uploaded_files = st.file_uploader(
+    "Choose files",
+    type=["pdf", "docx", "txt", "md", "html", "htm"],
+    accept_multiple_files=True,
+)
 
-if uploaded_file is not None:
+if uploaded_files:
     st.markdown("---")
     st.write("File Details:")
-    st.json(
-        {
-            "File Name": uploaded_file.name,
-            "File Size": f"{uploaded_file.size / 1024:.2f} KB",
-            "File Type": uploaded_file.type,
-        }
+    st.dataframe(
+        [
+            {
+                "File Name": uploaded_file.name,
+                "File Size": f"{uploaded_file.size / 1024:.2f} KB",
+                "File Type": uploaded_file.type,
+            }
+            for uploaded_file in uploaded_files
+        ],
+        use_container_width=True,
     )
 
-    if st.button("Index This File", type="primary"):
-        with st.spinner("Indexing the document..."):
-            try:
-                files_to_send = {
-                    "file": (
-                        uploaded_file.name,
-                        uploaded_file.getvalue(),
-                        uploaded_file.type,
-                    )
-                }
+    if st.button("Index These Files", type="primary"):
+        session = get_session()
+        files = {
+            uploaded_file.name: uploaded_file.getvalue()
+            for uploaded_file in uploaded_files
+        }
+        progress = {
+            name: {"size": len(data), "sent": 0, "error": None, "bar": st.progress(0)}
+            for name, data in files.items()
+        }
+        jobs: dict[str, str] = {}
 
-                response = requests.post(BACKEND_URL, files=files_to_send, timeout=300)
+        try:
+            uploads = {}
+            for name, data in files.items():
+                try:
+                    upload = start_upload(session, name, len(data))
+                except requests.exceptions.RequestException as e:
+                    progress[name]["error"] = str(e)
+                    continue
+                # Parts that arrived before an interruption are not sent again
+                progress[name]["sent"] = received_bytes(upload, len(data))
+                show_upload_progress(name, progress[name])
+                uploads[name] = upload
 
-                if response.status_code == 200:
-                    st.success("Successfully indexed the document!")
-                    st.text_area("API Response", value=response.text, height=150)
-                else:
-                    st.error(f"Error from API(Status {response.status_code}):")
-                    st.text_area("Error Details", value=response.text, height=150)
+            for _ in range(UPLOAD_COMPLETE_ATTEMPTS):
+                if not uploads:
+                    break
+                send_parts(session, uploads, files, progress)
+                for name, upload in list(uploads.items()):
+                    if progress[name]["error"]:
+                        del uploads[name]
+                        continue
+                    try:
+                        completed, result = complete_upload(session, upload)
+                    except requests.exceptions.RequestException as e:
+                        progress[name]["error"] = str(e)
+                        del uploads[name]
+                        continue
+                    if not completed:
+                        # Some parts were lost; resend only those
+                        uploads[name] = result
+                        progress[name]["sent"] = received_bytes(
+                            result, len(files[name])
+                        )
+                        continue
+                    jobs[name] = result["job_id"]
+                    del st.session_state["upload_ids"][(name, len(files[name]))]
+                    del uploads[name]
+            for name in uploads:
+                progress[name]["error"] = "Some parts could not be uploaded."
 
-            except requests.exceptions.RequestException as e:
-                st.error(f"Failed to connect to the backend API at {BACKEND_URL}")
-                st.exception(e)
+        except requests.exceptions.RequestException as e:
+            st.error(f"Failed to connect to the backend API at {BACKEND_URL}")
+            st.exception(e)
+            st.stop()
+
+        for name, state in progress.items():
+            if state["error"]:
+                state["bar"].empty()
+                st.error(f"Uploading {name} failed; press the button to resume.")
+                st.text_area(
+                    f"Error Details ({name})", value=state["error"], height=100
+                )
+
+        # The backend indexes queued files in the background
+        status_boxes = {name: st.empty() for name in jobs}
+        finished: dict[str, dict] = {}
+        deadline = time.monotonic() + JOB_MAX_WAIT_SECONDS
+        with st.spinner("Indexing the documents..."):
+            while len(finished) < len(jobs) and time.monotonic() < deadline:
+                for name, job_id in jobs.items():
+                    if name in finished:
+                        continue
+                    job = poll_job(session, job_id)
+                    if job is None:
+                        continue
+                    progress[name]["bar"].empty()
+                    if job["status"] in ("succeeded", "failed"):
+                        finished[name] = job
+                        continue
+                    status_boxes[name].info(
+                        f"{name}: {job['stage']} "
+                        f"({job['processed_chunks']} chunks processed)"
+                    )
+                if len(finished) < len(jobs):
+                    time.sleep(POLL_INTERVAL_SECONDS)
+
+        for name, job_id in jobs.items():
+            if name not in finished:
+                status_boxes[name].warning(
+                    f"{name} is still being indexed (job {job_id}). "
+                    "Its status is available from the jobs API."
+                )
+
+        for name, job in finished.items():
+            if job["status"] == "succeeded":
+                status_boxes[name].success(f"Successfully indexed {name}!")
+                st.text_area(f"API Response ({name})", value=job["message"], height=150)
+            else:
+                status_boxes[name].error(f"Indexing {name} failed:")
+                st.text_area(
+                    f"Error Details ({name})", value=job["message"], height=150
+                )
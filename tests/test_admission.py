@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+
+import azure.functions as func
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.indexer.core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    estimate_cost,
+)
+from src.indexer.core.jobs import JobStore
+from src.indexer.func import count_pages
+from src.indexer.function_app import AdmissionRejected as AppAdmissionRejected
+from src.indexer.function_app import (
+    JobDeferred,
+    indexer,
+    resume_jobs,
+    run_indexing_job,
+)
+from tests.test_integration import make_settings
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+MB = 1024 * 1024
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_requests_within_the_budget_are_admitted(self):
+        controller = AdmissionController(100 * MB, max_concurrent=2)
+
+        controller.acquire(40 * MB)
+        controller.acquire(40 * MB)
+
+        utilization = controller.utilization()
+        self.assertEqual(utilization["active"], 2)
+        self.assertEqual(utilization["memory_in_use_bytes"], 80 * MB)
+        self.assertEqual(utilization["memory_utilization"], 0.8)
+
+    def test_request_over_the_budget_is_rejected_after_the_timeout(self):
+        controller = AdmissionController(100 * MB, queue_timeout_seconds=0.01)
+        controller.acquire(80 * MB)
+
+        with self.assertRaises(AdmissionRejected) as raised:
+            controller.acquire(40 * MB)
+
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(controller.utilization()["rejected"], 1)
+        self.assertEqual(controller.utilization()["queued"], 0)
+
+    def test_full_queue_rejects_immediately(self):
+        controller = AdmissionController(100 * MB, max_concurrent=1, max_queued=0)
+        controller.acquire(MB)
+
+        with self.assertRaises(AdmissionRejected):
+            controller.acquire(MB, timeout=10)
+
+    def test_oversized_request_is_admitted_when_idle(self):
+        controller = AdmissionController(10 * MB)
+
+        with controller.admit(50 * MB):
+            self.assertEqual(controller.utilization()["active"], 1)
+
+        self.assertEqual(controller.utilization()["memory_in_use_bytes"], 0)
+
+    def test_waiters_are_admitted_in_arrival_order(self):
+        controller = AdmissionController(100 * MB, max_concurrent=1)
+        controller.acquire(MB)
+        order = []
+
+        def wait(name: str):
+            with controller.admit(MB, timeout=5):
+                order.append(name)
+
+        threads = []
+        for name in ("first", "second", "third"):
+            thread = threading.Thread(target=wait, args=(name,))
+            thread.start()
+            threads.append(thread)
+            while controller.utilization()["queued"] < len(threads):
+                threading.Event().wait(0.001)
+        controller.release(MB)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, ["first", "second", "third"])
+
+    def test_async_admission_releases_on_exit(self):
+        controller = AdmissionController(100 * MB)
+
+        async def run():
+            async with controller.admit_async(10 * MB):
+                return controller.utilization()["memory_in_use_bytes"]
+
+        self.assertEqual(asyncio.run(run()), 10 * MB)
+        self.assertEqual(controller.utilization()["memory_in_use_bytes"], 0)
+
+
+class TestCostEstimate(unittest.TestCase):
+    def test_pages_add_to_the_cost(self):
+        self.assertGreater(
+            estimate_cost(MB, pages=100, bytes_per_page=1024), estimate_cost(MB)
+        )
+
+    def test_count_pages(self):
+        pdf = b"1 0 obj << /Type /Pages /Count 2 >> 2 0 obj << /Type /Page >>" * 2
+        self.assertEqual(count_pages(pdf), 2)
+        # Without visible page objects the size decides
+        self.assertEqual(count_pages(b"x" * 120 * 1024), 3)
+
+
+class TestIndexerAdmission(unittest.TestCase):
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.search_client")
+    @patch("src.indexer.function_app.admission")
+    def test_busy_worker_returns_429_with_retry_after(
+        self,
+        mock_admission_ref: MagicMock,
+        mock_search_client_ref: MagicMock,
+        mock_settings_ref: MagicMock,
+    ):
+        mock_settings_ref.get.return_value = make_settings()
+        mock_admission_ref.get.return_value.admit.side_effect = AppAdmissionRejected(
+            "Too busy.", 7
+        )
+
+        req = MagicMock(spec=func.HttpRequest)
+        req.files = {"file": MagicMock(filename="test.pdf", read=lambda: b"%PDF")}
+
+        response = indexer(req)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "7")
+        mock_search_client_ref.get.return_value.index_document.assert_not_called()
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.index_job_payload")
+    @patch("src.indexer.function_app.job_store")
+    @patch("src.indexer.function_app.admission")
+    def test_busy_worker_defers_queued_jobs(
+        self,
+        mock_admission_ref: MagicMock,
+        mock_job_store_ref: MagicMock,
+        mock_index_job_payload: MagicMock,
+        mock_settings_ref: MagicMock,
+    ):
+        mock_settings_ref.get.return_value = make_settings()
+        mock_job_store_ref.get.return_value.read_payload.return_value = b"%PDF"
+        mock_admission_ref.get.return_value.admit.side_effect = AppAdmissionRejected(
+            "Too busy.", 7
+        )
+
+        with self.assertRaises(JobDeferred) as raised:
+            run_indexing_job(MagicMock(job_id="job", file_name="test.pdf"))
+
+        self.assertEqual(raised.exception.retry_after, 7)
+        mock_index_job_payload.assert_not_called()
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.job_worker")
+    def test_job_worker_starts_only_for_pending_jobs(
+        self, mock_job_worker_ref: MagicMock, mock_settings_ref: MagicMock
+    ):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "jobs.db")
+            with patch.dict(os.environ, {"JOB_STORE_PATH": path}):
+                resume_jobs()
+                mock_job_worker_ref.get.assert_not_called()
+
+                JobStore(path).enqueue("queued.pdf", b"%PDF")
+                resume_jobs()
+                mock_job_worker_ref.get.assert_called_once()
+
+        # Checking for jobs does not load the settings or create clients
+        mock_settings_ref.get.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
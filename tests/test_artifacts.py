@@ -0,0 +1,149 @@
+import logging
+import os
+import tempfile
+
+import unittest
+
+import numpy as np
+
+from src.indexer.clients import AsyncIndexingPipeline
+from src.indexer.core.artifacts import ArtifactStore
+from src.indexer.core.manifest import ManifestStore, make_chunk_ids
+from src.indexer.replay import replay
+from tests.test_pipeline import FakeEmbeddingClient, FakeSearchClient
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+FIELDS = {"key": "id", "content": "content", "vector": "contentVector"}
+
+
+def vectors_for(chunks: list[str]) -> np.ndarray:
+    return np.array([[len(chunk), 1.0] for chunk in chunks], dtype=np.float32)
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store = ArtifactStore(self.temp_dir.name, model="model", part_rows=2)
+        self.addCleanup(self.store.close)
+
+    def index(self, document_key: str, chunks: list[str], embedded: list[str]):
+        ids = make_chunk_ids(document_key, chunks)
+        rows = [chunks.index(chunk) for chunk in embedded]
+        self.store.record(
+            [ids[i] for i in rows], [chunks[i] for i in rows], vectors_for(embedded)
+        )
+        self.store.commit(document_key, f"hash of {chunks}", ids)
+        self.store.flush()
+
+    def rows(self, document_key: str) -> dict[str, list[float]]:
+        snapshot = self.store.snapshot(document_key)
+        assert snapshot is not None
+        return {
+            chunk: vector.tolist()
+            for _, chunks, vectors in self.store.iter_rows(snapshot)
+            for chunk, vector in zip(chunks, vectors)
+        }
+
+    def test_snapshot_round_trips_chunks_and_vectors(self):
+        self.index("手順書.pdf", ["a", "bb", "ccc"], ["a", "bb", "ccc"])
+
+        snapshot = self.store.snapshot("手順書.pdf")
+        self.assertTrue(snapshot.complete)
+        self.assertEqual(snapshot.chunks, 3)
+        self.assertEqual(snapshot.model, "model")
+        self.assertEqual(
+            self.rows("手順書.pdf"),
+            {"a": [1.0, 1.0], "bb": [2.0, 1.0], "ccc": [3.0, 1.0]},
+        )
+
+    def test_unchanged_rows_are_carried_over_and_removed_rows_dropped(self):
+        self.index("doc.pdf", ["a", "bb", "ccc"], ["a", "bb", "ccc"])
+
+        # Only the new chunk is embedded when the document changes
+        self.index("doc.pdf", ["a", "ccc", "dddd"], ["dddd"])
+
+        self.assertEqual(set(self.rows("doc.pdf")), {"a", "ccc", "dddd"})
+        self.assertTrue(self.store.snapshot("doc.pdf").complete)
+        parts_dir = os.path.join(self.temp_dir.name, "parts")
+        files = [name for _, _, names in os.walk(parts_dir) for name in names]
+        self.assertEqual(len(files), len(self.store.snapshot("doc.pdf").parts))
+
+    def test_rows_are_routed_to_their_document(self):
+        ids = make_chunk_ids("a.pdf", ["a1"]) + make_chunk_ids("b.pdf", ["b1"])
+        self.store.record(ids, ["a1", "b1"], vectors_for(["a1", "b1"]))
+        self.store.commit("a.pdf", "hash", ids[:1])
+        self.store.commit("b.pdf", "hash", ids[1:])
+        self.store.flush()
+
+        self.assertEqual(list(self.rows("a.pdf")), ["a1"])
+        self.assertEqual(list(self.rows("b.pdf")), ["b1"])
+
+    def test_snapshot_reports_chunks_without_rows(self):
+        self.index("doc.pdf", ["a", "bb"], ["bb"])
+
+        self.assertEqual(self.store.snapshot("doc.pdf").missing, 1)
+
+
+class TestReplay(unittest.IsolatedAsyncioTestCase):
+    async def test_pipeline_snapshots_can_be_replayed(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        store = ArtifactStore(os.path.join(temp_dir.name, "artifacts"))
+        self.addCleanup(store.close)
+        search_client = FakeSearchClient()
+        pipeline = AsyncIndexingPipeline(
+            FakeEmbeddingClient(),  # type: ignore
+            search_client,  # type: ignore
+            manifest=ManifestStore(os.path.join(temp_dir.name, "manifest.db")),
+            artifacts=store,
+        )
+        chunks = ["one", "three", "fifteen"]
+        await pipeline.index_document("doc.pdf", "hash", chunks)
+        store.flush()
+
+        uploaded = []
+        report = replay(
+            store,
+            lambda documents: uploaded.extend(documents),
+            {"key": "id", "content": "text", "vector": "embedding"},
+        )
+
+        indexed = [doc for batch in search_client.batches for doc in batch]
+        self.assertEqual(report.documents, 1)
+        self.assertEqual(report.chunks, 3)
+        self.assertEqual(
+            sorted((doc["id"], doc["text"]) for doc in uploaded),
+            sorted((doc["id"], doc["content"]) for doc in indexed),
+        )
+        self.assertEqual(
+            {doc["text"]: doc["embedding"].tolist() for doc in uploaded},
+            {"one": [3.0], "three": [5.0], "fifteen": [7.0]},
+        )
+
+    def test_replay_can_shorten_vectors(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        store = ArtifactStore(temp_dir.name)
+        self.addCleanup(store.close)
+        ids = make_chunk_ids("doc.pdf", ["a"])
+        store.record(ids, ["a"], np.array([[3.0, 4.0, 12.0]], dtype=np.float32))
+        store.commit("doc.pdf", "hash", ids)
+        store.flush()
+
+        uploaded = []
+        replay(store, uploaded.extend, FIELDS, dimensions=2, dtype="float16")
+
+        vector = uploaded[0]["contentVector"]
+        self.assertEqual(vector.dtype, np.float16)
+        np.testing.assert_allclose(vector, [0.6, 0.8], rtol=1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
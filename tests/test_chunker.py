@@ -23,3 +23,21 @@ class TestDocChunker(unittest.TestCase):
         self.assertEqual(chunks[0], "qazwsxedcr")
         self.assertEqual(chunks[1], "crfvtgbyhn")
         self.assertEqual(chunks[2], "hnujmikolp")
+
+    def test_iter_chunks_streams_pages_with_overlap(self):
+        chunker = DocChunker(chunk_size=10, overlap=2)
+        pages = ["qazwsxedcrfv", "tgbyhnujmikolp"]
+
+        chunks = list(chunker.iter_chunks(iter(pages), window=10))
+
+        self.assertEqual(chunks, ["qazwsxedcr", "crfvtgbyhn", "hnujmikolp"])
+
+    def test_iter_chunks_matches_chunk_text_on_word_text(self):
+        chunker = DocChunker(chunk_size=50, overlap=10)
+        pages = [
+            " ".join(f"word{page}-{i}" for i in range(60)) + "\n\n" for page in range(8)
+        ]
+
+        chunks = list(chunker.iter_chunks(pages, window=200))
+
+        self.assertEqual(chunks, chunker.chunk_text("".join(pages)))
@@ -1,10 +1,17 @@
 from typing import Any, Dict, List
+import base64
+import json
 import logging
 
 import unittest
-from unittest.mock import MagicMock, ANY
+from unittest.mock import MagicMock, ANY, patch
+
+import numpy as np
+from azure.search.documents.models import IndexingResult
 
 from src.indexer.clients import AzureEmbeddingClient, AzureSearchClient
+from src.indexer.clients.clients import SearchDocumentsClient
+from src.indexer.core.manifest import make_chunk_ids
 
 logging.basicConfig(
     filename="test.log",
@@ -14,14 +21,136 @@ logging.basicConfig(
 )
 
 
+def make_search_settings() -> MagicMock:
+    mock_settings = MagicMock()
+    mock_settings.search_service_api_key = "fake_api_key_for_test"
+    mock_settings.upload_batch_size = 1000
+    mock_settings.upload_batch_max_bytes = 1024 * 1024
+    mock_settings.upload_max_concurrency = 1
+    mock_settings.upload_max_retries = 0
+    mock_settings.upload_retry_backoff_seconds = 0
+    return mock_settings
+
+
+def make_embedding_settings(batch_size: int = 16, max_tokens: int = 1000) -> MagicMock:
+    mock_settings = MagicMock()
+    mock_settings.aoai_embedding_model_name = "model"
+    mock_settings.embedding_batch_size = batch_size
+    mock_settings.embedding_batch_max_tokens = max_tokens
+    mock_settings.embedding_dimensions = 0
+    mock_settings.embedding_dtype = "float32"
+    return mock_settings
+
+
+def make_embedding_response(inputs: List[str]) -> MagicMock:
+    # Return items out of order to check that results are reassembled by index
+    data = [
+        MagicMock(index=i, embedding=[float(len(text)), float(i)])
+        for i, text in reversed(list(enumerate(inputs)))
+    ]
+    return MagicMock(data=data)
+
+
+class TestAzureEmbeddingClient(unittest.TestCase):
+    @patch("src.indexer.clients.clients.AzureOpenAI")
+    def test_get_embeddings_packs_batches_in_order(self, mock_openai: MagicMock):
+        # 1. Setup
+        mock_settings = make_embedding_settings(batch_size=2, max_tokens=10)
+
+        client_under_test = AzureEmbeddingClient(mock_settings)
+        mock_create = mock_openai.return_value.embeddings.create
+        mock_create.side_effect = (
+            lambda input, model, **options: make_embedding_response(input)
+        )
+
+        # 2. Act
+        texts = ["a", "bb", "ccc", "d" * 30, "e"]
+        embeddings = client_under_test.get_embeddings(texts)
+
+        # 3. Assert
+        batches = [call.kwargs["input"] for call in mock_create.call_args_list]
+        self.assertEqual(batches, [["a", "bb"], ["ccc"], ["d" * 30], ["e"]])
+
+        self.assertEqual(embeddings.shape, (5, 2))
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertEqual(embeddings[:, 0].tolist(), [1.0, 2.0, 3.0, 30.0, 1.0])
+
+    @patch("src.indexer.clients.clients.AzureOpenAI")
+    def test_get_embeddings_empty_input(self, mock_openai: MagicMock):
+        client_under_test = AzureEmbeddingClient(make_embedding_settings())
+
+        embeddings = client_under_test.get_embeddings([])
+
+        self.assertEqual(len(embeddings), 0)
+        mock_openai.return_value.embeddings.create.assert_not_called()
+
+    @patch("src.indexer.clients.clients.AzureOpenAI")
+    def test_base64_vectors_with_reduced_dimensions(self, mock_openai: MagicMock):
+        mock_settings = make_embedding_settings()
+        mock_settings.embedding_dimensions = 3
+        mock_settings.embedding_dtype = "float16"
+        vector = np.array([0.5, -0.25, 1.0], dtype="<f4")
+        encoded = base64.b64encode(vector.tobytes()).decode("ascii")
+        mock_create = mock_openai.return_value.embeddings.create
+        mock_create.return_value = MagicMock(
+            data=[MagicMock(index=0, embedding=encoded)]
+        )
+
+        embeddings = AzureEmbeddingClient(mock_settings).get_embeddings(["text"])
+
+        mock_create.assert_called_once_with(
+            input=["text"], model="model", encoding_format="base64", dimensions=3
+        )
+        self.assertEqual(embeddings.dtype, np.float16)
+        self.assertEqual(embeddings.tolist(), [[0.5, -0.25, 1.0]])
+
+
+class TestSearchDocumentsClient(unittest.TestCase):
+    def test_vectors_are_serialized_from_arrays(self):
+        mock_settings = make_search_settings()
+        mock_settings.search_service_endpoint = "https://search.example"
+        mock_settings.search_service_index_name = "index"
+        http_client = mock_settings.global_http_client
+        http_client.post.return_value = MagicMock(
+            status_code=200,
+            content=b'{"value":[{"key":"1","status":true,"statusCode":201}]}',
+        )
+        documents = [
+            {
+                "id": "1",
+                "content": "text",
+                "contentVector": np.array([0.1, 0.5], dtype=np.float32),
+            }
+        ]
+
+        results = SearchDocumentsClient(mock_settings).upload_documents(documents)
+
+        body = json.loads(http_client.post.call_args.kwargs["content"])
+        self.assertEqual(
+            body,
+            {
+                "value": [
+                    {
+                        "@search.action": "upload",
+                        "id": "1",
+                        "content": "text",
+                        "contentVector": [0.1, 0.5],
+                    }
+                ]
+            },
+        )
+        self.assertTrue(results[0].succeeded)
+
+
 class TestAzureSearchClient(unittest.TestCase):
     def test_index_chunks_logic(self):
         # 1. Setup
         mock_embedding_client = MagicMock(spec=AzureEmbeddingClient)
-        mock_embedding_client.get_embedding.return_value = [0.1, 0.2, 0.3]
+        mock_embedding_client.get_embeddings.return_value = np.array(
+            [[0.1, 0.2, 0.3], [0.1, 0.2, 0.3]]
+        )
 
-        mock_settings = MagicMock()
-        mock_settings.search_service_api_key = "fake_api_key_for_test"
+        mock_settings = make_search_settings()
 
         # 2. Act
         client_under_test = AzureSearchClient(mock_settings, mock_embedding_client)
@@ -33,9 +162,9 @@ class TestAzureSearchClient(unittest.TestCase):
         client_under_test.index_chunks(test_chunks)
 
         # 3. Assert
-        self.assertEqual(mock_embedding_client.get_embedding.call_count, 2)
-        mock_embedding_client.get_embedding.assert_any_call("Chunk 1 text")
-        mock_embedding_client.get_embedding.assert_any_call("Chunk 2 text")
+        mock_embedding_client.get_embeddings.assert_called_once_with(
+            ["Chunk 1 text", "Chunk 2 text"]
+        )
 
         mock_sdk_instance.upload_documents.assert_called_once()
 
@@ -55,4 +184,92 @@ class TestAzureSearchClient(unittest.TestCase):
             },
         ]
 
+        for document in actual_documents:
+            document["contentVector"] = document["contentVector"].tolist()
         self.assertEqual(actual_documents, expected_documents)
+
+    def test_index_document_uploads_new_and_deletes_stale_chunks(self):
+        # 1. Setup
+        mock_embedding_client = MagicMock(spec=AzureEmbeddingClient)
+        mock_embedding_client.get_embeddings.side_effect = lambda texts: np.zeros(
+            (len(texts), 2)
+        )
+        id_a, id_b, id_c = make_chunk_ids("doc.pdf", ["a", "b", "c"])
+        mock_manifest = MagicMock()
+        mock_manifest.get.return_value = ("old hash", {id_a, "id-old"})
+
+        mock_settings = make_search_settings()
+
+        client_under_test = AzureSearchClient(
+            mock_settings, mock_embedding_client, mock_manifest
+        )
+        client_under_test.client = MagicMock()
+        client_under_test.client.upload_documents.return_value = [
+            IndexingResult(key=id_b, succeeded=True, status_code=201),
+            IndexingResult(key=id_c, succeeded=True, status_code=201),
+        ]
+        client_under_test.client.delete_documents.return_value = [
+            IndexingResult(key="id-old", succeeded=True, status_code=200),
+        ]
+
+        # 2. Act
+        uploaded = client_under_test.index_document(
+            "doc.pdf", "hash", iter(["a", "b", "c"])
+        )
+
+        # 3. Assert
+        self.assertEqual(uploaded, 2)
+        mock_embedding_client.get_embeddings.assert_called_once_with(["b", "c"])
+        client_under_test.client.delete_documents.assert_called_once_with(
+            [{"id": "id-old"}]
+        )
+        mock_manifest.save.assert_called_once_with(
+            "doc.pdf", "hash", [id_a, id_b, id_c]
+        )
+
+    def test_index_document_keeps_previous_version_when_uploads_fail(self):
+        mock_embedding_client = MagicMock(spec=AzureEmbeddingClient)
+        mock_embedding_client.get_embeddings.side_effect = lambda texts: np.zeros(
+            (len(texts), 2)
+        )
+        id_a, id_b, id_c = make_chunk_ids("doc.pdf", ["a", "b", "c"])
+        mock_manifest = MagicMock()
+        mock_manifest.get.return_value = ("old hash", {id_a, "id-old"})
+
+        client_under_test = AzureSearchClient(
+            make_search_settings(), mock_embedding_client, mock_manifest
+        )
+        client_under_test.client = MagicMock()
+        client_under_test.client.upload_documents.return_value = [
+            IndexingResult(key=id_b, succeeded=True, status_code=201),
+            IndexingResult(key=id_c, succeeded=False, status_code=400),
+        ]
+
+        with self.assertRaises(Exception) as raised:
+            client_under_test.index_document("doc.pdf", "hash", iter(["a", "b", "c"]))
+
+        self.assertEqual(raised.exception.__class__.__name__, "IndexingFailed")
+        client_under_test.client.delete_documents.assert_not_called()
+        # The old hash stays, and the uploaded chunk is recorded for cleanup
+        mock_manifest.save.assert_called_once_with(
+            "doc.pdf", "old hash", sorted({id_a, id_b, "id-old"})
+        )
+
+    def test_index_document_keeps_previous_version_when_extraction_fails(self):
+        mock_embedding_client = MagicMock(spec=AzureEmbeddingClient)
+        mock_manifest = MagicMock()
+        mock_manifest.get.return_value = ("old hash", {"id-old"})
+        client_under_test = AzureSearchClient(
+            make_search_settings(), mock_embedding_client, mock_manifest
+        )
+        client_under_test.client = MagicMock()
+
+        def chunks():
+            yield "a"
+            raise ValueError("corrupt page")
+
+        with self.assertRaises(ValueError):
+            client_under_test.index_document("doc.pdf", "hash", chunks(), window=4)
+
+        client_under_test.client.delete_documents.assert_not_called()
+        mock_manifest.save.assert_not_called()
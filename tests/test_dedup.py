@@ -0,0 +1,157 @@
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import unittest
+
+from src.indexer.core.signatures import SignatureStore
+from src.indexer.func.dedup import (
+    ChunkDeduplicator,
+    DedupReport,
+    MinHasher,
+    choose_bands,
+    normalize,
+    similarity,
+)
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+
+def paragraph(seed: int, words: int = 150) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 99)) for _ in range(words))
+
+
+def edit(text: str, changes: int) -> str:
+    """Replace a few words, keeping the text a near duplicate."""
+    words = text.split()
+    for i in range(changes):
+        words[i * 7] = "changed"
+    return " ".join(words)
+
+
+class TestMinHash(unittest.TestCase):
+    def test_signatures_estimate_similarity(self):
+        hasher = MinHasher()
+        text = normalize(paragraph(1))
+
+        self.assertEqual(similarity(hasher.signature(text), hasher.signature(text)), 1)
+        self.assertGreater(
+            similarity(hasher.signature(text), hasher.signature(edit(text, 2))), 0.85
+        )
+        self.assertLess(
+            similarity(hasher.signature(text), hasher.signature(paragraph(2))), 0.3
+        )
+
+    def test_bands_match_the_threshold(self):
+        bands, rows = choose_bands(128, 0.9)
+
+        self.assertEqual(bands * rows, 128)
+        self.assertLessEqual((1 / bands) ** (1 / rows), 0.9)
+
+
+class TestChunkDeduplicator(unittest.TestCase):
+    def test_drops_exact_and_near_duplicates_within_a_document(self):
+        first, other = paragraph(1), paragraph(2)
+        chunks = [first, "  " + first.upper() + "\n", edit(first, 2), other, "short"]
+        report = DedupReport("manual.pdf")
+
+        kept = list(ChunkDeduplicator().filter("manual.pdf", chunks, report))
+
+        self.assertEqual(kept, [first, other, "short"])
+        self.assertEqual(report.exact_duplicates, 1)
+        self.assertEqual(report.near_duplicates, 1)
+        self.assertEqual(report.to_dict()["dropped"], 2)
+
+    def test_threshold_of_one_keeps_near_duplicates(self):
+        first = paragraph(1)
+        chunks = [first, edit(first, 2), first]
+        report = DedupReport("manual.pdf")
+
+        kept = list(ChunkDeduplicator(threshold=1).filter("a", chunks, report))
+
+        self.assertEqual(kept, chunks[:2])
+        self.assertEqual(report.dropped, 1)
+
+
+class TestCrossDocumentDedup(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store = SignatureStore(os.path.join(self.temp_dir.name, "sig.db"))
+        self.deduplicator = ChunkDeduplicator(store=self.store)
+
+    def index(self, document_key: str, chunks: list[str]) -> tuple[list, DedupReport]:
+        report = DedupReport(document_key)
+        kept = list(self.deduplicator.filter(document_key, chunks, report))
+        self.deduplicator.commit(document_key)
+        return kept, report
+
+    def test_chunks_kept_by_other_documents_are_dropped(self):
+        shared, own = paragraph(1), paragraph(2)
+        self.index("a.pdf", [shared])
+
+        kept, report = self.index("b.pdf", [shared, edit(shared, 1), own])
+
+        self.assertEqual(kept, [own])
+        self.assertEqual(report.cross_document_duplicates, 2)
+
+    def test_a_new_version_is_not_compared_with_its_previous_one(self):
+        text = paragraph(1)
+        self.index("a.pdf", [text])
+
+        kept, report = self.index("a.pdf", [text, paragraph(2)])
+
+        self.assertEqual(kept, [text, paragraph(2)])
+        self.assertEqual(report.dropped, 0)
+        # The second version replaced the first one's signatures
+        self.assertEqual(self.index("b.pdf", [paragraph(2)])[0], [])
+
+    def test_signatures_are_only_saved_once_the_document_is_indexed(self):
+        text = paragraph(1)
+        list(self.deduplicator.filter("a.pdf", [text], DedupReport("a.pdf")))
+
+        # "a.pdf" was not indexed yet, so "b.pdf" keeps its copy
+        self.assertEqual(self.index("b.pdf", [text])[0], [text])
+
+        # Discarded signatures, e.g. after a failed upload, are never saved
+        other = paragraph(2)
+        list(self.deduplicator.filter("c.pdf", [other], DedupReport("c.pdf")))
+        self.deduplicator.discard("c.pdf")
+        self.deduplicator.commit("c.pdf")
+        self.assertEqual(self.index("d.pdf", [other])[0], [other])
+
+
+class TestImportCost(unittest.TestCase):
+    def test_importing_the_app_does_not_load_numpy(self):
+        indexer_dir = os.path.join(
+            os.path.dirname(__file__), os.pardir, "src", "indexer"
+        )
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, function_app; print('numpy' in sys.modules)",
+            ],
+            cwd=indexer_dir,
+            env={**os.environ, "ENVIRONMENT": "test", "WARM_UP_ON_START": "false"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
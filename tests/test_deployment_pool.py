@@ -0,0 +1,203 @@
+from collections import Counter
+import logging
+import time
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+from openai import (
+    AuthenticationError,
+    BadRequestError,
+    InternalServerError,
+    RateLimitError,
+)
+
+from src.indexer.clients import AzureEmbeddingClient, DeploymentPool
+from src.indexer.core.config import EmbeddingDeployment, parse_deployments
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+def make_deployment(
+    name: str, weight: float = 1.0, model: str = ""
+) -> EmbeddingDeployment:
+    return EmbeddingDeployment(
+        endpoint=f"https://{name}.openai.azure.com/",
+        deployment="embedding",
+        api_key="key",
+        weight=weight,
+        model=model,
+    )
+
+
+def make_raw_response(inputs: list | None = None):
+    raw = MagicMock()
+    raw.headers = {}
+    raw.parse.return_value.usage.prompt_tokens = 1
+    if inputs is not None:
+        raw.parse.return_value.data = [
+            MagicMock(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(inputs)
+        ]
+    return raw
+
+
+def make_error(error_class, status_code: int, headers: dict | None = None):
+    request = httpx.Request("POST", "https://example.openai.azure.com/")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return error_class("error", response=response, body=None)
+
+
+class TestParseDeployments(unittest.TestCase):
+    def test_defaults_and_overrides(self):
+        default = make_deployment("main")
+        deployments = parse_deployments(
+            '[{}, {"endpoint": "second", "weight": 2, "tokens_per_minute": 1000}]',
+            default,
+        )
+
+        self.assertEqual(deployments[0], default)
+        self.assertEqual(deployments[1].endpoint, "https://second.openai.azure.com/")
+        self.assertEqual(deployments[1].weight, 2)
+        self.assertEqual(deployments[1].tokens_per_minute, 1000)
+        self.assertEqual(deployments[1].api_key, "key")
+        self.assertEqual(parse_deployments("", default), [default])
+
+    def test_rejects_unknown_fields(self):
+        with self.assertRaises(ValueError):
+            parse_deployments('[{"url": "x"}]', make_deployment("main"))
+
+
+class TestDeploymentPool(unittest.TestCase):
+    def test_routes_by_weight(self):
+        pool = DeploymentPool(
+            [make_deployment("a", weight=3), make_deployment("b", weight=1)]
+        )
+        used = Counter()
+
+        def send(deployment):
+            used[deployment.name] += 1
+            return make_raw_response()
+
+        for _ in range(40):
+            pool.call(send, tokens=1)
+
+        self.assertEqual(used["a.openai.azure.com/embedding"], 30)
+        self.assertEqual(used["b.openai.azure.com/embedding"], 10)
+
+    def test_throttled_deployment_is_ejected_and_readmitted(self):
+        pool = DeploymentPool([make_deployment("a"), make_deployment("b")])
+        throttled = {"a": True}
+        used = []
+
+        def send(deployment):
+            host = deployment.endpoint.split("//")[1].split(".")[0]
+            used.append(host)
+            if host == "a" and throttled["a"]:
+                raise make_error(RateLimitError, 429, {"retry-after-ms": "300"})
+            return make_raw_response()
+
+        for _ in range(4):
+            pool.call(send, tokens=1)
+        # After the first 429, every request went to "b"
+        self.assertEqual(used, ["a", "b", "b", "b", "b"])
+
+        throttled["a"] = False
+        time.sleep(0.35)
+        used.clear()
+        for _ in range(4):
+            pool.call(send, tokens=1)
+        self.assertIn("a", used)
+        self.assertEqual(pool.members[0].failures, 0)
+
+    def test_waits_when_every_deployment_is_ejected(self):
+        pool = DeploymentPool([make_deployment("a")], eject_seconds=0.05)
+        send = MagicMock(
+            side_effect=[make_error(InternalServerError, 500), make_raw_response()]
+        )
+
+        started = time.monotonic()
+        pool.call(send, tokens=1)
+
+        self.assertEqual(send.call_count, 2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    def test_authentication_error_fails_over_to_another_deployment(self):
+        pool = DeploymentPool([make_deployment("a"), make_deployment("b")])
+        send = MagicMock(
+            side_effect=[make_error(AuthenticationError, 401), make_raw_response()]
+        )
+
+        pool.call(send, tokens=1)
+
+        self.assertEqual(send.call_count, 2)
+        self.assertGreater(pool.members[0].ejected_until, 0)
+
+    def test_authentication_error_is_raised_at_once_without_failover(self):
+        pool = DeploymentPool([make_deployment("a")], eject_seconds=10)
+        send = MagicMock(side_effect=make_error(AuthenticationError, 401))
+
+        started = time.monotonic()
+        with self.assertRaises(AuthenticationError):
+            pool.call(send, tokens=1)
+
+        self.assertEqual(send.call_count, 1)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_request_errors_are_raised_without_ejection(self):
+        pool = DeploymentPool([make_deployment("a"), make_deployment("b")])
+        send = MagicMock(side_effect=make_error(BadRequestError, 400))
+
+        with self.assertRaises(BadRequestError):
+            pool.call(send, tokens=1)
+        self.assertEqual(send.call_count, 1)
+        self.assertTrue(all(m.ejected_until == 0 for m in pool.members))
+
+    def test_rejects_mixed_models(self):
+        with self.assertRaises(ValueError):
+            DeploymentPool(
+                [
+                    make_deployment("a", model="text-embedding-3-small"),
+                    make_deployment("b", model="text-embedding-3-large"),
+                ]
+            )
+
+
+class TestPooledEmbeddingClient(unittest.TestCase):
+    @patch("src.indexer.clients.clients.AzureOpenAI")
+    def test_batches_are_spread_over_deployments(self, mock_openai: MagicMock):
+        mock_settings = MagicMock()
+        mock_settings.embedding_batch_size = 1
+        mock_settings.embedding_batch_max_tokens = 1000
+        mock_settings.embedding_dimensions = 0
+        mock_settings.embedding_dtype = "float32"
+        pool = DeploymentPool(
+            [make_deployment("a", model="m"), make_deployment("b", model="m")]
+        )
+        mock_create = mock_openai.return_value.embeddings.with_raw_response.create
+        mock_create.side_effect = lambda input, model, **options: make_raw_response(
+            input
+        )
+
+        client_under_test = AzureEmbeddingClient(mock_settings, pool=pool)
+        embeddings = client_under_test.get_embeddings(["a", "bb", "ccc", "dddd"])
+
+        self.assertEqual(client_under_test.embedding_model, "m")
+        self.assertEqual(embeddings[:, 0].tolist(), [1.0, 2.0, 3.0, 4.0])
+        endpoints = {
+            call.kwargs["azure_endpoint"] for call in mock_openai.call_args_list
+        }
+        self.assertEqual(len(endpoints), 2)
+        self.assertTrue(
+            all(call.kwargs["max_retries"] == 0 for call in mock_openai.call_args_list)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
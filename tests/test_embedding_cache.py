@@ -0,0 +1,132 @@
+import logging
+import os
+import tempfile
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from src.indexer.clients import AzureEmbeddingClient, EmbeddingCache
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_model_and_text(self):
+        key = EmbeddingCache.make_key("model-a", "text")
+
+        self.assertEqual(key, EmbeddingCache.make_key("model-a", "text"))
+        self.assertNotEqual(key, EmbeddingCache.make_key("model-b", "text"))
+        self.assertNotEqual(key, EmbeddingCache.make_key("model-a", "text2"))
+
+    def test_memory_tier_is_bounded_lru(self):
+        cache = EmbeddingCache(max_memory_items=2)
+        cache.put_many({"a": np.ones(3), "b": np.ones(3)})
+        cache.get_many(["a"])
+        cache.put_many({"c": np.ones(3)})
+
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_disk_tier_persists_float32_vectors(self):
+        cache = EmbeddingCache(self.path)
+        cache.put_many({"a": np.array([0.5, 1.5], dtype=np.float64)})
+        cache.close()
+
+        reopened = EmbeddingCache(self.path)
+        found = reopened.get_many(["a", "b"])
+
+        self.assertEqual(found["a"].dtype, np.float32)
+        self.assertEqual(found["a"].tolist(), [0.5, 1.5])
+        self.assertEqual(
+            reopened.stats(),
+            {"memory_hits": 0, "disk_hits": 1, "misses": 1, "memory_items": 1},
+        )
+        reopened.close()
+
+    def test_disk_tier_evicts_least_recently_used(self):
+        # Each vector is 4 float32 values = 16 bytes
+        cache = EmbeddingCache(self.path, max_memory_items=0, max_disk_bytes=32)
+        cache.put_many({"a": np.ones(4)})
+        cache.put_many({"b": np.ones(4)})
+        cache.get_many(["a"])
+        cache.put_many({"c": np.ones(4)})
+
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+        cache.close()
+
+    def test_rewriting_an_entry_does_not_grow_the_disk_tier(self):
+        cache = EmbeddingCache(self.path, max_memory_items=0, max_disk_bytes=32)
+        cache.put_many({"a": np.ones(4)})
+        for _ in range(3):
+            cache.put_many({"b": np.ones(4)})
+        cache.close()
+
+        # The size is read back from the file when it is reopened
+        reopened = EmbeddingCache(self.path, max_memory_items=0, max_disk_bytes=32)
+        reopened.put_many({"b": np.ones(4)})
+
+        self.assertEqual(set(reopened.get_many(["a", "b"])), {"a", "b"})
+        reopened.close()
+
+    def test_processes_sharing_the_file_share_the_size_limit(self):
+        first = EmbeddingCache(self.path, max_memory_items=0, max_disk_bytes=32)
+        second = EmbeddingCache(self.path, max_memory_items=0, max_disk_bytes=32)
+        first.put_many({"a": np.ones(4)})
+        second.put_many({"b": np.ones(4)})
+        first.put_many({"c": np.ones(4)})
+
+        # Each instance counts the other's writes; "a" is the oldest
+        self.assertEqual(set(second.get_many(["a", "b", "c"])), {"b", "c"})
+        (size,) = first._db.execute("SELECT SUM(size) FROM embeddings").fetchone()  # type: ignore
+        self.assertEqual(size, 32)
+        first.close()
+        second.close()
+
+
+class TestCachedEmbeddingClient(unittest.TestCase):
+    @patch("src.indexer.clients.clients.AzureOpenAI")
+    def test_get_embeddings_only_requests_misses(self, mock_openai: MagicMock):
+        # 1. Setup
+        mock_settings = MagicMock()
+        mock_settings.aoai_embedding_model_name = "model"
+        mock_settings.embedding_batch_size = 16
+        mock_settings.embedding_batch_max_tokens = 1000
+        mock_settings.embedding_dimensions = 0
+        mock_settings.embedding_dtype = "float32"
+
+        cache = EmbeddingCache()
+        cache.put_many({EmbeddingCache.make_key("model", "cached"): np.array([9.0])})
+        client_under_test = AzureEmbeddingClient(mock_settings, cache)
+
+        mock_create = mock_openai.return_value.embeddings.create
+        mock_create.return_value = MagicMock(
+            data=[
+                MagicMock(index=0, embedding=[1.0]),
+                MagicMock(index=1, embedding=[2.0]),
+            ]
+        )
+
+        # 2. Act
+        embeddings = client_under_test.get_embeddings(["new 1", "cached", "new 2"])
+        again = client_under_test.get_embeddings(["new 2"])
+
+        # 3. Assert
+        mock_create.assert_called_once_with(
+            input=["new 1", "new 2"], model="model", encoding_format="base64"
+        )
+        self.assertEqual(embeddings[:, 0].tolist(), [1.0, 9.0, 2.0])
+        self.assertEqual(again.tolist(), [[2.0]])
@@ -0,0 +1,249 @@
+from concurrent.futures import Future
+import codecs
+import io
+import logging
+import os
+import tempfile
+import zipfile
+
+import unittest
+
+import fitz  # type: ignore
+
+from src.indexer.func import (
+    DocxExtractor,
+    HtmlExtractor,
+    TextExtractor,
+    extract_pages,
+    extract_text_from_file,
+    is_supported,
+    iter_uploaded_files,
+    register_extractor,
+    uploaded_size,
+)
+from src.indexer.func.extractor_factory import EXTRACTOR_MAP
+from src.indexer.func.pdf_extractor import PdfExtractor
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    document = fitz.open()
+    for text in pages:
+        page = document.new_page()
+        page.insert_text((72, 72), text)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+class TestPdfExtractor(unittest.TestCase):
+    def test_iter_pages_reads_bytes_and_streams(self):
+        pdf = make_pdf(["first page", "second page"])
+        extractor = PdfExtractor()
+
+        from_bytes = list(extractor.iter_pages(pdf))
+        from_stream = list(extractor.iter_pages(io.BytesIO(pdf)))
+
+        self.assertEqual(len(from_bytes), 2)
+        self.assertIn("first page", from_bytes[0])
+        self.assertIn("second page", from_bytes[1])
+        self.assertEqual(from_bytes, from_stream)
+
+    def test_extract_text_from_file_uses_in_memory_content(self):
+        pdf = make_pdf(["hello", "world"])
+
+        text = extract_text_from_file("upload.PDF", pdf)
+
+        self.assertIn("hello", text)
+        self.assertIn("world", text)
+
+    def test_unsupported_or_broken_files_yield_nothing(self):
+        self.assertEqual(list(extract_pages("notes.xyz", b"data")), [])
+        self.assertEqual(extract_text_from_file("broken.pdf", b"not a pdf"), "")
+
+    def test_error_after_some_pages_is_raised(self):
+        class FailingExtractor:
+            def iter_pages(self, source):
+                yield "page 1"
+                yield "page 2"
+                raise RuntimeError("corrupt page 3")
+
+        register_extractor(".broken", FailingExtractor())
+        self.addCleanup(EXTRACTOR_MAP.pop, ".broken")
+
+        pages = []
+        with self.assertRaises(RuntimeError):
+            for page in extract_pages("file.broken", b"data"):
+                pages.append(page)
+
+        self.assertEqual(pages, ["page 1", "page 2"])
+        self.assertEqual(extract_text_from_file("file.broken", b"data"), "")
+
+    def test_parallel_extraction_matches_serial_in_page_order(self):
+        pdf = make_pdf([f"page {i}" for i in range(40)])
+        serial = PdfExtractor(max_workers=1)
+        parallel = PdfExtractor(parallel_page_threshold=10)
+        # Force sharding even on single-core machines
+        parallel.max_workers = 2
+
+        pages = list(parallel.iter_pages(pdf))
+
+        self.assertEqual(pages, list(serial.iter_pages(pdf)))
+        self.assertIn("page 39", pages[39])
+
+    def test_parallel_extraction_keeps_a_bounded_window_of_shards(self):
+        submitted = []
+
+        class FakePool:
+            def submit(self, fn, source, start, end):
+                submitted.append(start)
+                future: Future = Future()
+                future.set_result([f"page {i}" for i in range(start, end)])
+                return future
+
+        extractor = PdfExtractor()
+        extractor.max_workers = 2
+        extractor._get_pool = FakePool  # type: ignore
+
+        pages = extractor.iter_pages_parallel("document.pdf", 1000)
+        first = next(pages)
+
+        self.assertEqual(first, "page 0")
+        # 2 shards per worker are in flight, not all 8
+        self.assertEqual(len(submitted), 4)
+        self.assertEqual(list(pages)[-1], "page 999")
+        self.assertEqual(len(submitted), 8)
+
+
+def make_docx(paragraphs: list[str]) -> bytes:
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    document = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+        f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>'
+    )
+    package = io.BytesIO()
+    with zipfile.ZipFile(package, "w") as zf:
+        zf.writestr("[Content_Types].xml", "<Types/>")
+        zf.writestr("word/document.xml", document)
+    return package.getvalue()
+
+
+class TestTextExtractors(unittest.TestCase):
+    def test_text_is_decoded_across_segment_boundaries(self):
+        text = "日本語のテキスト\n" * 50 + "end"
+        extractor = TextExtractor(segment_bytes=7)
+
+        segments = list(extractor.iter_pages(text.encode("utf-8")))
+
+        self.assertGreater(len(segments), 10)
+        self.assertEqual("".join(segments), text)
+
+    def test_text_files_are_memory_mapped_from_paths_and_files(self):
+        text = "line one\nline two\n" * 1000
+        with tempfile.NamedTemporaryFile("wb", suffix=".md", delete=False) as file:
+            file.write(codecs.BOM_UTF8 + text.encode("utf-8"))
+        self.addCleanup(os.remove, file.name)
+        extractor = TextExtractor(segment_bytes=4096)
+
+        self.assertEqual("".join(extractor.iter_pages(file.name)), text)
+        with open(file.name, "rb") as source:
+            self.assertEqual("".join(extractor.iter_pages(source)), text)
+        self.assertEqual(extract_text_from_file(file.name), text)
+
+    def test_html_is_converted_to_text(self):
+        html = (
+            b"<html><head><meta charset='latin-1'><title>T</title>"
+            b"<style>p {}</style></head><body><h1>Title</h1>"
+            b"<p>Caf\xe9 &amp; bar,   spread\n over lines</p>"
+            b"<script>var x = 1;</script><pre>a\n  b</pre></body></html>"
+        )
+
+        text = "".join(HtmlExtractor(segment_bytes=16).iter_pages(html))
+
+        self.assertEqual(
+            text.strip(), "Title\n\nCafé & bar, spread over lines\n\na\n  b"
+        )
+
+    def test_docx_paragraphs_are_extracted(self):
+        docx = make_docx([f"Paragraph {i}" for i in range(100)])
+
+        segments = list(DocxExtractor(segment_bytes=200).iter_pages(docx))
+
+        self.assertGreater(len(segments), 1)
+        self.assertTrue(all(len(s.encode("utf-8")) <= 200 for s in segments))
+        text = "".join(segments)
+        self.assertTrue(text.startswith("Paragraph 0\n\nParagraph 1\n\n"))
+        self.assertIn("Paragraph 99", text)
+        self.assertEqual(extract_text_from_file("report.docx", docx), text)
+
+    def test_long_docx_paragraphs_are_split_by_bytes(self):
+        paragraph = "日本語" * 100
+        docx = make_docx(["short", paragraph])
+
+        segments = list(DocxExtractor(segment_bytes=64).iter_pages(docx))
+
+        self.assertTrue(all(len(s.encode("utf-8")) <= 64 for s in segments))
+        self.assertEqual("".join(segments), f"short\n\n{paragraph}\n\n")
+
+    def test_supported_types(self):
+        for name in ("a.pdf", "b.TXT", "c.md", "d.html", "e.htm", "f.docx"):
+            self.assertTrue(is_supported(name), name)
+        self.assertFalse(is_supported("g.png"))
+
+
+class TestUploadedFiles(unittest.TestCase):
+    def test_expands_zip_archives_in_memory(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("docs/a.pdf", b"a")
+            zf.writestr("docs/", b"")
+            zf.writestr("__MACOSX/docs/._a.pdf", b"junk")
+            zf.writestr("b.txt", b"b")
+        archive.seek(0)
+
+        files = list(
+            iter_uploaded_files(
+                [("library.zip", archive), ("single.pdf", io.BytesIO(b"s"))]
+            )
+        )
+
+        self.assertEqual(
+            files, [("docs/a.pdf", b"a"), ("b.txt", b"b"), ("single.pdf", b"s")]
+        )
+
+    def test_skips_unsupported_files_unread(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("a.txt", b"a")
+            zf.writestr("b.png", b"b")
+        archive.seek(0)
+        image = io.BytesIO(b"c")
+
+        files = list(
+            iter_uploaded_files(
+                [("library.zip", archive), ("c.png", image)], accept=is_supported
+            )
+        )
+
+        self.assertEqual(files, [("a.txt", b"a")])
+        self.assertEqual(image.tell(), 0)
+
+    def test_uploaded_size_counts_decompressed_members(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("a.txt", b"a" * 100_000)
+            zf.writestr("b.png", b"b" * 50_000)
+        archive.seek(0)
+
+        size = uploaded_size("library.zip", archive, accept=is_supported)
+
+        self.assertLess(len(archive.getvalue()), 10_000)
+        self.assertEqual(size, 100_000)
+        self.assertEqual(archive.tell(), 0)
+        self.assertEqual(uploaded_size("a.txt", io.BytesIO(b"abc")), 3)
@@ -0,0 +1,102 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import logging
+import threading
+
+import unittest
+from unittest.mock import patch
+
+from src.indexer.core.http import HttpClientFactory, pool_sizes
+from src.indexer.core.metrics import Metrics
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClientFactory(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = f"127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.enabled = True
+        patcher = patch("src.indexer.core.http.metrics", self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_sizes_are_summed_per_host(self):
+        sizes = pool_sizes(
+            [("aoai", 4), ("aoai", 4), ("search", 8), ("other", 2)], {"other": 16}
+        )
+        self.assertEqual(sizes, {"aoai": 8, "search": 8, "other": 16})
+
+    def test_hosts_get_their_own_limits(self):
+        factory = HttpClientFactory({self.host: 3}, default_pool_size=7, http2=False)
+        client = factory.create_client()
+        self.addCleanup(client.close)
+
+        pools = {
+            pattern.pattern: transport.transport._pool._max_connections
+            for pattern, transport in client._mounts.items()
+        }
+        self.assertEqual(pools, {f"all://{self.host}": 3})
+        self.assertEqual(client._transport.transport._pool._max_connections, 7)
+        self.assertEqual(client.timeout.connect, 5.0)
+
+    def test_sync_requests_record_pool_wait_and_wire_time(self):
+        client = HttpClientFactory({self.host: 2}, http2=False).create_client()
+        self.addCleanup(client.close)
+
+        for _ in range(3):
+            self.assertEqual(client.get(f"http://{self.host}/").text, "ok")
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["stages"]["http_pool_wait"]["count"], 3)
+        self.assertEqual(snapshot["stages"]["http_wire"]["count"], 3)
+        # The connection is kept alive and reused
+        self.assertEqual(snapshot["stages"]["http_connect"]["count"], 1)
+        self.assertEqual(snapshot["counters"]["http_connections_opened"], 1)
+
+    def test_async_requests_are_instrumented(self):
+        async def run():
+            factory = HttpClientFactory({self.host: 2}, http2=False)
+            async with factory.create_async_client() as client:
+                responses = await asyncio.gather(
+                    *(client.get(f"http://{self.host}/") for _ in range(4))
+                )
+            return [response.text for response in responses]
+
+        self.assertEqual(asyncio.run(run()), ["ok"] * 4)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["http_requests"], 4)
+        self.assertLessEqual(snapshot["counters"]["http_connections_opened"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
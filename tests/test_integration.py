@@ -2,9 +2,9 @@ import logging
 
 import azure.functions as func
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 
-from src.indexer.function_app import indexer
+from src.indexer.function_app import indexer, submit_indexing_job
 
 logging.basicConfig(
     filename="test.log",
@@ -14,19 +14,48 @@ logging.basicConfig(
 )
 
 
+def make_settings() -> MagicMock:
+    return MagicMock(
+        PERFORM_INDEXING="true",
+        pdf_parallel_page_threshold=200,
+        pdf_extraction_workers=0,
+        extract_segment_bytes=256 * 1024,
+        dedup_mode="document",
+        dedup_near_threshold=0.9,
+        dedup_num_perm=128,
+        dedup_shingle_size=5,
+        dedup_min_chars=50,
+        stream_window_chunks=256,
+        admission_memory_budget_bytes=1024**3,
+        admission_max_concurrent=4,
+        admission_max_queued=16,
+        admission_queue_timeout_seconds=30.0,
+        admission_bytes_per_page=256 * 1024,
+        upload_part_bytes=4 * 1024 * 1024,
+        upload_max_bytes=512 * 1024 * 1024,
+    )
+
+
 class TestIndexerFunction(unittest.TestCase):
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.manifest")
     @patch("src.indexer.function_app.search_client")
-    @patch("src.indexer.function_app.extract_text_from_file")
-    @patch("src.indexer.function_app.chunk_text")
+    @patch("src.indexer.function_app.extract_pages")
+    @patch("src.indexer.function_app.iter_chunks")
     def test_indexer_happy_path(
         self,
         mock_chunk: MagicMock,
         mock_extract: MagicMock,
-        mock_search_client: MagicMock,
+        mock_search_client_ref: MagicMock,
+        mock_manifest_ref: MagicMock,
+        mock_settings_ref: MagicMock,
     ):
         # --- 1. dummy data ---
-        mock_extract.return_value = "This is some extracted text."
-        mock_chunk.return_value = ["Chunk 1", "Chunk 2"]
+        mock_settings_ref.get.return_value = make_settings()
+        mock_manifest_ref.get.return_value.is_unchanged.return_value = False
+        mock_search_client = mock_search_client_ref.get.return_value
+        mock_extract.return_value = iter(["This is some extracted text."])
+        mock_chunk.return_value = iter(["Chunk 1", "Chunk 2"])
 
         # --- 2. create a mock HTTP request ---
         req = MagicMock(spec=func.HttpRequest)
@@ -39,6 +68,81 @@ class TestIndexerFunction(unittest.TestCase):
         # --- 4. assertions ---
         self.assertEqual(response.status_code, 200)
 
-        mock_extract.assert_called_once()
-        mock_chunk.assert_called_once_with("This is some extracted text.")
-        mock_search_client.index_chunks.assert_called_once_with(["Chunk 1", "Chunk 2"])
+        mock_extract.assert_called_once_with("test.pdf", b"fake file content")
+        mock_chunk.assert_called_once_with(mock_extract.return_value)
+        mock_search_client.index_document.assert_called_once_with(
+            "test.pdf", ANY, ANY, window=ANY
+        )
+        # Chunks are streamed into indexing rather than materialized first
+        streamed_chunks = mock_search_client.index_document.call_args.args[2]
+        self.assertEqual(list(streamed_chunks), ["Chunk 1", "Chunk 2"])
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.manifest")
+    @patch("src.indexer.function_app.search_client")
+    @patch("src.indexer.function_app.extract_pages")
+    @patch("src.indexer.function_app.iter_chunks")
+    def test_indexer_drops_duplicate_chunks_before_indexing(
+        self,
+        mock_chunk: MagicMock,
+        mock_extract: MagicMock,
+        mock_search_client_ref: MagicMock,
+        mock_manifest_ref: MagicMock,
+        mock_settings_ref: MagicMock,
+    ):
+        mock_settings_ref.get.return_value = make_settings()
+        mock_manifest_ref.get.return_value.is_unchanged.return_value = False
+        mock_search_client = mock_search_client_ref.get.return_value
+        mock_chunk.return_value = iter(["Chunk 1", "Chunk 2", "chunk  1"])
+
+        req = MagicMock(spec=func.HttpRequest)
+        mock_file = MagicMock(filename="test.pdf", read=lambda: b"fake file content")
+        req.files = {"file": mock_file}
+
+        self.assertEqual(indexer(req).status_code, 200)
+
+        streamed_chunks = mock_search_client.index_document.call_args.args[2]
+        self.assertEqual(list(streamed_chunks), ["Chunk 1", "Chunk 2"])
+
+    @patch("src.indexer.function_app.settings")
+    def test_indexer_returns_500_when_clients_cannot_be_created(
+        self, mock_settings_ref: MagicMock
+    ):
+        mock_settings_ref.get.side_effect = KeyError("SEARCH_SERVICE_ENDPOINT")
+        req = MagicMock(spec=func.HttpRequest)
+
+        response = indexer(req)
+
+        self.assertEqual(response.status_code, 500)
+
+    @patch("src.indexer.function_app.search_client")
+    def test_indexer_rejects_unsupported_types_without_reading(
+        self, mock_search_client_ref: MagicMock
+    ):
+        req = MagicMock(spec=func.HttpRequest)
+        mock_file = MagicMock(filename="image.png")
+        req.files = {"file": mock_file}
+
+        response = indexer(req)
+
+        self.assertEqual(response.status_code, 415)
+        self.assertIn(".docx", response.get_body().decode())
+        mock_file.read.assert_not_called()
+        mock_search_client_ref.get.return_value.index_document.assert_not_called()
+
+    @patch("src.indexer.function_app.job_worker")
+    def test_submit_indexing_job_returns_202_with_job_id(
+        self, mock_job_worker_ref: MagicMock
+    ):
+        worker = mock_job_worker_ref.get.return_value
+        worker.store.enqueue.return_value = MagicMock(job_id="abc", status="queued")
+        req = MagicMock(spec=func.HttpRequest)
+        mock_file = MagicMock(filename="test.pdf", read=lambda: b"fake file content")
+        req.files = {"file": mock_file}
+
+        response = submit_indexing_job(req)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers["Location"], "/api/indexer/jobs/abc")
+        worker.store.enqueue.assert_called_once_with("test.pdf", b"fake file content")
+        worker.notify.assert_called_once()
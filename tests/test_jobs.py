@@ -0,0 +1,162 @@
+import logging
+import os
+import tempfile
+import time
+
+import unittest
+
+from src.indexer.core.jobs import (
+    Job,
+    JobDeferred,
+    JobStore,
+    JobWorker,
+    report_progress,
+)
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "jobs.db")
+        self.store = JobStore(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_job_lifecycle(self):
+        job = self.store.enqueue("manual.pdf", b"%PDF")
+        self.assertEqual(job.status, "queued")
+
+        claimed = self.store.claim()
+        assert claimed is not None
+        self.assertEqual(claimed.job_id, job.job_id)
+        self.assertEqual(claimed.status, "running")
+        self.assertIsNone(self.store.claim())
+        self.assertEqual(self.store.read_payload(job.job_id), b"%PDF")
+
+        self.store.update_progress(claimed, "indexing", 42)
+        self.assertEqual(self.store.get(job.job_id).processed_chunks, 42)  # type: ignore
+
+        self.store.finish(claimed, "done")
+        finished = self.store.get(job.job_id)
+        assert finished is not None
+        self.assertEqual((finished.status, finished.message), ("succeeded", "done"))
+        with self.assertRaises(KeyError):
+            self.store.read_payload(job.job_id)
+
+    def test_expired_lease_is_reclaimed_until_max_attempts(self):
+        store = JobStore(self.path, lease_seconds=-1, max_attempts=2)
+        job = store.enqueue("manual.pdf", b"%PDF")
+
+        self.assertEqual(store.claim().attempts, 1)  # type: ignore
+        self.assertEqual(store.claim().attempts, 2)  # type: ignore
+        self.assertIsNone(store.claim())
+        self.assertEqual(store.get(job.job_id).status, "failed")  # type: ignore
+        with self.assertRaises(KeyError):
+            store.read_payload(job.job_id)
+
+    def test_only_the_current_claim_can_finish_a_job(self):
+        store = JobStore(self.path, lease_seconds=-1)
+        store.enqueue("manual.pdf", b"%PDF")
+        stale = store.claim()
+        current = store.claim()
+        assert stale is not None and current is not None
+
+        self.assertFalse(store.renew(stale))
+        store.update_progress(stale, "indexing", 99)
+        self.assertEqual(store.get(current.job_id).processed_chunks, 0)  # type: ignore
+        self.assertFalse(store.finish(stale, "done twice"))
+        self.assertEqual(store.read_payload(current.job_id), b"%PDF")
+        self.assertTrue(store.finish(current, "done"))
+        self.assertEqual(store.get(current.job_id).message, "done")  # type: ignore
+
+    def test_finished_jobs_are_deleted_after_the_retention(self):
+        store = JobStore(self.path, retention_seconds=-1)
+        done = store.enqueue("done.pdf", b"%PDF")
+        store.finish(store.claim(), "done")  # type: ignore
+        queued = store.enqueue("queued.pdf", b"%PDF")
+
+        self.assertIsNone(store.get(done.job_id))
+        self.assertIsNotNone(store.get(queued.job_id))
+
+    def test_queue_survives_reopening(self):
+        job = self.store.enqueue("manual.pdf", b"%PDF")
+
+        reopened = JobStore(self.path)
+
+        self.assertEqual(reopened.claim().job_id, job.job_id)  # type: ignore
+
+
+class TestJobWorker(unittest.TestCase):
+    def test_records_result_or_error_per_job(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = JobStore(os.path.join(temp_dir, "jobs.db"))
+            ok = store.enqueue("ok.pdf", b"ok")
+            bad = store.enqueue("bad.pdf", b"bad")
+
+            def process(job: Job) -> str:
+                if store.read_payload(job.job_id) == b"bad":
+                    raise ValueError("cannot extract")
+                return "indexed"
+
+            processed = JobWorker(store, process).run_pending()
+
+            self.assertEqual(processed, 2)
+            self.assertEqual(store.get(ok.job_id).message, "indexed")  # type: ignore
+            failed = store.get(bad.job_id)
+            assert failed is not None
+            self.assertEqual(
+                (failed.status, failed.message), ("failed", "cannot extract")
+            )
+
+    def test_lease_is_renewed_while_a_job_runs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = JobStore(os.path.join(temp_dir, "jobs.db"), lease_seconds=0.3)
+            job = store.enqueue("slow.pdf", b"%PDF")
+
+            def process(job: Job) -> str:
+                # Longer than the lease; another claim must not take the job
+                time.sleep(1.0)
+                self.assertIsNone(store.claim())
+                return "indexed"
+
+            JobWorker(store, process).run_pending()
+
+            finished = store.get(job.job_id)
+            assert finished is not None
+            self.assertEqual((finished.status, finished.attempts), ("succeeded", 1))
+
+    def test_deferred_job_is_queued_again_without_using_an_attempt(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = JobStore(os.path.join(temp_dir, "jobs.db"))
+            job = store.enqueue("busy.pdf", b"%PDF")
+
+            def process(job: Job) -> str:
+                raise JobDeferred("Too busy.", 60)
+
+            JobWorker(store, process).run_pending()
+
+            deferred = store.get(job.job_id)
+            assert deferred is not None
+            self.assertEqual(
+                (deferred.status, deferred.stage, deferred.attempts),
+                ("queued", "waiting", 0),
+            )
+            self.assertEqual(store.pending(), 1)
+            # Not claimed again before the delay passed
+            self.assertIsNone(store.claim())
+
+    def test_report_progress_reports_final_count(self):
+        counts = []
+
+        items = list(report_progress(iter("abc"), counts.append, interval=3600))
+
+        self.assertEqual(items, ["a", "b", "c"])
+        self.assertEqual(counts, [3])
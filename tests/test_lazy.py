@@ -0,0 +1,54 @@
+import logging
+import threading
+import time
+
+import unittest
+
+from src.indexer.core.lazy import Lazy
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class TestLazy(unittest.TestCase):
+    def test_creates_value_once_across_threads(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        lazy = Lazy(factory)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(lazy.get()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_failed_factory_is_retried(self):
+        attempts = []
+
+        def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("not yet")
+            return "ready"
+
+        lazy = Lazy(factory)
+
+        with self.assertRaises(ConnectionError):
+            lazy.get()
+        self.assertFalse(lazy.initialized)
+        self.assertEqual(lazy.get(), "ready")
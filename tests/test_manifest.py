@@ -0,0 +1,105 @@
+import logging
+import os
+import tempfile
+
+import unittest
+
+from src.indexer.core.manifest import (
+    ManifestStore,
+    ReindexTracker,
+    hash_bytes,
+    make_chunk_ids,
+)
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class TestChunkIds(unittest.TestCase):
+    def test_ids_are_stable_and_scoped_to_document(self):
+        ids = make_chunk_ids("manual.pdf", ["a", "b", "a"])
+
+        self.assertEqual(ids, make_chunk_ids("manual.pdf", ["a", "b", "a"]))
+        self.assertEqual(len(set(ids)), 3)
+        self.assertNotEqual(ids, make_chunk_ids("other.pdf", ["a", "b", "a"]))
+        # Editing one chunk keeps the IDs of the others
+        self.assertEqual(make_chunk_ids("manual.pdf", ["a", "c"])[0], ids[0])
+
+    def test_ids_are_valid_search_keys(self):
+        for chunk_id in make_chunk_ids("マニュアル.pdf", ["日本語のテキスト"]):
+            self.assertRegex(chunk_id, r"^[A-Za-z0-9_\-=]+$")
+
+
+class TestManifestStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ManifestStore(os.path.join(self.temp_dir.name, "manifest.db"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_tracker_for_new_document_yields_everything(self):
+        tracker = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+
+        new_chunks = [chunk for _, chunk in tracker.new_chunks(iter(["a", "b"]))]
+
+        self.assertFalse(tracker.unchanged)
+        self.assertEqual(new_chunks, ["a", "b"])
+        self.assertEqual(tracker.stale_ids, [])
+
+    def test_tracker_diffs_against_committed_state(self):
+        first = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+        list(first.new_chunks(["a", "b"]))
+        first.commit()
+
+        same = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+        edited = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v2"))
+        new_chunks = [chunk for _, chunk in edited.new_chunks(iter(["a", "c"]))]
+
+        self.assertTrue(same.unchanged)
+        self.assertTrue(self.store.is_unchanged("doc.pdf", hash_bytes(b"v1")))
+        self.assertEqual(new_chunks, ["c"])
+        self.assertEqual(edited.stale_ids, [first.chunk_ids[1]])
+
+    def test_abandoned_run_forces_a_retry(self):
+        tracker = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+        ids = [chunk_id for chunk_id, _ in tracker.new_chunks(["a", "b"])]
+        tracker.abandon({ids[0]})
+
+        retry = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+
+        self.assertFalse(retry.unchanged)
+        self.assertEqual([chunk for _, chunk in retry.new_chunks(["a", "b"])], ["b"])
+
+    def test_abandoned_run_keeps_the_previous_version(self):
+        first = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+        old_ids = [chunk_id for chunk_id, _ in first.new_chunks(["a", "b"])]
+        first.commit()
+
+        edited = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v2"))
+        new_ids = [chunk_id for chunk_id, _ in edited.new_chunks(["a", "c"])]
+        edited.abandon(new_ids)
+
+        self.assertTrue(self.store.is_unchanged("doc.pdf", hash_bytes(b"v1")))
+        # The uploaded chunk is recorded so a later version can delete it
+        recorded = self.store.get("doc.pdf")
+        assert recorded is not None
+        self.assertEqual(recorded[1], {*old_ids, *new_ids})
+
+    def test_undeleted_stale_chunks_stay_recorded(self):
+        first = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v1"))
+        list(first.new_chunks(["a", "b"]))
+        first.commit()
+
+        edited = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v2"))
+        list(edited.new_chunks(["a"]))
+        edited.commit(undeleted_ids=edited.stale_ids)
+
+        retry = ReindexTracker(self.store, "doc.pdf", hash_bytes(b"v2"))
+        list(retry.new_chunks(["a"]))
+        self.assertFalse(retry.unchanged)
+        self.assertEqual(retry.stale_ids, [first.chunk_ids[1]])
@@ -0,0 +1,66 @@
+import logging
+
+import unittest
+
+from src.indexer.core.metrics import Metrics
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_metrics_record_nothing(self):
+        metrics = Metrics()
+
+        with metrics.span("embed"):
+            metrics.add("embedding_requests")
+        items = list(metrics.timed_iter("extract", iter([1, 2])))
+
+        self.assertEqual(items, [1, 2])
+        self.assertEqual(metrics.snapshot(), {"counters": {}, "stages": {}})
+
+    def test_records_spans_counters_and_errors(self):
+        metrics = Metrics()
+        metrics.configure("prometheus")
+
+        with metrics.span("upload"):
+            metrics.add("upload_documents", 3)
+        with self.assertRaises(ValueError):
+            with metrics.span("upload"):
+                raise ValueError("boom")
+        list(metrics.timed_iter("extract", ["page 1", "page 2"]))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(
+            snapshot["counters"], {"upload_documents": 3, "upload_errors": 1}
+        )
+        self.assertEqual(snapshot["stages"]["upload"]["count"], 2)
+        self.assertEqual(snapshot["stages"]["extract"]["count"], 1)
+
+    def test_renders_prometheus_text(self):
+        metrics = Metrics()
+        metrics.configure("prometheus")
+        metrics.add("chunks", 5)
+        metrics.observe("chunk", 0.02)
+
+        text = metrics.render_prometheus()
+
+        self.assertIn("indexer_chunks_total 5", text)
+        self.assertIn(
+            'indexer_stage_duration_seconds_bucket{stage="chunk",le="0.01"} 0', text
+        )
+        self.assertIn(
+            'indexer_stage_duration_seconds_bucket{stage="chunk",le="0.025"} 1', text
+        )
+        self.assertIn(
+            'indexer_stage_duration_seconds_bucket{stage="chunk",le="+Inf"} 1', text
+        )
+        self.assertIn('indexer_stage_duration_seconds_count{stage="chunk"} 1', text)
+
+    def test_rejects_unknown_exporter(self):
+        with self.assertRaises(ValueError):
+            Metrics().configure("statsd")
@@ -0,0 +1,216 @@
+from typing import Any, Dict, List
+import asyncio
+import logging
+import os
+import tempfile
+
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+from azure.search.documents.models import IndexingResult
+
+from src.indexer.clients import AsyncIndexingPipeline
+from src.indexer.core.manifest import ManifestStore
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class FakeEmbeddingClient:
+    batch_size = 2
+    batch_max_tokens = 1000
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def embed_batch(self, texts: List[str]) -> np.ndarray:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+class FakeSearchClient:
+    def __init__(self):
+        self.batches: List[List[Dict[str, Any]]] = []
+
+    async def upload_documents(self, documents: List[Dict[str, Any]]):
+        self.batches.append(documents)
+        return [
+            IndexingResult(key=doc["id"], succeeded=True, status_code=201)
+            for doc in documents
+        ]
+
+    async def delete_documents(self, documents: List[Dict[str, Any]]):
+        return []
+
+
+class TestAsyncIndexingPipeline(unittest.IsolatedAsyncioTestCase):
+    async def test_index_chunks_bounds_concurrency_and_batches_uploads(self):
+        # 1. Setup
+        embedding_client = FakeEmbeddingClient()
+        search_client = FakeSearchClient()
+        pipeline = AsyncIndexingPipeline(
+            embedding_client,  # type: ignore
+            search_client,  # type: ignore
+            max_concurrent_embeddings=3,
+            upload_batch_size=4,
+        )
+        chunks = [f"chunk {i}" for i in range(10)]
+
+        # 2. Act
+        uploaded = await pipeline.index_chunks(chunks, [str(i) for i in range(10)])
+
+        # 3. Assert
+        self.assertEqual(uploaded, 10)
+        self.assertEqual(embedding_client.max_in_flight, 3)
+        self.assertEqual([len(batch) for batch in search_client.batches], [4, 4, 2])
+
+        documents = sorted(
+            (doc for batch in search_client.batches for doc in batch),
+            key=lambda doc: int(doc["id"]),
+        )
+        self.assertEqual([doc["content"] for doc in documents], chunks)
+        self.assertEqual(documents[0]["contentVector"].tolist(), [7.0])
+
+    async def test_index_chunks_counts_failed_uploads(self):
+        search_client = MagicMock()
+
+        async def upload_documents(documents: List[Dict[str, Any]]):
+            return [
+                IndexingResult(
+                    key=doc["id"], succeeded=doc["id"] != "1", status_code=400
+                )
+                for doc in documents
+            ]
+
+        search_client.upload_documents = upload_documents
+        pipeline = AsyncIndexingPipeline(FakeEmbeddingClient(), search_client)  # type: ignore
+
+        uploaded = await pipeline.index_chunks(["a", "b", "c"], ["0", "1", "2"])
+
+        self.assertEqual(uploaded, 2)
+
+    async def test_index_document_consumes_chunk_stream(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = ManifestStore(os.path.join(temp_dir, "manifest.db"))
+            search_client = FakeSearchClient()
+            pipeline = AsyncIndexingPipeline(
+                FakeEmbeddingClient(),  # type: ignore
+                search_client,  # type: ignore
+                upload_batch_size=3,
+                manifest=manifest,
+            )
+            consumed: List[str] = []
+
+            def chunks():
+                for i in range(7):
+                    consumed.append(f"chunk {i}")
+                    yield f"chunk {i}"
+
+            first = await pipeline.index_document("doc.pdf", "v1", chunks())
+            again = await pipeline.index_document("doc.pdf", "v1", chunks())
+
+        self.assertEqual(first, 7)
+        self.assertEqual(again, 0)
+        self.assertEqual(len(consumed), 7)
+        self.assertEqual(sum(len(batch) for batch in search_client.batches), 7)
+
+    async def test_index_documents_shares_batches_across_documents(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = ManifestStore(os.path.join(temp_dir, "manifest.db"))
+            search_client = FakeSearchClient()
+            pipeline = AsyncIndexingPipeline(
+                FakeEmbeddingClient(),  # type: ignore
+                search_client,  # type: ignore
+                upload_batch_size=4,
+                manifest=manifest,
+            )
+            documents = [
+                ("a.pdf", "v1", [f"a{i}" for i in range(3)]),
+                ("b.pdf", "v1", [f"b{i}" for i in range(3)]),
+                ("empty.pdf", "v1", []),
+            ]
+
+            results = await pipeline.index_documents(documents, 2)
+            again = await pipeline.index_documents(documents[:1], 2)
+
+        by_key = {result.document_key: result for result in results}
+        self.assertEqual(
+            (by_key["a.pdf"].status, by_key["a.pdf"].uploaded), ("indexed", 3)
+        )
+        self.assertEqual(
+            (by_key["b.pdf"].status, by_key["b.pdf"].uploaded), ("indexed", 3)
+        )
+        self.assertEqual(by_key["empty.pdf"].status, "failed")
+        # 6 chunks from two documents fill batches of 4 and 2
+        self.assertEqual([len(batch) for batch in search_client.batches], [4, 2])
+        self.assertEqual(again[0].status, "unchanged")
+
+    async def test_failed_documents_keep_their_previous_version(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = ManifestStore(os.path.join(temp_dir, "manifest.db"))
+            search_client = FakeSearchClient()
+            deleted: List[str] = []
+
+            async def delete_documents(documents: List[Dict[str, Any]]):
+                deleted.extend(doc["id"] for doc in documents)
+                return [
+                    IndexingResult(key=doc["id"], succeeded=True, status_code=200)
+                    for doc in documents
+                ]
+
+            search_client.delete_documents = delete_documents  # type: ignore
+            pipeline = AsyncIndexingPipeline(
+                FakeEmbeddingClient(),  # type: ignore
+                search_client,  # type: ignore
+                manifest=manifest,
+            )
+            await pipeline.index_documents([("a.pdf", "v1", ["a0", "a1"])])
+            old_ids = manifest.get("a.pdf")[1]  # type: ignore
+
+            def truncated():
+                yield "a0"
+                raise ValueError("corrupt page")
+
+            results = await pipeline.index_documents([("a.pdf", "v2", truncated())])
+
+            self.assertEqual(results[0].status, "failed")
+            self.assertEqual(deleted, [])
+            self.assertTrue(manifest.is_unchanged("a.pdf", "v1"))
+            self.assertEqual(manifest.get("a.pdf")[1], old_ids)  # type: ignore
+            with self.assertRaises(ValueError):
+                await pipeline.index_document("a.pdf", "v2", truncated())
+            self.assertTrue(manifest.is_unchanged("a.pdf", "v1"))
+
+    async def test_uploaded_chunks_are_recorded_when_indexing_fails(self):
+        class FailingEmbeddingClient(FakeEmbeddingClient):
+            async def embed_batch(self, texts: List[str]) -> np.ndarray:
+                if "boom" in texts:
+                    # Fail only after the first batch was uploaded
+                    await asyncio.sleep(0.1)
+                    raise RuntimeError("embedding failed")
+                return await super().embed_batch(texts)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = ManifestStore(os.path.join(temp_dir, "manifest.db"))
+            pipeline = AsyncIndexingPipeline(
+                FailingEmbeddingClient(),  # type: ignore
+                FakeSearchClient(),  # type: ignore
+                upload_batch_size=2,
+                manifest=manifest,
+            )
+
+            with self.assertRaises(RuntimeError):
+                await pipeline.index_documents([("a.pdf", "v1", ["a0", "a1", "boom"])])
+
+            # The uploaded chunks are known, so the next run can remove them
+            self.assertFalse(manifest.is_unchanged("a.pdf", "v1"))
+            self.assertEqual(len(manifest.get("a.pdf")[1]), 2)  # type: ignore
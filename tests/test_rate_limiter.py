@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+from openai import BadRequestError, InternalServerError, RateLimitError
+
+from src.indexer.clients.rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    retry_after_seconds,
+)
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+def make_raw_response(prompt_tokens: int = 10, headers: dict | None = None):
+    raw = MagicMock()
+    raw.headers = headers or {}
+    raw.parse.return_value.usage.prompt_tokens = prompt_tokens
+    return raw
+
+
+def make_error(error_class, status_code: int, headers: dict | None = None):
+    request = httpx.Request("POST", "https://example.openai.azure.com/")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return error_class("error", response=response, body=None)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_waits_for_refill(self):
+        bucket = TokenBucket(600)  # 10 per second
+        now = bucket.updated
+        self.assertEqual(bucket.reserve(600, now), 0.0)
+        self.assertAlmostEqual(bucket.reserve(20, now), 2.0)
+        # Refilled after the debt is paid
+        self.assertAlmostEqual(bucket.reserve(10, now + 3.0), 0.0)
+
+    def test_limit_to_remaining(self):
+        bucket = TokenBucket(600)
+        now = bucket.updated
+        bucket.limit_to(5, now)
+        self.assertAlmostEqual(bucket.reserve(15, now), 1.0)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds({"retry-after-ms": "1500"}), 1.5)
+        self.assertEqual(retry_after_seconds({"retry-after": "2"}), 2.0)
+        self.assertIsNone(retry_after_seconds({"retry-after": "soon"}))
+        self.assertIsNone(retry_after_seconds({}))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_call_parses_raw_response(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        raw = make_raw_response(prompt_tokens=40)
+
+        response = limiter.call(lambda: raw, tokens=100)
+
+        self.assertIs(response, raw.parse.return_value)
+        # Over-estimated tokens are given back
+        self.assertAlmostEqual(limiter.tokens.level, 6000 - 40, delta=1)
+
+    def test_remaining_headers_limit_the_bucket(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        raw = make_raw_response(headers={"x-ratelimit-remaining-tokens": "100"})
+
+        limiter.call(lambda: raw, tokens=10)
+
+        self.assertLessEqual(limiter.tokens.level, 101)
+
+    @patch("src.indexer.clients.rate_limiter.time.sleep")
+    def test_throttled_request_is_retried_after_retry_after(self, mock_sleep):
+        limiter = RateLimiter(max_concurrency=8)
+        raw = make_raw_response()
+        send = MagicMock(
+            side_effect=[make_error(RateLimitError, 429, {"retry-after": "3"}), raw]
+        )
+
+        response = limiter.call(send, tokens=10)
+
+        self.assertIs(response, raw.parse.return_value)
+        self.assertEqual(send.call_count, 2)
+        waited = sum(call.args[0] for call in mock_sleep.call_args_list)
+        self.assertGreater(waited, 2.5)
+        # Halved on the 429, then increased once by the success
+        self.assertEqual(limiter.concurrency_limit, 4)
+
+    @patch("src.indexer.clients.rate_limiter.time.sleep")
+    def test_burst_of_429s_halves_concurrency_once(self, mock_sleep):
+        limiter = RateLimiter(max_concurrency=8)
+        for _ in range(3):
+            limiter._on_error(make_error(RateLimitError, 429), 10, 0)
+        self.assertEqual(limiter.concurrency_limit, 4)
+
+    @patch("src.indexer.clients.rate_limiter.time.sleep")
+    def test_server_errors_are_retried_with_backoff(self, mock_sleep):
+        limiter = RateLimiter(max_retries=2, backoff_seconds=0.1)
+        send = MagicMock(side_effect=make_error(InternalServerError, 503))
+
+        with self.assertRaises(InternalServerError):
+            limiter.call(send, tokens=10)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_client_errors_are_not_retried(self):
+        limiter = RateLimiter()
+        send = MagicMock(side_effect=make_error(BadRequestError, 400))
+
+        with self.assertRaises(BadRequestError):
+            limiter.call(send, tokens=10)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(limiter._in_flight, 0)
+
+    def test_concurrency_is_shared_by_threads_and_asyncio(self):
+        limiter = RateLimiter(max_concurrency=2)
+        lock = threading.Lock()
+        active = [0, 0]  # current, peak
+
+        def track(delta: int):
+            with lock:
+                active[0] += delta
+                active[1] = max(active[1], active[0])
+
+        def send():
+            track(1)
+            time.sleep(0.02)
+            track(-1)
+            return make_raw_response()
+
+        async def send_async():
+            track(1)
+            await asyncio.sleep(0.02)
+            track(-1)
+            return make_raw_response()
+
+        async def run_async():
+            await asyncio.gather(
+                *(limiter.call_async(send_async, tokens=1) for _ in range(6))
+            )
+
+        threads = [
+            threading.Thread(target=lambda: limiter.call(send, tokens=1))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        asyncio.run(run_async())
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(active[1], 2)
+        self.assertEqual(limiter._in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import azure.functions as func
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from src.indexer.clients import LocalIndexBackend, Retriever
+from src.indexer.clients.clients import SearchDocumentsClient
+from src.indexer.core.manifest import ManifestStore
+from src.indexer.core.ttl_cache import Coalescer, TtlCache
+from src.indexer.core.vector_store import SearchHit, VectorStore
+from src.indexer.function_app import search
+from tests.test_clients import make_search_settings
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTtlCache(unittest.TestCase):
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache: TtlCache[str, int] = TtlCache(max_items=10, ttl_seconds=5, clock=clock)
+        cache.put("a", 1)
+
+        clock.now = 4.9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 5.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache: TtlCache[str, int] = TtlCache(max_items=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+
+class TestCoalescer(unittest.TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        coalescer: Coalescer[str, int] = Coalescer()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def call() -> int:
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 42
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(coalescer.run("q", call))
+        )
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(coalescer.run("q", call)))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        while coalescer.coalesced < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(len(calls), 1)
+        # The next call runs again
+        self.assertEqual(coalescer.run("q", lambda: 7), 7)
+
+
+class TestRetriever(unittest.TestCase):
+    def setUp(self):
+        self.embedding_client = MagicMock()
+        self.embedding_client.get_embeddings.side_effect = lambda texts: np.ones(
+            (len(texts), 2), dtype=np.float32
+        )
+        self.backend = MagicMock()
+        self.backend.search.return_value = [SearchHit("1", "text", 0.5)]
+        self.revision = 0
+        self.retriever = Retriever(
+            self.embedding_client,
+            self.backend,
+            embedding_cache=TtlCache(),
+            result_cache=TtlCache(),
+            revision=lambda: self.revision,
+        )
+
+    def test_results_are_cached_until_the_index_changes(self):
+        first = self.retriever.search("query", top=3)
+        self.retriever.search("query", top=3)
+        self.retriever.search("query", top=3, filter="lang eq 'en'")
+
+        self.assertEqual(first, [SearchHit("1", "text", 0.5)])
+        self.assertEqual(self.backend.search.call_count, 2)
+        self.assertEqual(self.embedding_client.get_embeddings.call_count, 1)
+
+        self.revision += 1
+        self.retriever.search("query", top=3)
+
+        self.assertEqual(self.backend.search.call_count, 3)
+        # The query vector is still cached
+        self.assertEqual(self.embedding_client.get_embeddings.call_count, 1)
+
+    def test_manifest_revision_changes_when_a_document_is_indexed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = ManifestStore(os.path.join(temp_dir, "manifest.db"))
+            before = manifest.revision()
+
+            manifest.save("doc.pdf", "hash", ["id"])
+
+            self.assertNotEqual(manifest.revision(), before)
+
+
+class TestSearchBackends(unittest.TestCase):
+    def test_azure_hybrid_query(self):
+        mock_settings = make_search_settings()
+        mock_settings.search_service_endpoint = "https://search.example"
+        mock_settings.search_service_index_name = "index"
+        http_client = mock_settings.global_http_client
+        http_client.post.return_value = MagicMock(
+            status_code=200,
+            content=b'{"value":[{"@search.score":0.03,"id":"1","content":"text"}]}',
+        )
+
+        hits = SearchDocumentsClient(mock_settings).search(
+            "query", np.array([0.5, 1.0], dtype=np.float32), 3, "lang eq 'en'"
+        )
+
+        self.assertEqual(
+            [(hit.id, hit.content, hit.score) for hit in hits], [("1", "text", 0.03)]
+        )
+        self.assertEqual(
+            http_client.post.call_args.args[0],
+            "https://search.example/indexes/index/docs/search",
+        )
+        body = json.loads(http_client.post.call_args.kwargs["content"])
+        self.assertEqual(body["search"], "query")
+        self.assertEqual(body["filter"], "lang eq 'en'")
+        self.assertEqual(
+            body["vectorQueries"],
+            [
+                {
+                    "kind": "vector",
+                    "vector": [0.5, 1.0],
+                    "fields": "contentVector",
+                    "k": 3,
+                }
+            ],
+        )
+
+    def test_local_hybrid_search_promotes_keyword_matches(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = VectorStore(temp_dir)
+            self.addCleanup(store.close)
+            store.upsert(
+                ["near", "keyword", "far"],
+                ["about cats", "the invoice total", "unrelated"],
+                np.array([[1.0, 0.0], [0.9, 0.3], [0.0, 1.0]]),
+            )
+            backend = LocalIndexBackend(store)
+
+            vector_only = backend.search("", np.array([1.0, 0.0]), top=2)
+            hybrid = backend.search("invoice", np.array([1.0, 0.0]), top=2)
+
+            self.assertEqual([hit.id for hit in vector_only], ["near", "keyword"])
+            self.assertEqual([hit.id for hit in hybrid], ["keyword", "near"])
+            with self.assertRaises(ValueError):
+                backend.search("invoice", np.array([1.0, 0.0]), filter="x eq 1")
+
+
+class TestSearchFunction(unittest.TestCase):
+    def make_request(self, method: str = "GET", params=None, body=None) -> MagicMock:
+        req = MagicMock(spec=func.HttpRequest)
+        req.method = method
+        req.params = params or {}
+        req.get_json.return_value = body
+        return req
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.retriever")
+    def test_search_returns_hits(self, mock_retriever_ref, mock_settings_ref):
+        mock_settings_ref.get.return_value = MagicMock(search_max_top=50)
+        mock_retriever = mock_retriever_ref.get.return_value
+        mock_retriever.search.return_value = [SearchHit("1", "text", 0.5)]
+
+        response = search(
+            self.make_request("POST", body={"query": " invoice ", "top": 3})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.get_body()),
+            {
+                "query": "invoice",
+                "results": [{"id": "1", "content": "text", "score": 0.5}],
+            },
+        )
+        mock_retriever.search.assert_called_once_with("invoice", 3, None)
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.retriever")
+    def test_invalid_requests_are_rejected(self, mock_retriever_ref, mock_settings_ref):
+        mock_settings_ref.get.return_value = MagicMock(search_max_top=50)
+        mock_retriever = mock_retriever_ref.get.return_value
+        mock_retriever.search.side_effect = ValueError("bad filter")
+
+        for params in ({}, {"query": "q", "top": "100"}, {"query": "q", "top": "x"}):
+            self.assertEqual(search(self.make_request(params=params)).status_code, 400)
+        response = search(self.make_request(params={"query": "q", "filter": "?"}))
+        self.assertEqual(response.status_code, 400)
+        mock_retriever.search.assert_called_once_with("q", 5, "?")
+
+
+if __name__ == "__main__":
+    unittest.main()
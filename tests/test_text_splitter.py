@@ -0,0 +1,53 @@
+import logging
+import random
+
+import unittest
+
+from src.indexer.func import RecursiveTextSplitter
+
+try:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+except ImportError:
+    RecursiveCharacterTextSplitter = None
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+ALPHABET = ["a", "b", "xyz", "日本語", " ", "  ", "\n", "\n\n", "\t", ".", "。"]
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+class TestRecursiveTextSplitter(unittest.TestCase):
+    def test_splits_on_largest_separator_first(self):
+        splitter = RecursiveTextSplitter(chunk_size=12, chunk_overlap=0)
+        text = "first para\n\nsecond one\nthird line"
+
+        chunks = splitter.split_text(text)
+
+        self.assertEqual(chunks, ["first para", "second one", "third line"])
+
+    def test_rejects_overlap_larger_than_chunk_size(self):
+        with self.assertRaises(ValueError):
+            RecursiveTextSplitter(chunk_size=10, chunk_overlap=20)
+
+    @unittest.skipIf(RecursiveCharacterTextSplitter is None, "langchain not installed")
+    def test_matches_langchain_on_random_corpus(self):
+        rng = random.Random(1234)
+        for _ in range(300):
+            chunk_size = rng.randint(1, 120)
+            overlap = rng.randint(0, chunk_size)
+            text = random_text(rng, rng.randint(0, 600))
+            expected = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size, chunk_overlap=overlap
+            ).split_text(text)
+
+            chunks = RecursiveTextSplitter(chunk_size, overlap).split_text(text)
+
+            self.assertEqual(chunks, expected, (chunk_size, overlap, text))
@@ -0,0 +1,146 @@
+from typing import Any, Dict, List
+import logging
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from azure.core.exceptions import HttpResponseError
+from azure.search.documents.models import IndexingResult
+
+from src.indexer.clients import AsyncBatchUploader, BatchUploader
+from src.indexer.clients.clients import index_batch_body
+from src.indexer.clients.uploader import document_size, split_batches
+from src.indexer.core.serialization import dumps, loads
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+def make_documents(count: int) -> List[Dict[str, Any]]:
+    return [{"id": str(i), "content": "x" * 10} for i in range(count)]
+
+
+class FlakySearch:
+    """Fails each document with a 503 the first time it is sent."""
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def send(self, documents: List[Dict[str, Any]]) -> List[IndexingResult]:
+        keys = [doc["id"] for doc in documents]
+        first_attempt = not self.calls
+        self.calls.append(keys)
+        return [
+            IndexingResult(
+                key=key,
+                succeeded=not (first_attempt and key == "1") and key != "2",
+                status_code=503 if key == "1" else (400 if key == "2" else 201),
+                error_message="bad document" if key == "2" else None,
+            )
+            for key in keys
+        ]
+
+
+class TestSplitBatches(unittest.TestCase):
+    def test_split_by_count_and_size(self):
+        documents = make_documents(5)
+        size = document_size(documents[0])
+
+        by_count = split_batches(documents, max_documents=2, max_bytes=10**6)
+        by_size = split_batches(documents, max_documents=100, max_bytes=size * 3)
+
+        self.assertEqual([len(batch) for batch, _ in by_count], [2, 2, 1])
+        self.assertEqual([len(batch) for batch, _ in by_size], [3, 2])
+        self.assertEqual(by_size[0][1], size * 3)
+
+    def test_batch_body_reuses_each_document_encoding(self):
+        documents = [
+            {"id": str(i), "content": "x", "contentVector": np.ones(3, np.float32)}
+            for i in range(3)
+        ]
+
+        with patch("src.indexer.clients.uploader.dumps", wraps=dumps) as encode:
+            ((batch, size),) = split_batches(documents, 10, 10**6)
+            body = index_batch_body(batch, "upload")
+
+        self.assertEqual(encode.call_count, 3)
+        self.assertEqual(
+            loads(body)["value"],
+            [
+                {"@search.action": "upload", **doc, "contentVector": [1.0] * 3}
+                for doc in documents
+            ],
+        )
+        self.assertEqual(size, sum(document_size(doc) for doc in batch))
+
+
+class TestBatchUploader(unittest.TestCase):
+    def test_retries_only_failed_keys(self):
+        search = FlakySearch()
+        uploader = BatchUploader(search.send, max_documents=10, backoff_seconds=0)
+
+        report = uploader.upload(make_documents(3))
+
+        self.assertEqual(search.calls, [["0", "1", "2"], ["1"]])
+        self.assertEqual(sorted(report.succeeded), ["0", "1"])
+        self.assertEqual(report.failed, {"2": "400: bad document"})
+        self.assertEqual(report.batches[0].attempts, 2)
+        self.assertEqual(report.retries, 1)
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def send(documents: List[Dict[str, Any]]):
+            calls.append(documents)
+            raise HttpResponseError("Service Unavailable")
+
+        uploader = BatchUploader(
+            send, max_documents=2, max_retries=2, backoff_seconds=0
+        )
+
+        report = uploader.upload(make_documents(3))
+
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(len(report.batches), 2)
+        self.assertEqual(sorted(report.failed), ["0", "1", "2"])
+
+    def test_documents_without_a_result_are_retried_then_failed(self):
+        calls = []
+
+        def send(documents: List[Dict[str, Any]]) -> List[IndexingResult]:
+            calls.append([doc["id"] for doc in documents])
+            # The service leaves out the last document of every request
+            return [
+                IndexingResult(key=doc["id"], succeeded=True, status_code=201)
+                for doc in documents[:-1]
+            ]
+
+        uploader = BatchUploader(
+            send, max_documents=10, max_retries=1, backoff_seconds=0
+        )
+
+        report = uploader.upload(make_documents(3))
+
+        self.assertEqual(calls, [["0", "1", "2"], ["2"]])
+        self.assertEqual(sorted(report.succeeded), ["0", "1"])
+        self.assertEqual(list(report.failed), ["2"])
+
+
+class TestAsyncBatchUploader(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_only_failed_keys(self):
+        search = FlakySearch()
+
+        async def send(documents: List[Dict[str, Any]]):
+            return search.send(documents)
+
+        uploader = AsyncBatchUploader(send, max_documents=10, backoff_seconds=0)
+
+        report = await uploader.upload(make_documents(3))
+
+        self.assertEqual(search.calls, [["0", "1", "2"], ["1"]])
+        self.assertEqual(sorted(report.succeeded), ["0", "1"])
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import tempfile
+
+import azure.functions as func
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.indexer.core.uploads import UploadStore
+from src.indexer.function_app import complete_upload, create_upload, put_upload_part
+from tests.test_integration import make_settings
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+class TestUploadStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "uploads.db")
+        self.store = UploadStore(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parts_in_any_order_assemble_the_file(self):
+        upload = self.store.create("manual.pdf", 10, part_size=4)
+        self.assertEqual(upload.part_count, 3)
+
+        self.store.write_part(upload, 2, b"89")
+        self.store.write_part(upload, 0, b"0123")
+        # Resuming after a restart: only the middle part is missing
+        upload = UploadStore(self.path).get(upload.upload_id)
+        assert upload is not None
+        self.assertEqual(upload.missing, [1])
+        with self.assertRaises(ValueError):
+            self.store.assemble(upload)
+
+        self.store.write_part(upload, 1, b"4567")
+        # Sending a part again replaces it
+        self.store.write_part(upload, 1, b"4567")
+
+        self.assertEqual(self.store.assemble(upload), b"0123456789")
+
+    def test_parts_of_the_wrong_size_or_index_are_rejected(self):
+        upload = self.store.create("manual.pdf", 10, part_size=4)
+
+        for part, data in ((0, b"012"), (2, b"8"), (3, b"")):
+            with self.assertRaises(ValueError):
+                self.store.write_part(upload, part, data)
+
+    def test_abandoned_uploads_expire(self):
+        store = UploadStore(self.path, ttl_seconds=-1)
+        upload = store.create("manual.pdf", 4, part_size=4)
+        store.write_part(upload, 0, b"0123")
+
+        self.assertEqual(store.expire(), 1)
+        self.assertIsNone(store.get(upload.upload_id))
+
+
+class TestUploadFunctions(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = UploadStore(os.path.join(self.temp_dir.name, "uploads.db"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_request(self, body=None, route_params=None, data=b"") -> MagicMock:
+        req = MagicMock(spec=func.HttpRequest)
+        req.method = "POST"
+        req.get_json.return_value = body
+        req.get_body.return_value = data
+        req.route_params = route_params or {}
+        return req
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.job_worker")
+    @patch("src.indexer.function_app.upload_store")
+    def test_upload_in_parts_then_queue_a_job(
+        self,
+        mock_upload_store_ref: MagicMock,
+        mock_job_worker_ref: MagicMock,
+        mock_settings_ref: MagicMock,
+    ):
+        config = make_settings()
+        config.upload_part_bytes = 4
+        mock_settings_ref.get.return_value = config
+        mock_upload_store_ref.get.return_value = self.store
+        worker = mock_job_worker_ref.get.return_value
+        worker.store.enqueue.return_value = MagicMock(job_id="abc", status="queued")
+
+        created = create_upload(
+            self.make_request(body={"file_name": "manual.pdf", "size": 6})
+        )
+        self.assertEqual(created.status_code, 201)
+        upload = json.loads(created.get_body())
+        self.assertEqual(upload["part_count"], 2)
+        upload_id = upload["upload_id"]
+
+        def put(part: int, data: bytes) -> int:
+            params = {"upload_id": upload_id, "part": str(part)}
+            return put_upload_part(
+                self.make_request(route_params=params, data=data)
+            ).status_code
+
+        self.assertEqual(put(1, b"45"), 204)
+        self.assertEqual(put(1, b"456"), 400)
+
+        incomplete = complete_upload(
+            self.make_request(route_params={"upload_id": upload_id})
+        )
+        self.assertEqual(incomplete.status_code, 409)
+        self.assertEqual(json.loads(incomplete.get_body())["missing"], [0])
+
+        self.assertEqual(put(0, b"0123"), 204)
+        completed = complete_upload(
+            self.make_request(route_params={"upload_id": upload_id})
+        )
+
+        self.assertEqual(completed.status_code, 202)
+        worker.store.enqueue.assert_called_once_with("manual.pdf", b"012345")
+        self.assertIsNone(self.store.get(upload_id))
+
+    @patch("src.indexer.function_app.settings")
+    @patch("src.indexer.function_app.upload_store")
+    def test_invalid_uploads_are_refused(
+        self, mock_upload_store_ref: MagicMock, mock_settings_ref: MagicMock
+    ):
+        config = make_settings()
+        config.upload_max_bytes = 100
+        mock_settings_ref.get.return_value = config
+        mock_upload_store_ref.get.return_value = self.store
+
+        for body, status_code in (
+            (None, 400),
+            ({"file_name": "manual.pdf"}, 400),
+            ({"file_name": "image.png", "size": 10}, 415),
+            ({"file_name": "manual.pdf", "size": 101}, 413),
+        ):
+            response = create_upload(self.make_request(body=body))
+            self.assertEqual(response.status_code, status_code, body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import logging
+import os
+import tempfile
+
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.indexer.clients import (
+    AsyncIndexingPipeline,
+    AsyncLocalIndexBackend,
+    AzureEmbeddingClient,
+    AzureSearchClient,
+    LocalIndexBackend,
+)
+from src.indexer.core.manifest import ManifestStore
+from src.indexer.core.vector_store import VectorStore, normalize
+from tests.test_clients import make_search_settings
+from tests.test_pipeline import FakeEmbeddingClient
+
+logging.basicConfig(
+    filename="test.log",
+    filemode="a",
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+def random_vectors(count: int, dimensions: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, dimensions)).astype("f4")
+
+
+def clustered_vectors(
+    count: int, clusters: int = 16, dimensions: int = 32, seed: int = 0
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    points = centers[rng.integers(clusters, size=count)]
+    return (points + rng.normal(scale=0.1, size=points.shape)).astype("f4")
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, top: int) -> list[int]:
+    scores = normalize(vectors) @ normalize(query[np.newaxis])[0]
+    return np.argsort(-scores)[:top].tolist()
+
+
+class TestVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = os.path.join(self.temp_dir.name, "index")
+
+    def open(self, **options) -> VectorStore:
+        store = VectorStore(self.root, **options)
+        self.addCleanup(store.close)
+        return store
+
+    def add(self, store: VectorStore, vectors: np.ndarray, start: int = 0):
+        ids = [f"doc-{start + i}" for i in range(len(vectors))]
+        store.upsert(ids, [f"text {key}" for key in ids], vectors)
+
+    def test_exact_search_matches_brute_force(self):
+        store = self.open()
+        vectors = random_vectors(500)
+        # Appended in several batches, as uploads arrive
+        for start in range(0, 500, 128):
+            self.add(store, vectors[start : start + 128], start)
+
+        for query in random_vectors(5, seed=1):
+            hits = store.search(query, top=10)
+
+            self.assertEqual(
+                [hit.id for hit in hits],
+                [f"doc-{i}" for i in brute_force(vectors, query, 10)],
+            )
+        self.assertEqual(hits[0].content, f"text {hits[0].id}")
+        self.assertEqual(hits, sorted(hits, key=lambda hit: -hit.score))
+
+    def test_replaced_and_deleted_documents_are_not_returned(self):
+        store = self.open()
+        vectors = random_vectors(3)
+        self.add(store, vectors)
+
+        store.upsert(["doc-0"], ["new text"], vectors[2:3])
+        store.delete(["doc-2", "unknown"])
+
+        hits = store.search(vectors[2], top=5)
+        self.assertEqual(len(store), 2)
+        self.assertEqual([hit.id for hit in hits][0], "doc-0")
+        self.assertEqual(hits[0].content, "new text")
+        self.assertAlmostEqual(hits[0].score, 1.0, places=5)
+        self.assertNotIn("doc-2", [hit.id for hit in hits])
+
+    def test_store_is_reopened_from_disk(self):
+        store = self.open()
+        vectors = random_vectors(20)
+        self.add(store, vectors)
+        store.delete(["doc-3"])
+        store.close()
+
+        reopened = self.open()
+
+        self.assertEqual(len(reopened), 19)
+        np.testing.assert_array_equal(reopened.get("doc-5"), vectors[5])
+        self.assertEqual(reopened.search(vectors[7], top=1)[0].id, "doc-7")
+
+    def test_compaction_keeps_live_rows(self):
+        store = self.open()
+        vectors = random_vectors(50)
+        self.add(store, vectors)
+        store.delete([f"doc-{i}" for i in range(0, 50, 2)])
+
+        store.compact()
+
+        self.assertEqual(
+            os.path.getsize(os.path.join(self.root, store._file_name)), 25 * 8 * 4
+        )
+        self.assertEqual(store.search(vectors[9], top=1)[0].id, "doc-9")
+        store.close()
+        self.assertEqual(self.open().search(vectors[9], top=1)[0].id, "doc-9")
+
+    def test_dimension_mismatch_is_rejected(self):
+        store = self.open()
+        self.add(store, random_vectors(2, dimensions=4))
+
+        with self.assertRaises(ValueError):
+            self.add(store, random_vectors(2, dimensions=3))
+
+    def test_ivf_search_recalls_nearest_neighbours(self):
+        store = self.open(ivf_lists=16, ivf_probes=4)
+        vectors = clustered_vectors(2000)
+        self.add(store, vectors)
+        # Rows added after the index was built are still found
+        store.search(vectors[0])
+        extra = clustered_vectors(100, seed=1)
+        self.add(store, extra, start=2000)
+
+        queries = np.concatenate([vectors[:20], extra[:20]])
+        approximate = store.search_batch(queries, top=10)
+        exact = store.search_batch(queries, top=10, exact=True)
+
+        recall = np.mean(
+            [
+                len({hit.id for hit in a} & {hit.id for hit in e}) / 10
+                for a, e in zip(approximate, exact)
+            ]
+        )
+        self.assertGreaterEqual(recall, 0.9)
+        self.assertEqual(approximate[20][0].id, "doc-2000")
+        self.assertTrue(os.path.exists(os.path.join(self.root, "ivf.npz")))
+
+
+class TestLocalIndexBackend(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store = VectorStore(os.path.join(self.temp_dir.name, "index"))
+        self.addCleanup(self.store.close)
+        self.backend = LocalIndexBackend(self.store)
+
+    def test_search_client_indexes_into_local_store(self):
+        mock_embedding_client = MagicMock(spec=AzureEmbeddingClient)
+        mock_embedding_client.get_embeddings.side_effect = lambda texts: np.array(
+            [[len(text), 1.0] for text in texts], dtype=np.float32
+        )
+        client = AzureSearchClient(
+            make_search_settings(),
+            mock_embedding_client,
+            ManifestStore(os.path.join(self.temp_dir.name, "manifest.db")),
+            backend=self.backend,
+        )
+
+        client.index_document("doc.pdf", "v1", iter(["a", "bb", "ccc"]))
+        uploaded = client.index_document("doc.pdf", "v2", iter(["a", "dddd"]))
+
+        self.assertEqual(uploaded, 1)
+        self.assertEqual(len(self.store), 2)
+        hits = self.backend.search("", np.array([4.0, 1.0]), top=2)
+        self.assertEqual([hit.content for hit in hits], ["dddd", "a"])
+
+    def test_rejected_vectors_fail_without_retrying(self):
+        self.store.upsert(["a"], ["a"], np.ones((1, 2)))
+
+        results = self.backend.upload_documents(
+            [{"id": "b", "content": "b", "contentVector": np.ones(3)}]
+        )
+
+        self.assertFalse(results[0].succeeded)
+        self.assertEqual(results[0].status_code, 400)
+
+
+class TestAsyncLocalIndexBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_pipeline_indexes_into_local_store(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        store = VectorStore(os.path.join(temp_dir.name, "index"))
+        self.addCleanup(store.close)
+        backend = AsyncLocalIndexBackend(LocalIndexBackend(store))
+        pipeline = AsyncIndexingPipeline(
+            FakeEmbeddingClient(),  # type: ignore
+            backend,
+            manifest=ManifestStore(os.path.join(temp_dir.name, "manifest.db")),
+        )
+
+        uploaded = await pipeline.index_document("doc.pdf", "v1", ["one", "three"])
+
+        self.assertEqual(uploaded, 2)
+        hits = await backend.search("", np.array([5.0]), top=5)
+        self.assertEqual({hit.content for hit in hits}, {"one", "three"})
+
+
+if __name__ == "__main__":
+    unittest.main()